@@ -0,0 +1,69 @@
+"""initial schema
+
+Baseline matching what Base.metadata.create_all used to build. Databases that
+were created that way should be stamped rather than upgraded:
+    alembic stamp 0001_initial
+
+Revision ID: 0001_initial
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_initial"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(length=150), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False, unique=True),
+        sa.Column("password", sa.String(length=255), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "projects",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(length=255), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column(
+            "owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+        ),
+    )
+    op.create_index("ix_projects_id", "projects", ["id"])
+    op.create_index("ix_projects_owner_id", "projects", ["owner_id"])
+
+    op.create_table(
+        "logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "project_id",
+            sa.Integer(),
+            sa.ForeignKey("projects.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("message", sa.Text()),
+    )
+    op.create_index("ix_logs_id", "logs", ["id"])
+    op.create_index("ix_logs_project_id", "logs", ["project_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("logs")
+    op.drop_table("projects")
+    op.drop_table("users")
@@ -0,0 +1,27 @@
+"""composite (owner_id, id) index for keyset pagination
+
+Revision ID: 0002_projects_owner_keyset
+Revises: 0001_initial
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_projects_owner_keyset"
+down_revision: Union[str, Sequence[str], None] = "0001_initial"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_projects_owner_id_id", "projects", ["owner_id", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_projects_owner_id_id", table_name="projects")
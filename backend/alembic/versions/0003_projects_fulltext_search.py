@@ -0,0 +1,74 @@
+"""full-text search index on projects title/description
+
+Postgres gets a generated, weighted tsvector column plus a GIN index, so the
+vector can never drift from title/description on create/update/replace.
+SQLite (local dev) gets an FTS5 external-content table kept in sync by triggers.
+
+Revision ID: 0003_projects_fulltext
+Revises: 0002_projects_owner_keyset
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_projects_fulltext"
+down_revision: Union[str, Sequence[str], None] = "0002_projects_owner_keyset"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("""
+            ALTER TABLE projects ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED
+            """)
+        op.execute("CREATE INDEX ix_projects_search_vector ON projects USING GIN (search_vector)")
+    elif dialect == "sqlite":
+        op.execute("""
+            CREATE VIRTUAL TABLE projects_fts
+            USING fts5(title, description, content='projects', content_rowid='id')
+            """)
+        op.execute("""
+            CREATE TRIGGER projects_fts_ai AFTER INSERT ON projects BEGIN
+                INSERT INTO projects_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """)
+        op.execute("""
+            CREATE TRIGGER projects_fts_ad AFTER DELETE ON projects BEGIN
+                INSERT INTO projects_fts(projects_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END
+            """)
+        op.execute("""
+            CREATE TRIGGER projects_fts_au AFTER UPDATE ON projects BEGIN
+                INSERT INTO projects_fts(projects_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO projects_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """)
+        # index rows that existed before the migration
+        op.execute("INSERT INTO projects_fts(projects_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_projects_search_vector")
+        op.execute("ALTER TABLE projects DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("projects_fts_ai", "projects_fts_ad", "projects_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS projects_fts")
@@ -0,0 +1,43 @@
+"""logs.created_at and (project_id, created_at) index
+
+Revision ID: 0004_logs_created_at
+Revises: 0003_projects_fulltext
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_logs_created_at"
+down_revision: Union[str, Sequence[str], None] = "0003_projects_fulltext"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("logs") as batch:
+        batch.add_column(
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.func.now(),
+            )
+        )
+    op.create_index("ix_logs_project_id_created_at", "logs", ["project_id", "created_at"])
+    # the composite index covers project_id lookups; one less index to maintain per insert
+    op.drop_index("ix_logs_project_id", table_name="logs")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_logs_project_id", "logs", ["project_id"])
+    op.drop_index("ix_logs_project_id_created_at", table_name="logs")
+    with op.batch_alter_table("logs") as batch:
+        batch.drop_column("created_at")
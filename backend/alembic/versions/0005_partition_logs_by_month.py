@@ -0,0 +1,122 @@
+"""range-partition logs by created_at (Postgres only)
+
+The existing table is attached as-is as one partition (logs_legacy) covering
+everything up to the start of next month, so no rows are copied. New rows land
+in monthly partitions: this migration creates the first three, and app.retention
+(the job worker's logs.retention) keeps them created ahead of time and drops
+them once they pass LOG_RETENTION_DAYS. A DEFAULT partition catches anything
+outside the created ranges.
+
+The primary key becomes (id, created_at), since Postgres requires the partition
+key in every unique constraint on a partitioned table. id stays sequence-backed
+and unique in practice.
+
+Revision ID: 0005_partition_logs
+Revises: 0004_logs_created_at
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_partition_logs"
+down_revision: Union[str, Sequence[str], None] = "0004_logs_created_at"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the monthly partitions created here, from next month on; the DDL is spelled out
+# rather than taken from app.retention, so later edits there can't change this
+INITIAL_MONTHS = 3
+
+
+def _months_from_now(n: int) -> datetime:
+    now = datetime.now(timezone.utc)
+    y, m = divmod(now.month - 1 + n, 12)
+    return datetime(now.year + y, m + 1, 1, tzinfo=timezone.utc)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        # SQLite/others keep a plain table; app.retention falls back to chunked deletes
+        return
+    bound = _months_from_now(1).isoformat()
+
+    op.execute("ALTER TABLE logs RENAME TO logs_legacy")
+    # replaced by the parent's (id, created_at) key, which ATTACH builds on the partition
+    op.execute("ALTER TABLE logs_legacy DROP CONSTRAINT logs_pkey")
+    # the parent's FK is cloned onto every partition on attach
+    op.execute("ALTER TABLE logs_legacy DROP CONSTRAINT logs_project_id_fkey")
+    op.execute("ALTER INDEX ix_logs_id RENAME TO ix_logs_legacy_id")
+    op.execute(
+        "ALTER INDEX ix_logs_project_id_created_at RENAME TO ix_logs_legacy_project_id_created_at"
+    )
+
+    op.execute("""
+        CREATE TABLE logs (
+            id integer NOT NULL DEFAULT nextval('logs_id_seq'),
+            project_id integer NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+            message text,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """)
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY logs.id")
+    op.execute("CREATE INDEX ix_logs_id ON logs (id)")
+    op.execute("CREATE INDEX ix_logs_project_id_created_at ON logs (project_id, created_at)")
+
+    # a CHECK matching the bound lets ATTACH skip its own validation scan
+    op.execute(
+        f"ALTER TABLE logs_legacy ADD CONSTRAINT logs_legacy_bound CHECK (created_at < '{bound}')"
+    )
+    op.execute(
+        f"ALTER TABLE logs ATTACH PARTITION logs_legacy FOR VALUES FROM (MINVALUE) TO ('{bound}')"
+    )
+    op.execute("ALTER TABLE logs_legacy DROP CONSTRAINT logs_legacy_bound")
+    op.execute("CREATE TABLE logs_default PARTITION OF logs DEFAULT")
+
+    for i in range(1, INITIAL_MONTHS + 1):
+        start, end = _months_from_now(i), _months_from_now(i + 1)
+        op.execute(
+            f"CREATE TABLE logs_p{start:%Y%m} PARTITION OF logs "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("ALTER TABLE logs RENAME TO logs_partitioned")
+    # free the names the plain table is expected to have
+    op.execute("ALTER TABLE logs_partitioned RENAME CONSTRAINT logs_pkey TO logs_partitioned_pkey")
+    op.execute(
+        "ALTER TABLE logs_partitioned RENAME CONSTRAINT logs_project_id_fkey"
+        " TO logs_partitioned_project_id_fkey"
+    )
+    op.execute("ALTER INDEX ix_logs_id RENAME TO ix_logs_partitioned_id")
+    op.execute(
+        "ALTER INDEX ix_logs_project_id_created_at"
+        " RENAME TO ix_logs_partitioned_project_id_created_at"
+    )
+    op.execute("""
+        CREATE TABLE logs (
+            id integer NOT NULL DEFAULT nextval('logs_id_seq'),
+            project_id integer NOT NULL,
+            message text,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            CONSTRAINT logs_pkey PRIMARY KEY (id),
+            CONSTRAINT logs_project_id_fkey FOREIGN KEY (project_id)
+                REFERENCES projects(id) ON DELETE CASCADE
+        )
+        """)
+    op.execute("INSERT INTO logs SELECT id, project_id, message, created_at FROM logs_partitioned")
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY logs.id")
+    op.execute("DROP TABLE logs_partitioned CASCADE")
+    op.execute("CREATE INDEX ix_logs_id ON logs (id)")
+    op.execute("CREATE INDEX ix_logs_project_id_created_at ON logs (project_id, created_at)")
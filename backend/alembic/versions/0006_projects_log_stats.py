@@ -0,0 +1,41 @@
+"""projects.log_count and projects.last_log_at
+
+Denormalized per-project log stats, maintained by app/aggregates.py. Backfilled
+here from the logs table; `python -m app.aggregates` does the same rebuild later.
+
+Revision ID: 0006_projects_log_stats
+Revises: 0005_partition_logs
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_projects_log_stats"
+down_revision: Union[str, Sequence[str], None] = "0005_partition_logs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("projects") as batch:
+        batch.add_column(sa.Column("log_count", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("last_log_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute("""
+        UPDATE projects SET
+            log_count = (SELECT count(*) FROM logs WHERE logs.project_id = projects.id),
+            last_log_at = (SELECT max(created_at) FROM logs WHERE logs.project_id = projects.id)
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # plain ALTERs: a batch rebuild on SQLite would drop the projects_fts triggers
+    op.drop_column("projects", "last_log_at")
+    op.drop_column("projects", "log_count")
@@ -0,0 +1,54 @@
+"""projects.version / projects.updated_at and users.projects_version (ETags)
+
+Revision ID: 0007_project_versions
+Revises: 0006_projects_log_stats
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_project_versions"
+down_revision: Union[str, Sequence[str], None] = "0006_projects_log_stats"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # plain ALTERs, not batch mode: on SQLite a batch table rebuild would drop the
+    # projects_fts triggers from 0003
+    op.add_column(
+        "projects", sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+    )
+    if op.get_bind().dialect.name == "sqlite":
+        # SQLite can't ADD COLUMN with a non-constant default; models.py fills it on insert
+        op.add_column(
+            "projects", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True)
+        )
+        op.execute("UPDATE projects SET updated_at = CURRENT_TIMESTAMP")
+    else:
+        op.add_column(
+            "projects",
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.func.now(),
+            ),
+        )
+    op.add_column(
+        "users", sa.Column("projects_version", sa.Integer(), nullable=False, server_default="1")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "projects_version")
+    op.drop_column("projects", "updated_at")
+    op.drop_column("projects", "version")
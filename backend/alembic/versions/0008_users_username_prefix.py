@@ -0,0 +1,32 @@
+"""users.username prefix index for GET /users/?username=
+
+Revision ID: 0008_users_username_prefix
+Revises: 0007_project_versions
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_users_username_prefix"
+down_revision: Union[str, Sequence[str], None] = "0007_project_versions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Postgres only uses a btree for LIKE 'abc%' under the C collation or with the
+    # pattern operator class; ix_users_username (unique) stays for equality lookups.
+    # SQLite needs nothing: the route turns the prefix into a range on ix_users_username.
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE INDEX ix_users_username_prefix ON users (username varchar_pattern_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX ix_users_username_prefix")
@@ -0,0 +1,55 @@
+"""jobs table for the background job queue (app/jobs.py)
+
+Revision ID: 0009_jobs
+Revises: 0008_users_username_prefix
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_jobs"
+down_revision: Union[str, Sequence[str], None] = "0008_users_username_prefix"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(length=64), nullable=False),
+        sa.Column("key", sa.String(length=255)),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE")),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="5"),
+        sa.Column(
+            "run_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()
+        ),
+        sa.Column("locked_by", sa.String(length=64)),
+        sa.Column("locked_at", sa.DateTime(timezone=True)),
+        sa.Column("result", sa.JSON()),
+        sa.Column("error", sa.Text()),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()
+        ),
+        sa.Column("finished_at", sa.DateTime(timezone=True)),
+    )
+    # workers claim with WHERE status = 'queued' AND run_at <= now ORDER BY run_at
+    op.create_index("ix_jobs_status_run_at", "jobs", ["status", "run_at"])
+    # enqueue looks for an unfinished job with the same kind and key
+    op.create_index("ix_jobs_kind_key", "jobs", ["kind", "key"])
+    op.create_index("ix_jobs_owner_id", "jobs", ["owner_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("jobs")
@@ -0,0 +1,45 @@
+"""re-index projects_fts only when title/description change
+
+The SQLite FTS trigger from 0003 fired on every UPDATE of projects, so each log
+ingest (log_count/last_log_at, see 0006) deleted and re-inserted the project's
+FTS row. Postgres needs nothing: its search_vector is a generated column.
+
+Revision ID: 0010_projects_fts_update_of
+Revises: 0009_jobs
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_projects_fts_update_of"
+down_revision: Union[str, Sequence[str], None] = "0009_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_trigger(columns: str) -> None:
+    op.execute("DROP TRIGGER IF EXISTS projects_fts_au")
+    op.execute(f"""
+        CREATE TRIGGER projects_fts_au AFTER UPDATE{columns} ON projects BEGIN
+            INSERT INTO projects_fts(projects_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO projects_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        _replace_trigger(" OF title, description")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        _replace_trigger("")
@@ -0,0 +1,30 @@
+"""projects.deleted_at: a queued (202) delete hides the project at once
+
+Revision ID: 0011_projects_deleted_at
+Revises: 0010_projects_fts_update_of
+Create Date: 2026-10-18 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0011_projects_deleted_at"
+down_revision: Union[str, Sequence[str], None] = "0010_projects_fts_update_of"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nullable, no default: instant on Postgres, no table rewrite
+    op.add_column("projects", sa.Column("deleted_at", sa.DateTime(timezone=True)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("projects", "deleted_at")
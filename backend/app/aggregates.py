@@ -0,0 +1,134 @@
+# app/aggregates.py - per-project log counters
+#
+# projects.log_count / projects.last_log_at are maintained incrementally by every
+# code path that writes or removes logs, in the same transaction as the write, so
+# GET /projects/ can return them without a COUNT(*) per project.
+# One UPDATE per touched project per batch (not per row) keeps ingest cheap.
+#
+# If they ever drift (manual SQL, a restored backup) rebuild them in bulk:
+#   python -m app.aggregates               # every project
+#   python -m app.aggregates --project 42  # just one
+#   python -m app.aggregates --enqueue     # on the job worker instead (app/jobs.py)
+import argparse
+from collections import Counter
+
+from sqlalchemy import DateTime, bindparam, case, func, or_, select, update
+
+from . import etags, models
+
+_projects = models.Project.__table__
+_logs = models.Log.__table__
+
+_pid, _n = bindparam("pid"), bindparam("n")
+_ts = bindparam("ts", type_=DateTime(timezone=True))
+
+# Statements run with executemany, one parameter set per project. New logs aren't an
+# edit of the project: version still moves by itself (the counters are in the payload,
+# so ETags must change), but updated_at is set to itself to skip its onupdate
+_ADD = (
+    update(_projects)
+    .where(_projects.c.id == _pid)
+    .values(
+        updated_at=_projects.c.updated_at,
+        log_count=_projects.c.log_count + _n,
+        last_log_at=case(
+            (
+                or_(_projects.c.last_log_at.is_(None), _projects.c.last_log_at < _ts),
+                _ts,
+            ),
+            else_=_projects.c.last_log_at,
+        ),
+    )
+)
+
+# Removing logs never makes last_log_at newer; it only clears once nothing is left
+_SUBTRACT = (
+    update(_projects)
+    .where(_projects.c.id == _pid)
+    .values(
+        updated_at=_projects.c.updated_at,
+        # clamped at zero so rows written behind the app's back can't drive it negative
+        log_count=case((_projects.c.log_count - _n <= 0, 0), else_=_projects.c.log_count - _n),
+        last_log_at=case((_projects.c.log_count - _n <= 0, None), else_=_projects.c.last_log_at),
+    )
+)
+
+
+def logs_added(db, rows: list[dict]):
+    """Count freshly inserted log rows ({project_id, created_at, ...}) against their projects.
+
+    `db` is a Session or Connection; call it in the same transaction as the insert.
+    """
+    latest: dict[int, object] = {}
+    counts: Counter = Counter()
+    for r in rows:
+        pid, ts = r["project_id"], r["created_at"]
+        counts[pid] += 1
+        if pid not in latest or ts > latest[pid]:
+            latest[pid] = ts
+    if counts:
+        # sorted so concurrent batches lock project rows in the same order
+        db.execute(
+            _ADD, [{"pid": pid, "n": counts[pid], "ts": latest[pid]} for pid in sorted(counts)]
+        )
+        # the counters are part of the project payload, so cached reads must revalidate
+        etags.touch_owners_of(db, counts)
+
+
+def logs_removed(db, counts: dict[int, int]):
+    """Subtract deleted log rows, {project_id: n}, from their projects' counters."""
+    params = [{"pid": pid, "n": n} for pid, n in sorted(counts.items()) if n]
+    if params:
+        db.execute(_SUBTRACT, params)
+        etags.touch_owners_of(db, [p["pid"] for p in params])
+
+
+def reconcile(db, project_ids=None) -> int:
+    """Recompute the counters from the logs table; returns the number of projects updated."""
+    count = (
+        select(func.count())
+        .select_from(_logs)
+        .where(_logs.c.project_id == _projects.c.id)
+        .scalar_subquery()
+    )
+    latest = (
+        select(func.max(_logs.c.created_at))
+        .where(_logs.c.project_id == _projects.c.id)
+        .scalar_subquery()
+    )
+    stmt = update(_projects).values(
+        log_count=count, last_log_at=latest, updated_at=_projects.c.updated_at
+    )
+    if project_ids is not None:
+        project_ids = list(project_ids)
+        stmt = stmt.where(_projects.c.id.in_(project_ids))
+    n = db.execute(stmt).rowcount
+    etags.touch_owners_of(db, project_ids)
+    return n
+
+
+def main(argv=None):
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description="Rebuild projects.log_count / last_log_at")
+    parser.add_argument(
+        "--project", type=int, action="append", help="limit to this project id (repeatable)"
+    )
+    parser.add_argument(
+        "--enqueue", action="store_true", help="queue it for the job worker; prints the job id"
+    )
+    args = parser.parse_args(argv)
+
+    if args.enqueue:
+        from . import jobs
+
+        print(f"queued job {jobs.submit('aggregates.reconcile', {'project_ids': args.project})}")
+        return
+
+    with engine.begin() as conn:
+        n = reconcile(conn, args.project)
+    print(f"reconciled {n} project(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,276 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from fastapi import Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import jwt, JWTError
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .database import SessionLocal
+
+from . import database
+from .cache import project_cache
+from .database import get_async_db, get_db, use_replica_async
 from .models import User
-from passlib.context import CryptContext
-import os
+from .passwords import pwd, verify_password, verify_password_async  # noqa: F401 (pwd re-exported)
 
 SECRET = os.getenv("JWT_SECRET", "change-me")
 ALGO = "HS256"
 ACCESS_MIN = int(os.getenv("JWT_MINUTES", "60"))
-pwd = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Token -> user cache (AUTH_CACHE_SIZE=0 disables it). A change to a user drops their
+# entries in this worker at once; with CACHE_BACKEND=redis the other workers see it on
+# their next lookup too. With memory/none they may keep serving the old row for up to
+# AUTH_CACHE_SECONDS.
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_SECONDS = int(os.getenv("AUTH_CACHE_SECONDS", "60"))
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+# Anything else is a write: the user's reads stay on the primary for DB_REPLICA_STICKY
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+# ---------- Token cache ----------
+class TokenCache:
+    """Bounded LRU of bearer token -> resolved user.
+
+    Entries live for at most `ttl` seconds and never past the token's own `exp`,
+    so a cache hit skips both jwt.decode and the users lookup.
+
+    With a shared `store` (cache.RedisBackend) each entry also remembers the user's
+    version key (auth:v:{username}) as it was before the user was looked up;
+    evict_user() replaces that key, so a hit in any worker whose version no longer
+    matches is a miss. A store that can't be read means a miss too: the users lookup
+    answers instead.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, store=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.store_errors = 0
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, tuple[float, dict, bytes | None]] = OrderedDict()
+
+    def version(self, username: str):
+        """The user's shared version (None: never changed), or _UNKNOWN; for put()."""
+        if self.store is None:
+            return None
+        try:
+            return self.store.get(f"auth:v:{username}")
+        except Exception:
+            self.store_errors += 1
+            return _UNKNOWN
+
+    def get(self, token: str) -> dict | None:
+        with self._lock:
+            entry = self._data.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user, version = entry
+            if expires_at <= time.monotonic():
+                del self._data[token]
+                self.misses += 1
+                return None
+        # outside the lock: a round trip to redis
+        if self.store is not None and self.version(user["username"]) != version:
+            with self._lock:
+                self._data.pop(token, None)
+                self.misses += 1
+            return None
+        with self._lock:
+            if token in self._data:
+                self._data.move_to_end(token)
+            self.hits += 1
+        return user
+
+    def put(self, token: str, user: User, exp: float | None, version=None):
+        """Cache user for token; version is version(username) from before the lookup,
+        so a change committed in between leaves the entry already outdated."""
+        if self.maxsize <= 0 or version is _UNKNOWN:
+            return
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        if exp is not None:
+            # exp is wall-clock epoch seconds; translate it onto the monotonic clock
+            expires_at = min(expires_at, now + (exp - time.time()))
+        if expires_at <= now:
+            return
+        snapshot = {"id": user.id, "username": user.username, "email": user.email}
+        with self._lock:
+            self._data[token] = (expires_at, snapshot, version)
+            self._data.move_to_end(token)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def evict_user(self, user_id: int, usernames=()):
+        """Drop the user's entries here, and via `usernames` in the other workers."""
+        with self._lock:
+            stale = [t for t, (_, u, _) in self._data.items() if u["id"] == user_id]
+            for t in stale:
+                del self._data[t]
+        if self.store is None:
+            return
+        for username in usernames:
+            # outlives any entry cached under the old version
+            try:
+                self.store.set(f"auth:v:{username}", uuid.uuid4().hex[:12].encode(), self.ttl)
+            except Exception:
+                self.store_errors += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.store is not None,
+                "store_errors": self.store_errors,
+            }
+
+
+_UNKNOWN = object()
+_PENDING = "auth_evict"  # Session.info key: {user id: usernames} to evict on commit
+token_cache = TokenCache(
+    AUTH_CACHE_SIZE,
+    AUTH_CACHE_SECONDS,
+    store=project_cache.backend if getattr(project_cache.backend, "shared", False) else None,
+)
+
+
+# Any change to a user row drops their cached tokens: here at once, and everywhere
+# once it commits (a worker re-caching the row before that would get the old one)
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_cached_user(_mapper, _connection, target):
+    # a rename leaves cached entries under the old name
+    usernames = {target.username, *inspect(target).attrs.username.history.deleted}
+    session = Session.object_session(target)
+    if session is None:
+        token_cache.evict_user(target.id, usernames)
+        return
+    token_cache.evict_user(target.id)
+    session.info.setdefault(_PENDING, {}).setdefault(target.id, set()).update(usernames)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed(session):
+    for user_id, usernames in session.info.pop(_PENDING, {}).items():
+        token_cache.evict_user(user_id, usernames)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop(_PENDING, None)
 
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
 
 def authenticate(db: Session, username: str, password: str):
     user = db.query(User).filter(User.username == username).first()
-    if not user or not pwd.verify(password, user.password):
+    if not user:
+        return None
+    ok, new_hash = verify_password(password, user.password)
+    if not ok:
+        return None
+    if new_hash:
+        # stored hash used old rounds or another scheme: upgrade it now we know the password
+        user.password = new_hash
+        db.commit()
+    return user
+
+
+async def authenticate_async(db: AsyncSession, username: str, password: str):
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    if not user:
+        return None
+    ok, new_hash = await verify_password_async(password, user.password)
+    if not ok:
         return None
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
     return user
 
+
 def create_access_token(sub: str):
     exp = datetime.utcnow() + timedelta(minutes=ACCESS_MIN)
     return jwt.encode({"sub": sub, "exp": exp}, SECRET, algorithm=ALGO)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+
+def decode_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token, SECRET, algorithms=[ALGO])
-        username: str = payload.get("sub")
+        return jwt.decode(token, SECRET, algorithms=[ALGO])
     except JWTError:
-        raise HTTPException(401, "Invalid token")
+        raise HTTPException(401, "Invalid token") from None
+
+
+def _stick_on_write(request: Request, username: str):
+    """A write keeps the user's replica reads on the primary for a while."""
+    if request.method not in READ_METHODS:
+        database.replicas.stick(username)
+
+
+def get_current_user(
+    request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+):
+    cached = token_cache.get(token)
+    if cached is not None:
+        _stick_on_write(request, cached["username"])
+        # detached copy: handlers only read id/username/email
+        return User(**cached)
+    payload = decode_token(token)
+    username: str = payload.get("sub")
+    _stick_on_write(request, username)
+    version = token_cache.version(username)
+    # on the primary: the handler shares this session, and only get_read_db routes
+    # opt into replica reads (a user who just registered isn't on a replica yet anyway)
     user = db.query(User).filter(User.username == username).first()
     if not user:
         raise HTTPException(401, "User not found")
+    token_cache.put(token, user, payload.get("exp"), version)
+    # detached like a cached one, so the handler's commit doesn't expire it into a reload
+    db.expunge(user)
     return user
+
+
+async def get_current_user_async(
+    request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+):
+    cached = token_cache.get(token)
+    if cached is not None:
+        _stick_on_write(request, cached["username"])
+        return User(**cached)
+    payload = decode_token(token)
+    username: str = payload.get("sub")
+    _stick_on_write(request, username)
+    version = token_cache.version(username)
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    if not user:
+        raise HTTPException(401, "User not found")
+    token_cache.put(token, user, payload.get("exp"), version)
+    return user
+
+
+# ---------- Replica reads for handlers ----------
+# GET routes that only read take the request's session from here, set to read from a
+# replica, except right after the user's own write (see replicas.py)
+def get_read_db(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    db.use_replica(current_user.username)
+    return db
+
+
+async def get_async_read_db(
+    current_user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)
+):
+    await use_replica_async(db, current_user.username)
+    return db
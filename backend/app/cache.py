@@ -0,0 +1,349 @@
+# app/cache.py - read-through cache for project reads
+#
+#   CACHE_BACKEND (memory)       memory | redis | none
+#   CACHE_URL (redis://localhost:6379/0)  for CACHE_BACKEND=redis
+#   CACHE_MAX_ENTRIES (10000)    memory backend: LRU bound (redis: set maxmemory +
+#                                an allkeys-lru / volatile-lru policy instead)
+#   CACHE_PROJECT_TTL (60)  CACHE_LIST_TTL (30)   seconds an entry may live
+#   CACHE_LOCK_MS (2000)         redis: how long other workers wait for a key that
+#                                one of them is already filling
+#
+# Entries are finished responses (JSON body + ETag/Last-Modified/cursor headers),
+# stored under a generation token of the project or of the owner's list:
+#     p:p{project_id}:{gen}:{user_id}     l:u{user_id}:{gen}:{query digest}
+#     u:users:{gen}:{query digest}        (GET /users/, invalidated by registration)
+# Every write path already calls etags.touch_owners / touch_owners_of, which queue
+# the owners' lists (and, for touch_owners_of, the projects) for invalidation; the
+# project routes invalidate the projects they change. Once the transaction commits
+# each of those gets a new generation, so older entries are never read again and
+# age out by TTL/LRU. The generation is read before the database is, so a fill
+# racing a commit lands under the old generation rather than outliving it.
+#
+# The memory backend is per process: run several workers with redis (or none),
+# or a worker may keep serving a page another worker changed, for up to the TTL.
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+BACKEND = os.getenv("CACHE_BACKEND", "memory")
+URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+PROJECT_TTL = int(os.getenv("CACHE_PROJECT_TTL", "60"))
+LIST_TTL = int(os.getenv("CACHE_LIST_TTL", "30"))
+LOCK_SECONDS = int(os.getenv("CACHE_LOCK_MS", "2000")) / 1000
+_POLL_SECONDS = 0.01
+_PENDING = "cache_invalidate"  # Session/Connection.info key: scopes to invalidate on commit
+
+
+class Entry(NamedTuple):
+    body: bytes
+    headers: dict
+
+    def encode(self) -> bytes:
+        # json.dumps escapes newlines, so the first one separates headers from body
+        return json.dumps(self.headers).encode() + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "Entry":
+        headers, _, body = raw.partition(b"\n")
+        return cls(body, json.loads(headers))
+
+
+# ---------- Backends ----------
+class MemoryBackend:
+    """Bounded LRU of key -> bytes with a TTL per key."""
+
+    shared = False  # one process: the in-process single-flight is all the locking needed
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, tuple[float | None, bytes]] = OrderedDict()
+
+    def _live(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            value = self._live(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def _put(self, key: str, value: bytes, ttl: float | None):
+        # callers hold self._lock
+        self._data[key] = (time.monotonic() + ttl if ttl else None, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        with self._lock:
+            self._put(key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        # checked and set under one lock, like redis SET NX: only one caller wins
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._put(key, value, ttl)
+        return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self) -> dict:
+        return {
+            "backend": "memory",
+            "entries": len(self._data),
+            "max_entries": self.maxsize,
+            "evictions": self.evictions,
+        }
+
+
+class RedisBackend:
+    """Any redis-py compatible client (redis.Redis, fakeredis.FakeRedis)."""
+
+    shared = True
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        # imported here: redis-py costs ~60 ms of import time that memory/none never need
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package") from None
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5))
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        return bool(self.client.set(key, value, px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def clear(self):
+        self.client.flushdb()
+
+    def info(self) -> dict:
+        return {"backend": "redis", "entries": self.client.dbsize()}
+
+
+def backend_from_env():
+    if BACKEND == "memory":
+        return MemoryBackend(MAX_ENTRIES)
+    if BACKEND == "redis":
+        return RedisBackend.from_url(URL)
+    return None
+
+
+# ---------- Cache ----------
+class Cache:
+    """Read-through cache with per-key single-flight.
+
+    A miss takes a per-key lock, so of many concurrent requests missing the same
+    key only one runs the loader and the rest read what it stored. Shared backends
+    also take a short lock in the backend itself, which does the same across
+    workers. Backend errors count as misses: the database answers instead.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.errors = 0
+        self.invalidations = 0
+        self._counts: dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._flights: dict[str, list] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def _count(self, kind: str, what: str):
+        with self._lock:
+            self._counts.setdefault(kind, Counter())[what] += 1
+
+    def _get(self, key: str):
+        try:
+            return self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            return None
+
+    def _call(self, method: str, *args):
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception:
+            self.errors += 1
+            return None
+
+    # ----- generations -----
+    def generation(self, scope: str) -> str:
+        key = f"gen:{scope}"
+        gen = self._get(key)
+        if gen is None:
+            gen = uuid.uuid4().hex[:12].encode()
+            if not self._call("add", key, gen):
+                # another request (or worker) created it first
+                gen = self._get(key) or gen
+        return gen.decode() if isinstance(gen, bytes) else gen
+
+    def invalidate(self, scopes):
+        for scope in set(scopes):
+            self._call("set", f"gen:{scope}", uuid.uuid4().hex[:12].encode())
+            self.invalidations += 1
+
+    # ----- read-through -----
+    @contextmanager
+    def _flight(self, key: str):
+        with self._lock:
+            slot = self._flights.get(key)
+            if slot is None:
+                slot = self._flights[key] = [threading.Lock(), 0]
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self._flights[key]
+
+    def _wait_for(self, key: str):
+        deadline = time.monotonic() + LOCK_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(_POLL_SECONDS)
+            raw = self._get(key)
+            if raw is not None:
+                return raw
+        return None
+
+    def fetch(self, kind: str, scope: str, part, loader, ttl: float) -> Entry:
+        """Cached Entry for (kind, scope, part), or loader()'s, which is then stored.
+
+        Exceptions from loader (e.g. a 404) propagate and nothing is cached.
+        """
+        key = f"{kind}:{scope}:{self.generation(scope)}:{part}"
+        raw = self._get(key)
+        if raw is not None:
+            self._count(kind, "hits")
+            return Entry.decode(raw)
+        self._count(kind, "misses")
+        with self._flight(key):
+            raw = self._get(key)
+            locked = False
+            if raw is None and self.backend.shared:
+                locked = self._call("add", f"lock:{key}", b"1", LOCK_SECONDS)
+                if not locked:
+                    raw = self._wait_for(key)
+            if raw is not None:
+                self._count(kind, "coalesced")
+                return Entry.decode(raw)
+            try:
+                entry = loader()
+                self._call("set", key, entry.encode(), ttl)
+                self._count(kind, "fills")
+            finally:
+                if locked:
+                    self._call("delete", f"lock:{key}")
+            return entry
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        out = {"enabled": self.enabled, "errors": self.errors, "invalidations": self.invalidations}
+        if self.enabled:
+            out.update(self._call("info") or {})
+        with self._lock:
+            counts = {kind: dict(c) for kind, c in self._counts.items()}
+        for c in counts.values():
+            lookups = c.get("hits", 0) + c.get("misses", 0)
+            c["hit_rate"] = round(c.get("hits", 0) / lookups, 4) if lookups else None
+        out["kinds"] = counts
+        return out
+
+
+project_cache = Cache(backend_from_env())
+
+
+# ---------- Invalidation ----------
+def _queue(db, scopes):
+    # db is a Session (deferred to after_commit) or a Connection, as used by
+    # maintenance jobs (deferred to its commit); both drop them on rollback
+    if not project_cache.enabled or not scopes:
+        return
+    db.info.setdefault(_PENDING, set()).update(scopes)
+
+
+def invalidate_owners(db, user_ids):
+    """Invalidate these users' cached list pages when db's transaction commits."""
+    _queue(db, [f"u{i}" for i in user_ids])
+
+
+def invalidate_projects(db, project_ids):
+    """Invalidate these cached projects when db's transaction commits."""
+    _queue(db, [f"p{i}" for i in project_ids])
+
+
+def invalidate_users(db):
+    """Invalidate the cached GET /users/ pages when db's transaction commits."""
+    _queue(db, ["users"])
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    scopes = session.info.pop(_PENDING, None)
+    if scopes:
+        project_cache.invalidate(scopes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop(_PENDING, None)
+
+
+# Core connections have no after-commit hook; "commit" fires just before the COMMIT
+@event.listens_for(Engine, "commit")
+def _invalidate_connection_commit(conn):
+    scopes = conn.info.pop(_PENDING, None)
+    if scopes:
+        project_cache.invalidate(scopes)
+
+
+@event.listens_for(Engine, "rollback")
+def _forget_connection_rollback(conn):
+    conn.info.pop(_PENDING, None)
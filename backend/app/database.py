@@ -1,12 +1,215 @@
-#Database.py - Handles database connection and session management
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+# Database.py - Handles database connection and session management
+# Engines are created on first use, not at import: importing the app (workers, tests,
+# --reload, alembic) never touches the database. The lifespan in main.py creates and
+# warms them at startup; `database.engine` / `database.async_engine` still work.
+# Sessions are RoutingSessions: on the primary unless a route opts into replica reads
+# (DATABASE_REPLICA_URLS, see replicas.py).
 import os
-#Reads database URL from environment variable (docker-compose.yml)
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+
+from .cache import project_cache
+from .dbpool import PoolStats, engine_options
+from .replicas import REPLICA_URLS, ReplicaSet
+
+# Reads database URL from environment variable (docker-compose.yml)
 DATABASE_URL = os.getenv("DATABASE_URL")
-#Creates a session factory - used to interact with the database
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-#Class for all ORM Models(User, Project, etc....)
+# DB_ASYNC=1 serves projects/users/auth from async handlers on an AsyncEngine
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+# Pool size/overflow/timeout/recycle/pre-ping come from DB_POOL_* (see dbpool.py)
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+# Class for all ORM Models(User, Project, etc....)
 Base = declarative_base()
+
+_lock = threading.Lock()
+_engine = None
+_async_engine = None
+_async_sessions = None
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync driver URL onto its asyncio driver (psycopg2 -> asyncpg, sqlite -> aiosqlite)."""
+    scheme, sep, rest = url.partition("://")
+    driver = {
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+        "sqlite": "sqlite+aiosqlite",
+    }.get(scheme, scheme)
+    return driver + sep + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    DATABASE_URL and to_async_url(DATABASE_URL)
+)
+# Read replicas; empty unless DATABASE_REPLICA_URLS is set. A shared cache backend
+# (redis) also shares read-your-writes stickiness between workers.
+replicas = ReplicaSet(
+    REPLICA_URLS,
+    to_async=to_async_url,
+    store=project_cache.backend if getattr(project_cache.backend, "shared", False) else None,
+)
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise RuntimeError("DATABASE_URL is not set")
+                _engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, pool_stats))
+    return _engine
+
+
+def get_async_engine():
+    """The AsyncEngine, or None outside DB_ASYNC mode (so sync deployments don't need asyncpg)."""
+    global _async_engine, _async_sessions
+    if _async_engine is None and DB_ASYNC:
+        with _lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(
+                    ASYNC_DATABASE_URL,
+                    **engine_options(ASYNC_DATABASE_URL, async_pool_stats, is_async=True),
+                )
+                _async_sessions = async_sessionmaker(
+                    _async_engine,
+                    autoflush=False,
+                    expire_on_commit=False,
+                    sync_session_class=RoutingSession,
+                )
+    return _async_engine
+
+
+_UNSET = object()
+
+
+class RoutingSession(Session):
+    """A Session that can send its plain SELECTs to a read replica.
+
+    Off until use_replica(); then each SELECT goes to the replica picked for `key`
+    (the signed-in username, for read-your-writes), chosen on the first read so a
+    session never spans two replicas. Flushes, DML, SELECT ... FOR UPDATE, raw
+    connection() use and an explicit begin() go to the primary and pin the session
+    there for the rest of its life, so it reads back what it wrote.
+    """
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._read_key = None
+        self._reading = False
+        self._replica = _UNSET
+        self._pinned = False
+
+    def use_replica(self, key=None, engine=_UNSET):
+        """Route plain reads to a replica for `key` (or to `engine`, if already picked)."""
+        if self._reading:
+            return
+        self._reading = True
+        self._read_key = key
+        if engine is not _UNSET:
+            self._replica = engine
+
+    def use_primary(self):
+        self._pinned = True
+
+    @property
+    def on_replica(self) -> bool:
+        return self._reading and not self._pinned and self._replica not in (None, _UNSET)
+
+    def begin(self, *args, **kw):
+        self._pinned = True
+        return super().begin(*args, **kw)
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._reading and not self._pinned:
+            if self._flushing or (
+                clause is not None
+                and (not clause.is_select or getattr(clause, "_for_update_arg", None) is not None)
+            ):
+                self._pinned = True
+            else:
+                if self._replica is _UNSET:
+                    self._replica = replicas.pick(self._read_key)
+                if self._replica is not None:
+                    # clause=None is get_bind() for the dialect: reading, so no pin
+                    return self._replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def connection(self, *args, **kw):
+        self._pinned = True
+        return super().connection(*args, **kw)
+
+
+class _LazySessionmaker(sessionmaker):
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+# Creates a session factory - used to interact with the database
+SessionLocal = _LazySessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+
+def __getattr__(name):
+    # engine / async_engine / AsyncSessionLocal are built on first access
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "AsyncSessionLocal":
+        get_async_engine()
+        return _async_sessions
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def dispose_after_fork():
+    """In a freshly forked worker: drop pooled connections inherited from the parent.
+
+    close=False leaves the sockets alone (they still belong to the parent) and just
+    forgets them, so the worker opens its own on first use. With the engines lazy
+    the parent usually has none; this covers anything that connected before fork.
+    """
+    if _engine is not None:
+        _engine.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+    replicas.dispose(close=False)
+
+
+# ---------- Request-scoped sessions ----------
+# Every route and get_current_user depend on the same get_db, so FastAPI makes one
+# session per request and hands it to all of them. It reads the primary unless the
+# route takes it through auth.get_read_db. A Session checks a connection out
+# on its first query, not when it's created, so a request answered from the token and
+# project caches never touches the pool, and any other request holds one connection.
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    get_async_engine()
+    async with _async_sessions() as db:
+        yield db
+
+
+def read_session(key=None) -> RoutingSession:
+    """A session whose plain reads go to a replica (primary while `key` is sticky)."""
+    db = SessionLocal()
+    db.use_replica(key)
+    return db
+
+
+async def use_replica_async(db: AsyncSession, key=None):
+    """use_replica() for an AsyncSession: its replica's async engine is picked here."""
+    session = db.sync_session
+    if isinstance(session, RoutingSession) and not session._reading:
+        session.use_replica(key, replicas.pick_async(key))
@@ -0,0 +1,155 @@
+# app/dbpool.py - connection pool settings and instrumentation
+#
+# Pool sizing comes from the environment so it can be tuned per deployment:
+#   DB_POOL_SIZE (5)  DB_MAX_OVERFLOW (10)  DB_POOL_TIMEOUT seconds (30)
+#   DB_POOL_RECYCLE seconds (-1 = never)  DB_POOL_PRE_PING (0)
+#   DB_STATEMENT_TIMEOUT_MS (0 = none; Postgres only)
+# Every checkout is timed. "wait" only counts checkouts that found the pool
+# exhausted and had to queue for a connection; "checkout" is every checkout,
+# including the time to open a new connection. "queued" is how many are waiting
+# right now (admission control in ratelimit.py sheds load on it).
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0") == "1"
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        i = 0
+        while i < len(self.buckets) and seconds > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, n in zip((*self.buckets, "+Inf"), self.counts, strict=True):
+            running += n
+            cumulative[str(bound)] = running
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.sum, 6),
+            "max_seconds": round(self.max, 6),
+            "mean_seconds": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": cumulative,
+        }
+
+
+class PoolStats:
+    """Checkout timings for one engine's pool; survives pool.recreate()/dispose()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queued = 0  # a gauge: reset() leaves it alone
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkout = Histogram()
+            self.wait = Histogram()
+            self.timeouts = 0
+
+    def enqueue(self, n: int):
+        with self._lock:
+            self.queued += n
+
+    def record(self, seconds: float, waited: bool):
+        with self._lock:
+            self.checkout.observe(seconds)
+            if waited:
+                self.wait.observe(seconds)
+
+    def timed_out(self, seconds: float):
+        with self._lock:
+            self.timeouts += 1
+            self.wait.observe(seconds)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": getattr(pool, "_max_overflow", None),
+                "timeouts": self.timeouts,
+                "queued": self.queued,
+                "wait": self.wait.snapshot(),
+                "checkout": self.checkout.snapshot(),
+            }
+
+
+class _TimedCheckout:
+    # set per engine by timed_pool(); a class attribute so recreated pools keep it
+    stats: PoolStats
+
+    def _do_get(self):
+        # exhausted: nothing idle and no overflow slot left, so this checkout queues
+        waited = (
+            self.checkedin() == 0
+            and self._max_overflow > -1
+            and self._overflow >= self._max_overflow
+        )
+        t0 = time.perf_counter()
+        if waited:
+            self.stats.enqueue(1)
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timed_out(time.perf_counter() - t0)
+            raise
+        finally:
+            if waited:
+                self.stats.enqueue(-1)
+        self.stats.record(time.perf_counter() - t0, waited)
+        return conn
+
+
+def timed_pool(stats: PoolStats, is_async: bool = False):
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    return type(f"Timed{base.__name__}", (_TimedCheckout, base), {"stats": stats})
+
+
+def engine_options(url: str | None, stats: PoolStats, is_async: bool = False) -> dict:
+    """Keyword arguments for create_engine/create_async_engine built from the DB_POOL_* settings."""
+    opts = dict(
+        poolclass=timed_pool(stats, is_async),
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+    )
+    connect_args = {}
+    if url and url.startswith("sqlite"):
+        # SQLite (local tests/benchmarks) needs to be shared across the threadpool
+        connect_args["check_same_thread"] = False
+    elif url and url.startswith("postgresql") and STATEMENT_TIMEOUT_MS:
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"
+    opts["connect_args"] = connect_args
+    return opts
@@ -0,0 +1,146 @@
+# app/etags.py - conditional GETs for project reads
+#
+# GET /projects/{id}: ETag from projects.version, Last-Modified from updated_at.
+# GET /projects/:     ETag from users.projects_version plus the query string.
+# Both stamps are read with a one-column lookup, so a matching If-None-Match /
+# If-Modified-Since is answered with 304 before any project row is fetched or
+# serialized. projects.version moves by itself on every UPDATE (see models.py);
+# every write path that creates, changes or removes projects (or their log
+# counters) calls touch_owners / touch_owners_of in the same transaction. The same
+# calls invalidate the matching entries of the read-through cache (app/cache.py).
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from sqlalchemy import select, update
+
+from . import models
+from .cache import Entry, invalidate_owners, invalidate_projects, project_cache
+
+_users = models.User.__table__
+_projects = models.Project.__table__
+
+# no-cache: the browser may keep the body but must revalidate (cheap 304) every time
+CACHE_CONTROL = "private, no-cache"
+
+
+# ---------- Version stamps ----------
+def touch_owners(db, user_ids):
+    """Bump the projects_version of these users; db is a Session or Connection."""
+    ids = sorted(set(user_ids))
+    if ids:
+        db.execute(
+            update(_users)
+            .where(_users.c.id.in_(ids))
+            .values(projects_version=_users.c.projects_version + 1)
+        )
+        invalidate_owners(db, ids)
+
+
+def touch_owners_of(db, project_ids=None):
+    """Bump the owners of these projects (all users when project_ids is None)."""
+    stmt = update(_users).values(projects_version=_users.c.projects_version + 1)
+    if project_ids is not None:
+        ids = sorted(set(project_ids))
+        if not ids:
+            return
+        owners = select(_projects.c.owner_id).where(_projects.c.id.in_(ids))
+        stmt = stmt.where(_users.c.id.in_(owners))
+    if not project_cache.enabled:
+        db.execute(stmt)
+        return
+    invalidate_owners(db, db.execute(stmt.returning(_users.c.id)).scalars().all())
+    if project_ids is None:
+        project_ids = db.execute(select(_projects.c.id)).scalars().all()
+    invalidate_projects(db, project_ids)
+
+
+def project_stamp(project_id: int, owner_id: int):
+    """(version, updated_at) of one owned project, without loading the row."""
+    return select(_projects.c.version, _projects.c.updated_at).where(
+        _projects.c.id == project_id,
+        _projects.c.owner_id == owner_id,
+        _projects.c.deleted_at.is_(None),
+    )
+
+
+def list_stamp(user_id: int):
+    return select(_users.c.projects_version).where(_users.c.id == user_id)
+
+
+# ---------- HTTP ----------
+def project_etag(project_id: int, version: int, logs: int = 0) -> str:
+    # ?include=logs is another representation of the same project
+    return f'"p{project_id}.{version}.l{logs}"' if logs else f'"p{project_id}.{version}"'
+
+
+def query_digest(request: Request) -> str:
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    return hashlib.sha1(query.encode()).hexdigest()[:12]
+
+
+def list_etag(user_id: int, version: int, request: Request) -> str:
+    # the same stamp serves every page/search, so the query string is part of the tag
+    return f'"u{user_id}.{version}.{query_digest(request)}"'
+
+
+def _utc(ts: datetime) -> datetime:
+    # SQLite hands back naive UTC
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # weak comparison, as If-None-Match requires
+    return etag in {t.strip().removeprefix("W/") for t in header.split(",")}
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        # If-None-Match wins; If-Modified-Since is only looked at without it
+        return _etag_matches(inm, etag)
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        # HTTP dates have whole-second precision
+        return _utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def cache_headers(etag: str, last_modified: datetime | None = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            _utc(last_modified).astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: datetime | None = None) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
+
+
+def cached_response(request: Request, entry: Entry) -> Response:
+    """Replay a cached response: a 304 if the client already has it, else the body."""
+    etag = entry.headers.get("ETag")
+    last_modified = entry.headers.get("Last-Modified")
+    if etag and not_modified(
+        request, etag, parsedate_to_datetime(last_modified) if last_modified else None
+    ):
+        keep = {"ETag", "Cache-Control", "Last-Modified"}
+        return Response(
+            status_code=304, headers={k: v for k, v in entry.headers.items() if k in keep}
+        )
+    return Response(entry.body, media_type="application/json", headers=entry.headers)
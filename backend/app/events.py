@@ -0,0 +1,457 @@
+# app/events.py - change feed behind GET /events (server-sent events)
+#
+#   EVENTS_QUEUE (256)            events buffered per subscriber; a consumer that falls
+#                                 this far behind is disconnected and can resume
+#   EVENTS_HISTORY (10000)        recent events kept in memory for resuming
+#   EVENTS_MAX_SUBSCRIBERS (10000)  open streams per worker; past it /events is 503
+#   EVENTS_HEARTBEAT (15)         seconds between keep-alive comments on idle streams
+#   EVENTS_LOG_LINES (20)         log lines carried by a log event (count is exact)
+#   EVENTS_TICKET_SECONDS (30)    lifetime of a stream ticket (POST /events/ticket)
+#   EVENTS_BACKEND (memory)       memory | redis (one feed across all workers)
+#   EVENTS_URL (CACHE_URL)        for EVENTS_BACKEND=redis
+#
+# Events go to the owner's subscribers, or to those following one of their projects:
+#   project.created / project.updated   data: the project (ProjectOut)
+#   project.deleted                     data: {"id"}
+#   projects.batch                      data: {"op", "ids"}; one per batch call
+#   logs.created                        data: {"project_id", "count", "lines": [...]}
+# Publishing happens after the write commits: routes publish once they have the
+# committed row, write_logs() queues on the session (published on commit, dropped
+# on rollback) since it runs inside other callers' transactions.
+#
+# Every event goes into the history, watched or not, so a client that was away can
+# catch up. Ids are "<process epoch>-<sequence>". A client reconnecting with
+# Last-Event-ID gets what it missed from the history; if that id is from a restart or
+# older than the history, it gets a "reset" event and should refetch.
+#
+# With EVENTS_BACKEND=memory the broker, its history and the stream tickets live in
+# one process, so the feed is only served when that process handles every write:
+# with WEB_CONCURRENCY > 1 the /events routes answer 503. With EVENTS_BACKEND=redis
+# every worker appends its events to one redis stream (trimmed to about
+# EVENTS_HISTORY) and reads them all back into its own broker; the stream's ids are
+# the event ids, the same in every worker, and tickets are kept in redis, so a client
+# can get its ticket from one worker and stream or resume from another.
+import asyncio
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import uuid
+from collections import deque
+from typing import NamedTuple
+
+from sqlalchemy import event as sa_event
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models, responses
+
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE", "256"))
+HISTORY = int(os.getenv("EVENTS_HISTORY", "10000"))
+MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "10000"))
+HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+LOG_LINES = int(os.getenv("EVENTS_LOG_LINES", "20"))
+TICKET_SECONDS = float(os.getenv("EVENTS_TICKET_SECONDS", "30"))
+BACKEND = os.getenv("EVENTS_BACKEND", "memory")
+URL = os.getenv("EVENTS_URL") or os.getenv("CACHE_URL", "redis://localhost:6379/0")
+# gunicorn.conf.py sets this to the worker count it actually starts
+WORKERS = int(os.getenv("WEB_CONCURRENCY") or "1")
+
+log = logging.getLogger(__name__)
+
+EPOCH = uuid.uuid4().hex[:8]
+_PENDING = "events_pending"  # Session.info key: events to publish on commit
+
+
+class Event(NamedTuple):
+    seq: int  # this process's numbering, in delivery order
+    user_id: int
+    project_id: int | None
+    event_id: str
+    frame: bytes  # the whole SSE message, encoded once for every subscriber
+
+
+class Subscriber:
+    __slots__ = ("user_id", "project_id", "queue", "wake", "last_seq", "closed")
+
+    def __init__(self, user_id: int, project_id: int | None, last_seq: int):
+        self.user_id = user_id
+        self.project_id = project_id
+        self.queue: deque[Event] = deque()
+        self.wake = asyncio.Event()
+        self.last_seq = last_seq
+        self.closed: str | None = None  # set when the subscriber fell too far behind
+
+    def offer(self, event: Event, limit: int) -> bool:
+        """Queue an event; False when the subscriber is too far behind to keep."""
+        if event.seq <= self.last_seq or (
+            self.project_id is not None and event.project_id != self.project_id
+        ):
+            return True
+        if len(self.queue) >= limit:
+            return False
+        self.queue.append(event)
+        self.last_seq = event.seq
+        self.wake.set()
+        return True
+
+
+class RedisRelay:
+    """Carries events between workers through a redis stream (EVENTS_BACKEND=redis).
+
+    send() only queues: a writer thread appends them in order, so publishing never
+    waits on redis. A reader thread loads the stream's tail into the broker's history,
+    then follows the stream and delivers every event, this worker's own included.
+    """
+
+    KEY = "events:stream"
+
+    def __init__(self, client, history: int = HISTORY, block_ms: int = 1000):
+        self.client = client
+        self.history = history
+        self.block_ms = block_ms
+        self.errors = 0
+        self._out: queue.SimpleQueue = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def send(self, user_id: int, kind: str, body: bytes, project_id: int | None):
+        self._out.put(
+            {"u": user_id, "k": kind, "p": "" if project_id is None else project_id, "d": body}
+        )
+
+    def start(self, deliver):
+        """Start the writer and reader threads, once (and again in a forked worker)."""
+        if self._threads:
+            return
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._write, name="events-write", daemon=True),
+            threading.Thread(
+                target=self._read, args=(deliver, self._stop), name="events-read", daemon=True
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Send what's queued, then stop both threads."""
+        threads, self._threads = self._threads, []
+        if threads:
+            self._stop.set()
+            self._out.put(None)
+            for thread in threads:
+                thread.join(5)
+
+    def _write(self):
+        while (fields := self._out.get()) is not None:
+            try:
+                self.client.xadd(self.KEY, fields, maxlen=self.history, approximate=True)
+            except Exception:
+                self.errors += 1
+                log.warning("event not relayed: %s", fields["k"], exc_info=True)
+
+    def _read(self, deliver, stop: threading.Event):
+        last = None
+        while not stop.is_set():
+            try:
+                if last is None:
+                    tail = self.client.xrevrange(self.KEY, count=self.history)
+                    last, entries = (tail[0][0] if tail else b"0-0"), reversed(tail)
+                else:
+                    got = self.client.xread({self.KEY: last}, block=self.block_ms)
+                    entries = got[0][1] if got else ()
+                for entry_id, fields in entries:
+                    last = entry_id
+                    project_id = fields[b"p"]
+                    deliver(
+                        entry_id.decode(),
+                        int(fields[b"u"]),
+                        fields[b"k"].decode(),
+                        fields[b"d"],
+                        int(project_id) if project_id else None,
+                    )
+            except Exception:
+                self.errors += 1
+                log.warning("event stream read failed, retrying", exc_info=True)
+                stop.wait(1)
+
+
+class Broker:
+    """Fan-out: publish from any thread, deliver on the event loop.
+
+    Without a relay, events are numbered and delivered in this process; with one,
+    they go through it and come back (from every worker) via deliver().
+    """
+
+    def __init__(
+        self,
+        queue_size: int = QUEUE_SIZE,
+        history: int = HISTORY,
+        max_subscribers: int = MAX_SUBSCRIBERS,
+        relay: RedisRelay | None = None,
+    ):
+        self.relay = relay
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._history: deque[Event] = deque(maxlen=history)
+        self._subs: dict[int, set[Subscriber]] = {}
+        self._count = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def subscribers(self) -> int:
+        return self._count
+
+    @property
+    def shared(self) -> bool:
+        return self.relay is not None
+
+    def start(self):
+        if self.relay is not None:
+            self.relay.start(self.deliver)
+
+    def close(self):
+        if self.relay is not None:
+            self.relay.stop()
+
+    def publish(self, user_id: int, kind: str, data, project_id: int | None = None):
+        body = responses.dumps(data)
+        if self.relay is not None:
+            self.relay.send(user_id, kind, body, project_id)
+        else:
+            self.deliver(None, user_id, kind, body, project_id)
+
+    def deliver(
+        self, event_id: str | None, user_id: int, kind: str, body: bytes, project_id: int | None
+    ):
+        """Record one event and hand it to its subscribers; event_id None numbers it here."""
+        with self._lock:
+            self._seq += 1
+            event_id = event_id or f"{EPOCH}-{self._seq}"
+            frame = b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), kind.encode(), body)
+            event = Event(self._seq, user_id, project_id, event_id, frame)
+            self._history.append(event)
+            self.published += 1
+            # scheduled under the lock, so subscribers receive events in sequence order
+            if self._loop is not None and self._subs.get(user_id):
+                self._loop.call_soon_threadsafe(self._fan_out, event)
+
+    def _fan_out(self, event: Event):
+        for sub in list(self._subs.get(event.user_id, ())):
+            if not sub.closed and not sub.offer(event, self.queue_size):
+                self.dropped += 1
+                self._close(sub, "overflow")
+
+    def subscribe(
+        self, user_id: int, project_id: int | None = None, last_event_id: str | None = None
+    ):
+        """Register a subscriber (on the event loop); returns (subscriber, resumed).
+
+        resumed is None without a Last-Event-ID, else whether the missed events could
+        be replayed (False: the client has to refetch).
+        """
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            if self._count >= self.max_subscribers:
+                return None, None
+            last_seq, resumed = self._seq, None
+            if last_event_id:
+                seen = self._find(last_event_id)
+                resumed = seen is not None
+                if resumed:
+                    last_seq = seen
+            sub = Subscriber(user_id, project_id, last_seq)
+            self._subs.setdefault(user_id, set()).add(sub)
+            self._count += 1
+            if resumed:
+                for event in self._history:
+                    if event.user_id == user_id and not sub.offer(event, self.queue_size):
+                        self._close(sub, "overflow")
+                        break
+        return sub, resumed
+
+    def _find(self, event_id: str) -> int | None:
+        """The seq of the event a client saw last, or None when it isn't in the history."""
+        if self.relay is None:
+            # numbered here: the id says where it is
+            epoch, _, seq = event_id.partition("-")
+            oldest = self._history[0].seq if self._history else self._seq + 1
+            ok = epoch == EPOCH and seq.isdigit() and int(seq) >= oldest - 1
+            return int(seq) if ok else None
+        # stream ids: clients resuming were mostly away briefly, so search from the end
+        for event in reversed(self._history):
+            if event.event_id == event_id:
+                return event.seq
+        return None
+
+    def _close(self, sub: Subscriber, reason: str):
+        sub.closed = sub.closed or reason
+        sub.wake.set()
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            subs = self._subs.get(sub.user_id)
+            if subs is not None and sub in subs:
+                subs.discard(sub)
+                self._count -= 1
+                if not subs:
+                    del self._subs[sub.user_id]
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self._count,
+            "published": self.published,
+            "dropped": self.dropped,
+            "history": len(self._history),
+            "epoch": EPOCH,
+            "backend": "redis" if self.relay is not None else "memory",
+            "relay_errors": self.relay.errors if self.relay is not None else 0,
+        }
+
+
+def _redis_from_env():
+    if BACKEND != "redis":
+        return None
+    # imported here, as in cache.py: memory never needs redis-py
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("EVENTS_BACKEND=redis needs the redis package") from None
+    # longer than the reader's XREAD block
+    return redis.Redis.from_url(URL, socket_timeout=5)
+
+
+_redis = _redis_from_env()
+broker = Broker(relay=RedisRelay(_redis) if _redis is not None else None)
+
+
+class Tickets:
+    """Short-lived, single-use stream tickets: EventSource can't send an Authorization
+    header, and a bearer token in the URL would end up in access logs.
+
+    With a redis client they're kept there (ticket:{ticket}), so any worker redeems them.
+    """
+
+    def __init__(self, ttl: float = TICKET_SECONDS, clock=time.monotonic, client=None):
+        self.ttl = ttl
+        self.clock = clock
+        self.client = client
+        self._lock = threading.Lock()
+        self._tickets: dict[str, tuple[float, int]] = {}
+
+    def issue(self, user_id: int) -> str:
+        ticket = secrets.token_urlsafe(24)
+        if self.client is not None:
+            self.client.set(f"ticket:{ticket}", user_id, px=int(self.ttl * 1000))
+            return ticket
+        now = self.clock()
+        with self._lock:
+            if len(self._tickets) > 10000:
+                self._tickets = {t: v for t, v in self._tickets.items() if v[0] > now}
+            self._tickets[ticket] = (now + self.ttl, user_id)
+        return ticket
+
+    def redeem(self, ticket: str) -> int | None:
+        """The ticket's user id, once; None when unknown, used or expired."""
+        if self.client is not None:
+            user_id = self.client.getdel(f"ticket:{ticket}")
+            return int(user_id) if user_id is not None else None
+        with self._lock:
+            expires_at, user_id = self._tickets.pop(ticket, (0.0, None))
+        return user_id if expires_at > self.clock() else None
+
+
+tickets = Tickets(client=_redis)
+
+
+async def stream(sub: Subscriber, resumed: bool | None, heartbeat: float = HEARTBEAT):
+    """The SSE body for one subscriber; unsubscribes when the client goes away."""
+    try:
+        yield b"retry: 3000\n: connected\n\n"
+        if resumed is False:
+            yield b"event: reset\ndata: {}\n\n"
+        while True:
+            while sub.queue:
+                yield sub.queue.popleft().frame
+            if sub.closed:
+                # the client reconnects with Last-Event-ID and catches up from the history
+                yield b"event: %s\ndata: {}\n\n" % sub.closed.encode()
+                return
+            sub.wake.clear()
+            try:
+                async with asyncio.timeout(heartbeat):
+                    await sub.wake.wait()
+            except TimeoutError:
+                yield b": ping\n\n"
+    finally:
+        broker.unsubscribe(sub)
+
+
+# ---------- Log events ----------
+def _log_payloads(rows: list[dict]) -> dict[int, dict]:
+    out: dict[int, dict] = {}
+    for r in rows:
+        p = out.setdefault(
+            r["project_id"],
+            {"project_id": r["project_id"], "count": 0, "lines": deque(maxlen=LOG_LINES)},
+        )
+        p["count"] += 1
+        p["lines"].append({"message": r["message"], "created_at": r["created_at"]})
+    for p in out.values():
+        p["lines"] = list(p["lines"])
+    return out
+
+
+def logs_written(db: Session, rows: list[dict], owner_id: int | None = None):
+    """Queue logs.created events for these rows, published when db commits."""
+    if not rows:
+        return
+    payloads = _log_payloads(rows)
+    if owner_id is not None:
+        owners = {pid: owner_id for pid in payloads}
+    else:
+        owners = dict(
+            db.execute(
+                select(models.Project.id, models.Project.owner_id).where(
+                    models.Project.id.in_(payloads)
+                )
+            ).all()
+        )
+    pending = db.info.setdefault(_PENDING, [])
+    for pid, payload in payloads.items():
+        if pid in owners:
+            pending.append((owners[pid], "logs.created", payload, pid))
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    for user_id, kind, data, project_id in session.info.pop(_PENDING, ()):
+        broker.publish(user_id, kind, data, project_id)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session):
+    session.info.pop(_PENDING, None)
+
+
+def project_event(user_id: int, kind: str, obj):
+    """Publish project.created/updated for a committed (refreshed) project row."""
+    from .schemas import ProjectOut
+
+    broker.publish(user_id, kind, ProjectOut.model_validate(obj).model_dump(mode="json"), obj.id)
+
+
+def project_deleted(user_id: int, project_id: int):
+    broker.publish(user_id, "project.deleted", {"id": project_id}, project_id)
+
+
+def projects_batch(user_id: int, op: str, ids: list[int]):
+    if ids:
+        broker.publish(user_id, "projects.batch", {"op": op, "ids": ids})
@@ -0,0 +1,172 @@
+# app/ingest.py - high-volume log writes
+#
+# write_logs() is the single bulk write path: COPY on Postgres, multi-row INSERT
+# elsewhere. LogBuffer batches small ingest calls in memory and hands them to
+# write_logs() once LOG_BUFFER_ROWS rows are pending or LOG_BUFFER_SECONDS pass.
+import csv
+import io
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import aggregates, events, models
+from .database import SessionLocal
+
+log = logging.getLogger(__name__)
+
+# LOG_BUFFER=1 acknowledges ingests with 202 and writes them in the background
+LOG_BUFFER = os.getenv("LOG_BUFFER", "0") == "1"
+LOG_BUFFER_ROWS = int(os.getenv("LOG_BUFFER_ROWS", "5000"))
+LOG_BUFFER_SECONDS = float(os.getenv("LOG_BUFFER_SECONDS", "1.0"))
+# beyond this many unflushed rows ingest is refused (503) instead of growing memory
+LOG_BUFFER_MAX_PENDING = int(os.getenv("LOG_BUFFER_MAX_PENDING", "200000"))
+
+_COLUMNS = ("project_id", "message", "created_at")
+
+
+def _copy_rows(db: Session, rows: list[dict]):
+    buf = io.StringIO()
+    # QUOTE_ALL keeps an empty message distinct from NULL in COPY's CSV format
+    writer = csv.writer(buf, quoting=csv.QUOTE_ALL)
+    for r in rows:
+        writer.writerow((r["project_id"], r["message"], r["created_at"].isoformat()))
+    buf.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY logs ({', '.join(_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+
+
+def write_logs(db: Session, rows: list[dict], owner_id: int | None = None) -> int:
+    """Bulk-insert log rows ({project_id, message, created_at}) in the caller's transaction.
+
+    Also bumps the projects' log_count/last_log_at in that same transaction, and
+    queues logs.created events for when it commits (owner_id, if the caller knows
+    it, saves looking the owners up).
+    """
+    if not rows:
+        return 0
+    if db.get_bind().dialect.name == "postgresql":
+        _copy_rows(db, rows)
+    else:
+        # insertmanyvalues: one multi-row INSERT per batch of parameters
+        db.execute(insert(models.Log), rows)
+    aggregates.logs_added(db, rows)
+    events.logs_written(db, rows, owner_id)
+    return len(rows)
+
+
+class LogBuffer:
+    """Thread-safe in-memory queue of log rows, flushed by size or age."""
+
+    def __init__(
+        self, max_rows: int, max_seconds: float, max_pending: int, session_factory=SessionLocal
+    ):
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self.flushed = 0
+        self.failed = 0
+        self._rows: list[dict] = []
+        self._oldest = 0.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, rows: list[dict]) -> bool:
+        """Queue rows; returns False (nothing queued) when the buffer is full."""
+        with self._lock:
+            if len(self._rows) + len(rows) > self.max_pending:
+                return False
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.extend(rows)
+            full = len(self._rows) >= self.max_rows
+            if self._thread is None:
+                self._start()
+        if full:
+            self._wake.set()
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self) -> int:
+        """Write everything queued so far; safe to call from any thread.
+
+        A batch that fails is tried once more, then project by project, so only
+        the rows of a project that still fails (deleted meanwhile, bad data) are
+        dropped, and logged.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            if self._write(rows) or self._write(rows):
+                self.flushed += len(rows)
+                return len(rows)
+            by_project: dict[int, list[dict]] = {}
+            for r in rows:
+                by_project.setdefault(r["project_id"], []).append(r)
+            written = 0
+            for project_id, batch in by_project.items():
+                if self._write(batch):
+                    written += len(batch)
+                else:
+                    self.failed += len(batch)
+                    log.error("log buffer: dropped %d rows for project %s", len(batch), project_id)
+            self.flushed += written
+            return written
+
+    def _write(self, rows: list[dict]) -> bool:
+        db = self.session_factory()
+        try:
+            write_logs(db, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            log.warning("log buffer: writing %d rows failed", len(rows), exc_info=True)
+            return False
+        finally:
+            db.close()
+        return True
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-buffer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                due = (
+                    self._oldest + self.max_seconds - time.monotonic()
+                    if self._rows
+                    else self.max_seconds
+                )
+            if due > 0 and self.pending() < self.max_rows:
+                self._wake.wait(due)
+                self._wake.clear()
+                continue
+            self.flush()
+
+
+log_buffer = LogBuffer(LOG_BUFFER_ROWS, LOG_BUFFER_SECONDS, LOG_BUFFER_MAX_PENDING)
@@ -0,0 +1,472 @@
+# app/jobs.py - background jobs: a queue in the jobs table and the worker that runs it
+#
+#   JOBS_THREADS (4)            jobs one worker process runs at once
+#   JOBS_POLL (1.0)             seconds between polls while the queue is empty
+#   JOBS_LEASE (300)            seconds a running job's lease lasts; the worker renews it
+#                               every poll, so a lapsed one means the worker died and
+#                               the job goes back in the queue (as a failed attempt)
+#   JOBS_MAX_ATTEMPTS (5)       tries before a job is marked failed
+#   JOBS_BACKOFF (5)            seconds before the first retry, doubling per attempt
+#   JOBS_BACKOFF_MAX (600)      cap on that, before +-25% jitter
+#   JOBS_LIMIT_<KIND>           how many of a kind may run at once across all workers,
+#                               e.g. JOBS_LIMIT_PROJECT_DELETE=4 (defaults below)
+#   JOBS_EVERY_<KIND>           seconds between runs of a recurring kind (0 turns it
+#                               off), e.g. JOBS_EVERY_LOGS_RETENTION=3600
+#
+# Routes enqueue() in the transaction of the write they defer, so the job exists only
+# if that commits, and answer 202 with the job; clients poll GET /jobs/{id}.
+# The worker runs beside the API (docker-compose's worker service):
+#   python -m app.jobs                            # work the queue until SIGTERM
+#   python -m app.jobs enqueue search.rebuild     # operator jobs; prints the id
+#   python -m app.jobs enqueue aggregates.reconcile '{"project_ids": [42]}'
+#   python -m app.jobs show 17
+#
+# Kinds (limit):
+#   project.delete (2)        a project and its logs, purged in chunks; DELETE /projects/{id}
+#                             past PROJECT_DELETE_INLINE_LOGS logs
+#   aggregates.reconcile (1)  rebuild projects.log_count / last_log_at
+#   search.rebuild (1)        rebuild the project full-text index (search.py)
+#   logs.retention (1)        create upcoming log partitions, drop expired ones
+#                             (retention.py); recurring, hourly by default
+#
+# Recurring kinds are queued by the workers themselves: while none is queued or
+# running, the next one is queued to run `every` seconds after the last one was due.
+# Handlers must be safe to run again: a worker that dies mid-job leaves the job to be
+# retried once its lease lapses. Per-kind limits are exact within a worker; across
+# workers two claims racing on the last free slot can both win.
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, NamedTuple
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from . import aggregates, cache, etags, events, models, retention, search
+from .database import SessionLocal
+from .retention import purge_project_logs
+
+THREADS = int(os.getenv("JOBS_THREADS", "4"))
+POLL = float(os.getenv("JOBS_POLL", "1.0"))
+LEASE = float(os.getenv("JOBS_LEASE", "300"))
+MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+BACKOFF = float(os.getenv("JOBS_BACKOFF", "5"))
+BACKOFF_MAX = float(os.getenv("JOBS_BACKOFF_MAX", "600"))
+
+UNFINISHED = ("queued", "running")
+_jobs = models.Job.__table__
+
+log = logging.getLogger(__name__)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ---------- Registry ----------
+class Handler(NamedTuple):
+    fn: Callable
+    limit: int
+    every: float = 0  # seconds between runs of a recurring kind, 0 if it isn't one
+
+
+HANDLERS: dict[str, Handler] = {}
+
+
+def handler(kind: str, limit: int = 1, every: float = 0):
+    """Register fn(db, **payload) -> JSON-able result as the handler for `kind`.
+
+    With `every`, workers also queue a run of it (empty payload) every that many seconds.
+    """
+    env = kind.upper().replace(".", "_")
+    limit = int(os.getenv(f"JOBS_LIMIT_{env}", limit))
+    every = float(os.getenv(f"JOBS_EVERY_{env}", every))
+
+    def register(fn):
+        HANDLERS[kind] = Handler(fn, limit, every)
+        return fn
+
+    return register
+
+
+def backoff(attempt: int) -> float:
+    """Seconds to wait after the `attempt`-th failure."""
+    return min(BACKOFF * 2 ** (attempt - 1), BACKOFF_MAX) * random.uniform(0.75, 1.25)
+
+
+# ---------- Enqueueing ----------
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict | None = None,
+    *,
+    owner_id: int | None = None,
+    key: str | None = None,
+    max_attempts: int = MAX_ATTEMPTS,
+) -> models.Job:
+    """Add a job in db's transaction; it can run once that commits.
+
+    With a key, a queued or running job of the same kind and key is returned instead
+    of a second one (e.g. deleting the same project twice).
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    if key is not None:
+        existing = db.scalars(
+            select(models.Job)
+            .where(
+                models.Job.kind == kind, models.Job.key == key, models.Job.status.in_(UNFINISHED)
+            )
+            .limit(1)
+        ).first()
+        if existing is not None:
+            return existing
+    now = utcnow()
+    job = models.Job(
+        kind=kind,
+        key=key,
+        payload=payload or {},
+        owner_id=owner_id,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts,
+        run_at=now,
+        created_at=now,
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def submit(kind: str, payload: dict | None = None) -> int:
+    """Enqueue and commit in a session of its own (CLIs); returns the job id."""
+    with SessionLocal() as db:
+        job = enqueue(db, kind, payload)
+        db.commit()
+        return job.id
+
+
+# ---------- Worker ----------
+class Claimed(NamedTuple):
+    id: int
+    kind: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+
+
+class Worker:
+    """Claims runnable jobs and runs them on a thread pool; drain() runs them inline."""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        threads: int = THREADS,
+        poll: float = POLL,
+        lease: float = LEASE,
+        clock=utcnow,
+        name: str | None = None,
+    ):
+        self.session_factory = session_factory
+        self.threads = threads
+        self.poll = poll
+        self.lease = lease
+        self.clock = clock
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.done = 0
+        self.failed = 0
+        self._running: dict[int, str] = {}  # job id -> kind, for this worker
+        self._claim_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def claim(self) -> Claimed | None:
+        """Mark the next runnable job, of a kind under its limit, as ours; None if there is none."""
+        with self._claim_lock, self.session_factory() as db:
+            now = self.clock()
+            running = dict(
+                db.execute(
+                    select(models.Job.kind, func.count())
+                    .where(models.Job.status == "running")
+                    .group_by(models.Job.kind)
+                ).all()
+            )
+            open_kinds = [k for k, h in HANDLERS.items() if running.get(k, 0) < h.limit]
+            if not open_kinds:
+                return None
+            stmt = (
+                select(models.Job)
+                .where(
+                    models.Job.status == "queued",
+                    models.Job.run_at <= now,
+                    models.Job.kind.in_(open_kinds),
+                )
+                .order_by(models.Job.run_at, models.Job.id)
+                .limit(1)
+            )
+            if db.get_bind().dialect.name == "postgresql":
+                stmt = stmt.with_for_update(skip_locked=True)
+            job = db.scalars(stmt).first()
+            if job is None:
+                return None
+            # conditional, so a job another worker took in between isn't run twice
+            taken = db.execute(
+                update(_jobs)
+                .where(_jobs.c.id == job.id, _jobs.c.status == "queued")
+                .values(
+                    status="running",
+                    locked_by=self.name,
+                    locked_at=now,
+                    attempts=_jobs.c.attempts + 1,
+                )
+            ).rowcount
+            claimed = Claimed(
+                job.id, job.kind, dict(job.payload), job.attempts + 1, job.max_attempts
+            )
+            db.commit()
+            if not taken:
+                return None
+            self._running[claimed.id] = claimed.kind
+            return claimed
+
+    def run(self, job: Claimed):
+        """Run a claimed job and record the outcome."""
+        try:
+            with self.session_factory() as db:
+                result = HANDLERS[job.kind].fn(db, **job.payload)
+                db.commit()
+        except Exception as e:
+            log.exception(
+                "job %s (%s) failed, attempt %s/%s",
+                job.id,
+                job.kind,
+                job.attempts,
+                job.max_attempts,
+            )
+            self._finish(job, error=f"{type(e).__name__}: {e}")
+        else:
+            self._finish(job, result=result)
+        finally:
+            self._running.pop(job.id, None)
+            self._wake.set()
+
+    def _finish(self, job: Claimed, result=None, error: str | None = None):
+        now = self.clock()
+        if error is None:
+            values = {"status": "done", "result": result, "error": None, "finished_at": now}
+            self.done += 1
+        elif job.attempts >= job.max_attempts:
+            values = {"status": "failed", "error": error, "finished_at": now}
+            self.failed += 1
+        else:
+            values = {
+                "status": "queued",
+                "error": error,
+                "run_at": now + timedelta(seconds=backoff(job.attempts)),
+            }
+        with self.session_factory() as db:
+            # only while the lease is still ours; a lapsed one belongs to whoever re-ran it
+            db.execute(
+                update(_jobs)
+                .where(_jobs.c.id == job.id, _jobs.c.locked_by == self.name)
+                .values(locked_by=None, locked_at=None, **values)
+            )
+            db.commit()
+
+    def renew(self):
+        """Extend the leases of the jobs this worker is running."""
+        ids = list(self._running)
+        if ids:
+            with self.session_factory() as db:
+                db.execute(
+                    update(_jobs)
+                    .where(_jobs.c.id.in_(ids), _jobs.c.locked_by == self.name)
+                    .values(locked_at=self.clock())
+                )
+                db.commit()
+
+    def recover(self) -> int:
+        """Requeue (or fail, when out of attempts) running jobs whose lease has lapsed."""
+        now = self.clock()
+        out_of_attempts = _jobs.c.attempts >= _jobs.c.max_attempts
+        with self.session_factory() as db:
+            n = db.execute(
+                update(_jobs)
+                .where(
+                    _jobs.c.status == "running",
+                    _jobs.c.locked_at < now - timedelta(seconds=self.lease),
+                )
+                .values(
+                    status=case((out_of_attempts, "failed"), else_="queued"),
+                    finished_at=case((out_of_attempts, now), else_=None),
+                    run_at=now,
+                    locked_by=None,
+                    locked_at=None,
+                    error="worker lost (lease expired)",
+                )
+            ).rowcount
+            db.commit()
+        if n:
+            log.warning("requeued %s job(s) from lost workers", n)
+        return n
+
+    def schedule(self) -> int:
+        """Queue the next run of each recurring kind that has none queued or running."""
+        now = self.clock()
+        queued = 0
+        with self.session_factory() as db:
+            for kind, h in HANDLERS.items():
+                if not h.every:
+                    continue
+                pending = db.scalar(
+                    select(func.count())
+                    .select_from(_jobs)
+                    .where(_jobs.c.kind == kind, _jobs.c.status.in_(UNFINISHED))
+                )
+                if pending:
+                    continue
+                last = db.scalar(select(func.max(_jobs.c.run_at)).where(_jobs.c.kind == kind))
+                # two workers racing here can both queue one; the handlers are idempotent
+                job = enqueue(db, kind, key=kind)
+                if last is not None:
+                    last = last if last.tzinfo else last.replace(tzinfo=timezone.utc)
+                    job.run_at = max(now, last + timedelta(seconds=h.every))
+                queued += 1
+            db.commit()
+        return queued
+
+    def drain(self) -> int:
+        """Run runnable jobs one at a time in this thread until none are left; returns the count."""
+        n = 0
+        while (job := self.claim()) is not None:
+            self.run(job)
+            n += 1
+        return n
+
+    def serve(self):
+        """Work the queue on `threads` threads until stop(); running jobs are finished first."""
+        log.info("job worker %s: %s thread(s), kinds %s", self.name, self.threads, sorted(HANDLERS))
+        with ThreadPoolExecutor(self.threads, thread_name_prefix="job") as pool:
+            while not self._stop.is_set():
+                self._wake.clear()
+                self.renew()
+                self.recover()
+                self.schedule()
+                while len(self._running) < self.threads and not self._stop.is_set():
+                    job = self.claim()
+                    if job is None:
+                        break
+                    pool.submit(self.run, job)
+                # a finishing job wakes the loop early, to claim the next one
+                self._wake.wait(self.poll)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+# ---------- Job kinds ----------
+def queue_project_delete(db: Session, project: models.Project, owner_id: int) -> models.Job:
+    """A 202 delete: hide the project from its owner now and leave delete_project to a
+    worker. The caller commits, then publishes project.deleted."""
+    project.deleted_at = utcnow()
+    etags.touch_owners(db, [owner_id])
+    cache.invalidate_projects(db, [project.id])
+    return enqueue(
+        db,
+        "project.delete",
+        {"project_id": project.id, "owner_id": owner_id},
+        owner_id=owner_id,
+        key=f"project:{project.id}",
+    )
+
+
+@handler("project.delete", limit=2)
+def delete_project(db: Session, project_id: int, owner_id: int) -> dict:
+    """Purge a project's logs in chunks, then remove the project."""
+    project = db.get(models.Project, project_id)
+    if project is None:
+        return {"deleted": False, "logs": 0}
+    # queued deletes hid the project and told its owner already
+    announced = project.deleted_at is not None
+    # commits per chunk: a retry after a crash carries on where this left off
+    purged = purge_project_logs(db, [project_id])
+    db.execute(
+        delete(models.Project).where(
+            models.Project.id == project_id, models.Project.owner_id == owner_id
+        )
+    )
+    etags.touch_owners(db, [owner_id])
+    cache.invalidate_projects(db, [project_id])
+    db.commit()
+    if not announced:
+        events.project_deleted(owner_id, project_id)
+    return {"deleted": True, "logs": purged}
+
+
+@handler("aggregates.reconcile")
+def reconcile_aggregates(db: Session, project_ids: list[int] | None = None) -> dict:
+    n = aggregates.reconcile(db, project_ids)
+    db.commit()
+    return {"projects": n}
+
+
+@handler("search.rebuild")
+def rebuild_search(db: Session) -> dict:
+    return {"index": search.rebuild_index(db)}
+
+
+@handler("logs.retention", every=3600)
+def apply_retention(db: Session) -> dict:
+    """One retention.run pass, on a connection of its own (it commits per partition)."""
+    with db.get_bind().connect() as conn:
+        result = retention.run(conn)
+    if result["failed"]:
+        # the rest of the pass is done; failing the job retries it and keeps it visible
+        raise RuntimeError(f"retention failed for {', '.join(result['failed'])}")
+    return result
+
+
+# ---------- CLI ----------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Background job worker")
+    sub = parser.add_subparsers(dest="command")
+    work = sub.add_parser("work", help="work the queue (the default)")
+    work.add_argument("--threads", type=int, default=THREADS)
+    add = sub.add_parser("enqueue", help="queue a job and print its id")
+    add.add_argument("kind", choices=sorted(HANDLERS))
+    add.add_argument("payload", nargs="?", default="{}", help="JSON object of handler arguments")
+    show = sub.add_parser("show", help="print a job")
+    show.add_argument("id", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "enqueue":
+        print(submit(args.kind, json.loads(args.payload)))
+    elif args.command == "show":
+        from .schemas import JobOut
+
+        with SessionLocal() as db:
+            job = db.get(models.Job, args.id)
+            print(
+                JobOut.model_validate(job).model_dump_json(indent=2) if job else f"no job {args.id}"
+            )
+    else:
+        logging.basicConfig(
+            level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+        )
+        worker = Worker(threads=getattr(args, "threads", THREADS))
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: worker.stop())
+        worker.serve()
+
+
+if __name__ == "__main__":
+    main()
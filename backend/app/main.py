@@ -1,19 +1,76 @@
-#main.py - Entry point for the FastAPI application
+# main.py - Entry point for the FastAPI application
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from .database import Base, engine
-from .routes import users, projects, auth
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from fastapi.requests import Request
-#Initialize FastAPI app
-app = FastAPI(title="DevLog API")
-#Create all tables in the database during startup (based on model.py definitions)
-Base.metadata.create_all(bind=engine)
-#Includes API route modules
+from starlette.concurrency import run_in_threadpool
+
+from . import database, events, profiling
+from .database import DB_ASYNC
+from .ingest import log_buffer
+from .pagination import NEXT_CURSOR_HEADER
+from .passwords import hasher
+from .ratelimit import AdmissionMiddleware
+from .responses import CompressionMiddleware
+from .routes import events as event_routes
+from .routes import internal, jobs, logs, projects_batch
+from .startup import readiness
+
+# DB_ASYNC=1 swaps in the async handlers for projects/users/auth
+if DB_ASYNC:
+    from .routes import auth_async as auth
+    from .routes import projects_async as projects
+    from .routes import users_async as users
+else:
+    from .routes import auth, projects, users
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Spawn password hashing workers before the first login has to wait for them
+    hasher.start()
+    # Engine, pool warmup and schema check (see startup.py); /ready reports the outcome
+    if profiling.ENABLED:
+        profiling.instrument_engine(database.get_engine())
+        if DB_ASYNC:
+            profiling.instrument_engine(database.get_async_engine().sync_engine)
+        database.replicas.instrument(profiling.instrument_engine)
+    await run_in_threadpool(readiness.prepare)
+    if DB_ASYNC:
+        await readiness.prepare_async()
+    # EVENTS_BACKEND=redis: follow the shared event stream (see events.py)
+    events.broker.start()
+    yield
+    events.broker.close()
+    # Write out any buffered log lines before the worker exits
+    log_buffer.close()
+    hasher.shutdown()
+
+
+# Initialize FastAPI app
+app = FastAPI(title="DevLog API", lifespan=lifespan)
+# Includes API route modules
 app.include_router(users.router)
+app.include_router(projects_batch.router)  # before projects: /projects/batch vs /projects/{id}
 app.include_router(projects.router)
-app.include_router(auth.router)          # ← include router
-#Configure CORS middleware
+app.include_router(auth.router)  # ← include router
+app.include_router(logs.router)
+app.include_router(logs.project_router)
+app.include_router(event_routes.router)
+app.include_router(jobs.router)
+# /internal/* only on request (INTERNAL_METRICS=1); see routes/internal.py
+if os.getenv("INTERNAL_METRICS", "0") == "1":
+    app.include_router(internal.router)
+# gzip/brotli above RESPONSE_MIN_SIZE (see responses.py)
+app.add_middleware(CompressionMiddleware)
+# PROFILING=1: per-route latency/SQL metrics, Server-Timing, slow-request log (see profiling.py)
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+# Shed load with 503 when too many requests are in flight or queued on the pool (see ratelimit.py)
+app.add_middleware(AdmissionMiddleware)
+# Configure CORS middleware
 app.add_middleware(
     CORSMiddleware,
     # allow any localhost/127.0.0.1 port during development:
@@ -21,12 +78,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
-#Custom 404 Error Handler
+
+
+# Custom 404 Error Handler
 @app.exception_handler(404)
 async def not_found(_, __):
     return JSONResponse({"detail": "Not Found"}, status_code=404)
-#Simple Health Check Endpoint
+
+
+# Simple Health Check Endpoint
 @app.get("/")
 def root():
     return {"message": "DevLog API running!"}
+
+
+# Readiness: 200 once startup finished and the database answers, else 503
+@app.get("/ready")
+def ready():
+    ok = readiness.check()
+    return JSONResponse(readiness.status(), status_code=200 if ok else 503)
@@ -1,13 +1,29 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+    literal_column,
+)
 from sqlalchemy.orm import relationship
+
 from .database import Base
 
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
+    # Postgres also has ix_users_username_prefix (varchar_pattern_ops) for prefix search
     username = Column(String(150), unique=True, nullable=False, index=True)
     email = Column(String(255), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
+    # bumped whenever any of the user's projects change; the ETag of GET /projects/
+    projects_version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # one-to-many: User → Projects
     projects = relationship(
@@ -17,6 +33,7 @@ class User(Base):
         passive_deletes=True,
     )
 
+
 class Project(Base):
     __tablename__ = "projects"
     id = Column(Integer, primary_key=True, index=True)
@@ -33,6 +50,35 @@ class Project(Base):
 
     owner = relationship("User", back_populates="projects")
 
+    # denormalized log stats, kept current by app/aggregates.py on every log write/delete
+    log_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_log_at = Column(DateTime(timezone=True))
+
+    # any UPDATE of the row (ORM, bulk or Core) moves both, except that the log
+    # counters only move version (aggregates.py keeps updated_at);
+    # version is the per-project ETag, updated_at the Last-Modified
+    version = Column(
+        Integer,
+        nullable=False,
+        default=1,
+        server_default="1",
+        onupdate=literal_column("projects.version") + 1,
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    # set by a queued (202) delete: gone for its owner at once, while the job worker
+    # purges the logs and removes the row; every owner-scoped read filters on it
+    deleted_at = Column(DateTime(timezone=True))
+
+    # keyset pagination: WHERE owner_id = ? AND id < ? ORDER BY id DESC
+    __table_args__ = (Index("ix_projects_owner_id_id", "owner_id", "id"),)
+
     # one-to-many: Project → Logs
     logs = relationship(
         "Log",
@@ -41,16 +87,53 @@ class Project(Base):
         passive_deletes=True,
     )
 
+
 class Log(Base):
     __tablename__ = "logs"
     id = Column(Integer, primary_key=True, index=True)
 
+    # no standalone index: (project_id, created_at) below already serves project_id lookups
     project_id = Column(
         Integer,
         ForeignKey("projects.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
     message = Column(Text)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     project = relationship("Project", back_populates="logs")
+
+    # per-project time-range reads: WHERE project_id = ? ORDER BY created_at DESC
+    __table_args__ = (Index("ix_logs_project_id_created_at", "project_id", "created_at"),)
+
+
+class Job(Base):
+    """A unit of background work; see app/jobs.py."""
+
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(64), nullable=False)
+    # dedupe: enqueueing a kind+key that is still queued/running returns that job
+    key = Column(String(255))
+    payload = Column(JSON, nullable=False)
+    # who may read it through GET /jobs/{id}; NULL for operator-started jobs
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    # queued|running|done|failed
+    status = Column(String(16), nullable=False, default="queued", server_default="queued")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False, default=5, server_default="5")
+    # not before: now on enqueue, later after a failed attempt (backoff)
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # lease of the worker running it; a lapsed lease puts the job back in the queue
+    locked_by = Column(String(64))
+    locked_at = Column(DateTime(timezone=True))
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        Index("ix_jobs_kind_key", "kind", "key"),
+        Index("ix_jobs_owner_id", "owner_id"),
+    )
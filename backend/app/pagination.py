@@ -0,0 +1,94 @@
+# app/pagination.py - opaque keyset cursors shared by list endpoints
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int, rank: float | None = None, key: str | None = None) -> str:
+    payload = {"id": last_id}
+    if rank is not None:
+        payload["rank"] = rank
+    if key is not None:
+        payload["key"] = key
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _load(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(payload["id"], int):
+            raise ValueError
+        return payload
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def decode_cursor(cursor: str) -> int:
+    return _load(cursor)["id"]
+
+
+def decode_ranked_cursor(cursor: str) -> tuple[float, int]:
+    payload = _load(cursor)
+    if not isinstance(payload.get("rank"), (int, float)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return float(payload["rank"]), payload["id"]
+
+
+def decode_key_cursor(cursor: str) -> str:
+    payload = _load(cursor)
+    if not isinstance(payload.get("key"), str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return payload["key"]
+
+
+def keyset(stmt, id_col, cursor: str | None, rank=None, descending: bool = True):
+    """Seek past `cursor` and apply the matching ORDER BY.
+
+    Without a rank the order is id (desc by default). With a rank column the order is
+    (rank desc, id desc) and the rank is added to the selected columns so the next
+    cursor can carry it; rows then come back as (obj, rank) pairs.
+    """
+    if rank is None:
+        if cursor is not None:
+            last_id = decode_cursor(cursor)
+            stmt = stmt.where(id_col < last_id if descending else id_col > last_id)
+        return stmt.order_by(id_col.desc() if descending else id_col.asc())
+
+    stmt = stmt.add_columns(rank)
+    if cursor is not None:
+        last_rank, last_id = decode_ranked_cursor(cursor)
+        stmt = stmt.where(or_(rank < last_rank, and_(rank == last_rank, id_col < last_id)))
+    return stmt.order_by(rank.desc(), id_col.desc())
+
+
+def keyset_by_key(stmt, key_col, cursor: str | None):
+    """Ascending order on a unique column (e.g. users.username), seeking past `cursor`.
+
+    For prefix searches that walk the column's index instead of sorting every match
+    by id; pair with split_page(..., key=<attribute name>).
+    """
+    if cursor is not None:
+        stmt = stmt.where(key_col > decode_key_cursor(cursor))
+    return stmt.order_by(key_col.asc())
+
+
+def split_page(rows, limit: int, ranked: bool = False, key: str | None = None):
+    """Trim the limit+1 probe row and return (items, next_cursor or None)."""
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if ranked:
+        items = [obj for obj, _ in rows]
+        next_cursor = encode_cursor(rows[-1][0].id, rows[-1][1]) if more else None
+    else:
+        items = list(rows)
+        next_cursor = None
+        if more:
+            next_cursor = encode_cursor(rows[-1].id, key=getattr(rows[-1], key) if key else None)
+    return items, next_cursor
@@ -0,0 +1,129 @@
+# app/passwords.py - password hashing off the request path
+#
+# pbkdf2 is deliberately slow, and passlib holds the GIL while it runs, so hashing
+# in a handler (even in the threadpool) stalls every other request in the worker.
+# Hash/verify calls run in a small process pool instead; at most
+# PASSWORD_MAX_PENDING calls may be queued or running at once and the rest get a
+# 503, so a login storm can't build an unbounded backlog.
+#   PASSWORD_ROUNDS (29000)       pbkdf2_sha256 rounds for new hashes
+#   PASSWORD_WORKERS (2)          hashing processes; 0 hashes in-process as before
+#   PASSWORD_MAX_PENDING (64)     queued + running hash/verify calls
+#   PASSWORD_NICE (10)            niceness of the hashing processes, so request
+#                                 handling wins the CPU when cores are short
+#
+# Hashes with other rounds or from another scheme (bcrypt, as app/seed.py used to
+# write) still verify, and are transparently re-hashed on the next login.
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+PASSWORD_ROUNDS = int(os.getenv("PASSWORD_ROUNDS", "29000"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "64"))
+PASSWORD_NICE = int(os.getenv("PASSWORD_NICE", "10"))
+
+# min == max == default, so any other round count counts as outdated
+pwd = CryptContext(
+    schemes=["pbkdf2_sha256", "bcrypt"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_ROUNDS,
+    pbkdf2_sha256__max_rounds=PASSWORD_ROUNDS,
+)
+
+
+def _hash(password: str) -> str:
+    return pwd.hash(password)
+
+
+def _verify(password: str, hashed: str) -> tuple[bool, str | None]:
+    # (ok, replacement hash when the stored one is outdated)
+    return pwd.verify_and_update(password, hashed)
+
+
+def _warm() -> None:
+    # touching the handler loads passlib's backend in the worker
+    pwd.handler("pbkdf2_sha256")
+
+
+class _Hasher:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs threads (log buffer, threadpool) isn't safe
+                self._pool = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=os.nice,
+                    initargs=(PASSWORD_NICE,),
+                )
+            return self._pool
+
+    def start(self):
+        """Spawn the worker processes now rather than on the first login."""
+        if self.workers > 0:
+            pool = self._executor()
+            for f in [pool.submit(_warm) for _ in range(self.workers)]:
+                f.result()
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                503,
+                "Too many password checks in progress, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _f: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        if self.workers <= 0:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+hasher = _Hasher(PASSWORD_WORKERS, PASSWORD_MAX_PENDING)
+
+
+def hash_password(password: str) -> str:
+    return hasher.run(_hash, password)
+
+
+def verify_password(password: str, hashed: str) -> tuple[bool, str | None]:
+    return hasher.run(_verify, password, hashed)
+
+
+async def hash_password_async(password: str) -> str:
+    return await hasher.run_async(_hash, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> tuple[bool, str | None]:
+    return await hasher.run_async(_verify, password, hashed)
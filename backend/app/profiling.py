@@ -0,0 +1,287 @@
+# app/profiling.py - opt-in request timing and SQL profiling
+#
+#   PROFILING (0)              1 installs the middleware and the engine listeners
+#   PROFILING_SLOW_MS (500)    requests slower than this are logged with their SQL
+#                              totals and most repeated statement; 0 turns it off
+#   PROFILING_REPEAT (5)       one statement run this many times in a request is
+#                              flagged as a likely N+1 (logged and counted)
+#   PROFILING_SERVER_TIMING (1)  add a Server-Timing header (app, db) to responses
+#
+# Per route template (/projects/{project_id}, not the raw path): a latency
+# histogram, SQL statement count and SQL time, slow and N+1 request counters.
+# GET /internal/metrics serves them, plus the pool histograms, in Prometheus text
+# format. SQL is attributed to the request through a context variable, which
+# starlette copies into the threadpool that runs sync handlers and dependencies.
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from .dbpool import Histogram
+
+ENABLED = os.getenv("PROFILING", "0") == "1"
+SLOW_MS = float(os.getenv("PROFILING_SLOW_MS", "500"))
+REPEAT = int(os.getenv("PROFILING_REPEAT", "5"))
+SERVER_TIMING = os.getenv("PROFILING_SERVER_TIMING", "1") == "1"
+
+log = logging.getLogger(__name__)
+
+
+class RequestProfile:
+    __slots__ = ("statements", "sql_seconds", "sql_count")
+
+    def __init__(self):
+        self.statements = Counter()
+        self.sql_seconds = 0.0
+        self.sql_count = 0
+
+    def most_repeated(self):
+        return self.statements.most_common(1)[0] if self.statements else (None, 0)
+
+
+_current: ContextVar[RequestProfile | None] = ContextVar("request_profile", default=None)
+
+
+# ---------- SQL ----------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    starts = conn.info.get("profile_t0")
+    if profile is None or not starts:
+        return
+    profile.sql_seconds += time.perf_counter() - starts.pop()
+    profile.sql_count += 1
+    profile.statements[statement] += 1
+
+
+def instrument_engine(engine):
+    """Attribute this engine's SQL to the current request (async: pass .sync_engine)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------- Metrics ----------
+class RouteStats:
+    __slots__ = ("latency", "sql", "sql_statements", "slow", "repeated")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.sql = Histogram()
+        self.sql_statements = 0
+        self.slow = 0
+        self.repeated = 0
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: dict[tuple[str, str, str], RouteStats] = {}
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        profile: RequestProfile,
+        slow: bool,
+        repeated: bool,
+    ):
+        key = (method, route, f"{status // 100}xx")
+        with self._lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+            stats.latency.observe(seconds)
+            stats.sql.observe(profile.sql_seconds)
+            stats.sql_statements += profile.sql_count
+            stats.slow += slow
+            stats.repeated += repeated
+
+    def prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            routes = sorted(self.routes.items())
+            _histogram(
+                lines,
+                "devlog_request_duration_seconds",
+                "Request latency by route",
+                [(_labels(k), s.latency) for k, s in routes],
+            )
+            _histogram(
+                lines,
+                "devlog_request_sql_seconds",
+                "SQL time per request by route",
+                [(_labels(k), s.sql) for k, s in routes],
+            )
+            _counter(
+                lines,
+                "devlog_sql_statements_total",
+                "SQL statements run by route",
+                [(_labels(k), s.sql_statements) for k, s in routes],
+            )
+            _counter(
+                lines,
+                "devlog_slow_requests_total",
+                f"Requests slower than {SLOW_MS:g} ms",
+                [(_labels(k), s.slow) for k, s in routes],
+            )
+            _counter(
+                lines,
+                "devlog_repeated_sql_requests_total",
+                f"Requests running one statement {REPEAT}+ times (likely N+1)",
+                [(_labels(k), s.repeated) for k, s in routes],
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key) -> dict:
+    method, route, status = key
+    return {"method": method, "route": route, "status": status}
+
+
+def _fmt(labels: dict, extra: dict | None = None) -> str:
+    items = {**labels, **(extra or {})}
+    return (
+        "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items.items()) + "}" if items else ""
+    )
+
+
+def _histogram(lines, name, help_, series):
+    lines += [f"# HELP {name} {help_}", f"# TYPE {name} histogram"]
+    for labels, h in series:
+        running = 0
+        for bound, n in zip((*h.buckets, "+Inf"), h.counts, strict=True):
+            running += n
+            lines.append(f"{name}_bucket{_fmt(labels, {'le': bound})} {running}")
+        lines.append(f"{name}_sum{_fmt(labels)} {h.sum:.6f}")
+        lines.append(f"{name}_count{_fmt(labels)} {h.count}")
+
+
+def _counter(lines, name, help_, series):
+    lines += [f"# HELP {name} {help_}", f"# TYPE {name} counter"]
+    lines += [f"{name}{_fmt(labels)} {value}" for labels, value in series]
+
+
+def pool_prometheus(label: str, stats, pool) -> str:
+    """The pool's checkout/wait histograms (see dbpool.py) in the same format."""
+    lines = []
+    labels = {"engine": label}
+    with stats._lock:
+        _histogram(
+            lines,
+            "devlog_pool_checkout_seconds",
+            "Connection checkout time",
+            [(labels, stats.checkout)],
+        )
+        _histogram(
+            lines,
+            "devlog_pool_wait_seconds",
+            "Checkouts that queued on an exhausted pool",
+            [(labels, stats.wait)],
+        )
+        _counter(
+            lines,
+            "devlog_pool_timeouts_total",
+            "Checkouts that hit DB_POOL_TIMEOUT",
+            [(labels, stats.timeouts)],
+        )
+    lines += [
+        "# TYPE devlog_pool_checked_out gauge",
+        f"devlog_pool_checked_out{_fmt(labels)} {pool.checkedout()}",
+        "# TYPE devlog_pool_queued gauge",
+        f"devlog_pool_queued{_fmt(labels)} {stats.queued}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+# ---------- Middleware ----------
+class ProfilingMiddleware:
+    """Times each request and the SQL it runs; see the module header."""
+
+    def __init__(
+        self,
+        app,
+        slow_ms: float = SLOW_MS,
+        repeat: int = REPEAT,
+        server_timing: bool = SERVER_TIMING,
+    ):
+        self.app = app
+        self.slow_ms = slow_ms
+        self.repeat = repeat
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    app_ms = (time.perf_counter() - t0) * 1000
+                    db_ms = profile.sql_seconds * 1000
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        f"app;dur={app_ms:.1f}, "
+                        f'db;dur={db_ms:.1f};desc="{profile.sql_count} queries"',
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._finish(scope, status, time.perf_counter() - t0, profile)
+
+    def _finish(self, scope, status: int, seconds: float, profile: RequestProfile):
+        # the route template, so /projects/1 and /projects/2 share one series
+        route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+        statement, times = profile.most_repeated()
+        repeated = times >= self.repeat
+        slow = bool(self.slow_ms) and seconds * 1000 >= self.slow_ms
+        metrics.record(scope["method"], route, status, seconds, profile, slow, repeated)
+        if repeated:
+            log.warning(
+                "%s %s ran one statement %d times (N+1?): %s",
+                scope["method"],
+                route,
+                times,
+                " ".join(statement.split())[:300],
+            )
+        if slow:
+            log.warning(
+                "slow request %s %s %d: %.0f ms, %d statements, %.0f ms SQL",
+                scope["method"],
+                scope["path"],
+                status,
+                seconds * 1000,
+                profile.sql_count,
+                profile.sql_seconds * 1000,
+            )
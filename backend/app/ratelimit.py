@@ -0,0 +1,308 @@
+# app/ratelimit.py - per-client rate limits and admission control
+#
+#   RATE_LIMIT (1)                 0 turns the per-client limits off
+#   RATE_LIMIT_BACKEND (memory)    memory | redis (one budget across all workers)
+#   RATE_LIMIT_URL (CACHE_URL)     for RATE_LIMIT_BACKEND=redis
+#   RATE_LIMIT_MAX_KEYS (100000)   memory: LRU bound on tracked clients
+# Budgets are "<requests>/<seconds>": a bucket holding that many tokens, refilled
+# evenly over that many seconds, so a client may burst the whole budget and then
+# gets one request per seconds/requests.
+#   RATE_LIMIT_LOGIN (10/60)       per IP    POST /auth/token (password hashing)
+#   RATE_LIMIT_REGISTER (5/60)     per IP    POST /users/ (password hashing)
+#   RATE_LIMIT_SEARCH (60/60)      per user  GET /projects/?q=... (on top of USER)
+#   RATE_LIMIT_EXPORT (10/60)      per user  GET /projects/{id}/logs/export
+#   RATE_LIMIT_USER (1200/60)      per user  every authenticated route
+# Over budget the route answers 429 with Retry-After, before its handler (and the
+# hashing or the query) runs.
+#
+# Admission control, per worker (AdmissionMiddleware):
+#   ADMIT_MAX_INFLIGHT (256)       requests in progress at once; 0 = unlimited
+#   ADMIT_MAX_POOL_QUEUE (DB_POOL_SIZE + DB_MAX_OVERFLOW)  checkouts already queued
+#                                  on an exhausted pool (dbpool.py); 0 = unlimited
+#   ADMIT_RETRY_AFTER (1)          seconds, sent with the 503
+# Past either limit a new request gets 503 + Retry-After at once, rather than
+# queueing for up to DB_POOL_TIMEOUT behind everyone else. Only / and /ready are
+# always let through; /events streams aren't counted in flight while open.
+#
+# Client IPs come from the connection; behind a proxy, set FORWARDED_ALLOW_IPS (uvicorn
+# and gunicorn honour it) so that's the client and not the proxy.
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import NamedTuple
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from . import database, dbpool
+from .auth import get_current_user
+
+ENABLED = os.getenv("RATE_LIMIT", "1") == "1"
+BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+URL = os.getenv("RATE_LIMIT_URL") or os.getenv("CACHE_URL", "redis://localhost:6379/0")
+MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+MAX_INFLIGHT = int(os.getenv("ADMIT_MAX_INFLIGHT", "256"))
+MAX_POOL_QUEUE = int(os.getenv("ADMIT_MAX_POOL_QUEUE", str(dbpool.POOL_SIZE + dbpool.MAX_OVERFLOW)))
+RETRY_AFTER = int(os.getenv("ADMIT_RETRY_AFTER", "1"))
+# Never shed: liveness/readiness probes and the operational endpoints
+ALWAYS_ADMIT = ("/", "/ready")
+# Long-lived streams: shed like anything else when busy, but not counted as in flight
+LONG_LIVED = ("/events",)
+
+
+class Budget(NamedTuple):
+    requests: int
+    seconds: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "Budget":
+        requests, _, seconds = spec.partition("/")
+        return cls(int(requests), float(seconds or 1))
+
+
+DEFAULT_BUDGETS = {
+    "login": "10/60",
+    "register": "5/60",
+    "search": "60/60",
+    "export": "10/60",
+    "user": "1200/60",
+}
+BUDGETS = {
+    name: Budget.parse(os.getenv(f"RATE_LIMIT_{name.upper()}", spec))
+    for name, spec in DEFAULT_BUDGETS.items()
+}
+
+
+def take(tat: float | None, now: float, budget: Budget) -> tuple[float | None, float]:
+    """One token from a bucket, stored as the time it will be full again (GCRA).
+
+    Returns (new state, 0) when the request may go ahead, or (None, seconds until
+    the next token) when the bucket is empty. One number per client, so a shared
+    store only needs an atomic read-modify-write of a single key.
+    """
+    interval = budget.seconds / budget.requests
+    full_at = max(tat or now, now) + interval
+    if full_at - now > budget.seconds:
+        return None, full_at - now - budget.seconds
+    return full_at, 0.0
+
+
+# ---------- Stores ----------
+class MemoryStore:
+    """Per-process bucket states, LRU-bounded (a dropped client just starts full)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, float] = OrderedDict()
+
+    def take(self, key: str, budget: Budget, now: float) -> float:
+        with self._lock:
+            tat, retry_after = take(self._data.get(key), now, budget)
+            if tat is not None:
+                self._data[key] = tat
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+            return retry_after
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self) -> dict:
+        return {"backend": "memory", "clients": len(self._data), "max_keys": self.maxsize}
+
+
+class RedisStore:
+    """Any redis-py compatible client; WATCH/MULTI makes each take atomic across workers."""
+
+    def __init__(self, client, prefix: str = "rl:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisStore":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package") from None
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5))
+
+    def take(self, key: str, budget: Budget, now: float) -> float:
+        key = self.prefix + key
+
+        def attempt(pipe):
+            raw = pipe.get(key)
+            tat, retry_after = take(float(raw) if raw else None, now, budget)
+            pipe.multi()
+            if tat is not None:
+                # the key is worthless once the bucket is full again
+                pipe.set(key, repr(tat), px=max(1, math.ceil((tat - now) * 1000)))
+            return retry_after
+
+        return self.client.transaction(attempt, key, value_from_callable=True)
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+    def info(self) -> dict:
+        return {"backend": "redis"}
+
+
+def store_from_env():
+    if not ENABLED:
+        return None
+    if BACKEND == "redis":
+        return RedisStore.from_url(URL)
+    return MemoryStore(MAX_KEYS)
+
+
+# ---------- Limiter ----------
+class RateLimiter:
+    """Token buckets per (budget, client). Store errors let the request through."""
+
+    def __init__(self, store, budgets: dict[str, Budget] = BUDGETS, clock=time.time):
+        self.store = store
+        self.budgets = budgets
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def check(self, name: str, client: str):
+        """Spend a token of `name` for `client`, or raise 429."""
+        if self.store is None:
+            return
+        try:
+            retry_after = self.store.take(f"{name}:{client}", self.budgets[name], self.clock())
+        except Exception:
+            retry_after, outcome = 0.0, "errors"
+        else:
+            outcome = "limited" if retry_after else "allowed"
+        with self._lock:
+            self._counts[(name, outcome)] += 1
+        if retry_after:
+            raise HTTPException(
+                429,
+                "Rate limit exceeded, retry later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        out = {"enabled": self.enabled, **(self.store.info() if self.store else {}), "budgets": {}}
+        for name, budget in self.budgets.items():
+            out["budgets"][name] = {
+                "requests": budget.requests,
+                "seconds": budget.seconds,
+                **{k: counts.get((name, k), 0) for k in ("allowed", "limited", "errors")},
+            }
+        return out
+
+
+limiter = RateLimiter(store_from_env())
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def per_ip(name: str):
+    """Route dependency: spend from `name`'s budget for the caller's IP."""
+
+    def limit_ip(request: Request):
+        limiter.check(name, f"ip:{_client_ip(request)}")
+
+    return limit_ip
+
+
+def per_user(name: str, when=None, current_user=get_current_user):
+    """Route dependency: spend from `name`'s budget for the authenticated user.
+
+    `current_user` is the auth dependency the route already uses (FastAPI resolves
+    it once per request); `when(request)` limits the budget to some requests.
+    """
+
+    def limit_user(request: Request, user=Depends(current_user)):
+        if when is None or when(request):
+            limiter.check(name, f"u{user.id}")
+
+    return limit_user
+
+
+# ---------- Admission control ----------
+class Admission:
+    """Per-worker gate: how many requests are in flight and how deep the pool queue is."""
+
+    def __init__(
+        self,
+        max_inflight: int = MAX_INFLIGHT,
+        max_pool_queue: int = MAX_POOL_QUEUE,
+        retry_after: int = RETRY_AFTER,
+    ):
+        self.max_inflight = max_inflight
+        self.max_pool_queue = max_pool_queue
+        self.retry_after = retry_after
+        self.inflight = 0
+        self.shed = Counter()
+
+    def pool_queue(self) -> int:
+        return database.pool_stats.queued + database.async_pool_stats.queued
+
+    def refuse(self) -> str | None:
+        """Why a new request can't come in now, or None to let it in."""
+        if self.max_inflight and self.inflight >= self.max_inflight:
+            return "inflight"
+        if self.max_pool_queue and self.pool_queue() >= self.max_pool_queue:
+            return "pool_queue"
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "pool_queue": self.pool_queue(),
+            "max_pool_queue": self.max_pool_queue,
+            "shed": dict(self.shed),
+        }
+
+
+admission = Admission()
+
+
+class AdmissionMiddleware:
+    """Sheds load with 503 + Retry-After; see the module header."""
+
+    def __init__(self, app, gate: Admission | None = None):
+        self.app = app
+        self.gate = gate or admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ALWAYS_ADMIT:
+            return await self.app(scope, receive, send)
+        gate = self.gate
+        reason = gate.refuse()
+        if reason:
+            gate.shed[reason] += 1
+            response = JSONResponse(
+                {"detail": "Server busy, retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(gate.retry_after)},
+            )
+            return await response(scope, receive, send)
+        if scope["path"] in LONG_LIVED:
+            return await self.app(scope, receive, send)
+        # the counter only moves on the event loop, so it needs no lock
+        gate.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.inflight -= 1
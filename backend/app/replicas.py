@@ -0,0 +1,309 @@
+# app/replicas.py - read replicas for the read-heavy GET routes
+#
+#   DATABASE_REPLICA_URLS  comma-separated replica URLs ("" = none, everything on the primary)
+#   DB_REPLICA_STICKY (10)  seconds a user's reads stay on the primary after their own write
+#   DB_REPLICA_CHECK (5)    seconds between health probes (SELECT 1) of a replica
+#   DB_REPLICA_RETRY (30)   seconds a replica that failed stays out before it's tried again
+#   DB_REPLICA_CONNECT_TIMEOUT (2)  connect timeout for probes and replica connections
+# Replicas are only ever read from. database.RoutingSession decides per statement:
+# SELECTs go to a replica picked here, while flushes, DML, SELECT ... FOR UPDATE and
+# explicit begin() go to the primary and keep the session there.
+# Health is checked off the request path: a background thread (started on first use)
+# probes each replica every DB_REPLICA_CHECK seconds on a fresh connection, and pick()
+# only reads the result. A replica is used once a probe has passed; one that fails a
+# probe or drops a connection is skipped until a probe after DB_REPLICA_RETRY passes.
+# With no healthy replica, reads fall back to the primary.
+# Stickiness is kept in the process that saw the write and, with CACHE_BACKEND=redis,
+# in redis too (sticky:{username}, expiring after DB_REPLICA_STICKY), so every worker
+# keeps that user on the primary: otherwise another worker could read a lagging
+# replica and fill the shared project cache with the state from before the write.
+# Locally: DATABASE_REPLICA_URLS=sqlite:////tmp/replica.db (a copy of the primary), or
+# a second database on the same throwaway Postgres.
+import itertools
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from .dbpool import PoolStats, engine_options
+
+log = logging.getLogger(__name__)
+
+REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY", "10"))
+CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK", "5"))
+RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY", "30"))
+CONNECT_TIMEOUT = int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "2"))
+
+
+def _with_connect_timeout(url: str, opts: dict, is_async: bool = False) -> dict:
+    if url.startswith("postgresql"):
+        # asyncpg's connect() takes `timeout`, libpq (psycopg2) `connect_timeout`
+        opts["connect_args"]["timeout" if is_async else "connect_timeout"] = CONNECT_TIMEOUT
+    return opts
+
+
+class Replica:
+    """One replica: its engines (built on first use), pool stats and health."""
+
+    def __init__(self, url: str, async_url: str | None, replicas: "ReplicaSet"):
+        self.url = url
+        self.async_url = async_url
+        self.stats = PoolStats()
+        self.async_stats = PoolStats()
+        self.healthy = False  # until a probe has passed
+        self.down_until = 0.0
+        self.checked_at = None
+        self.failures = 0
+        self._replicas = replicas
+        self._lock = threading.Lock()
+        self._engine = None
+        self._async_engine = None
+        self._probe_engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    opts = _with_connect_timeout(self.url, engine_options(self.url, self.stats))
+                    engine = create_engine(self.url, **opts)
+                    event.listen(engine, "handle_error", self._on_error)
+                    for hook in self._replicas.hooks:
+                        hook(engine)
+                    self._engine = engine
+        return self._engine
+
+    @property
+    def async_engine(self):
+        if self._async_engine is None:
+            with self._lock:
+                if self._async_engine is None:
+                    opts = engine_options(self.async_url, self.async_stats, is_async=True)
+                    engine = create_async_engine(
+                        self.async_url, **_with_connect_timeout(self.async_url, opts, is_async=True)
+                    )
+                    event.listen(engine.sync_engine, "handle_error", self._on_error)
+                    for hook in self._replicas.hooks:
+                        hook(engine.sync_engine)
+                    self._async_engine = engine
+        return self._async_engine
+
+    def _on_error(self, ctx):
+        # a lost connection, or no connection at all (ctx.connection is None)
+        if ctx.is_disconnect or ctx.connection is None:
+            self._replicas.mark_down(self)
+
+    def probe(self) -> bool:
+        """SELECT 1 on a connection of its own (not a pooled one that may still look alive)."""
+        if self._probe_engine is None:
+            opts = _with_connect_timeout(self.url, {"connect_args": {}})
+            if self.url.startswith("sqlite"):
+                opts["connect_args"]["check_same_thread"] = False
+            self._probe_engine = create_engine(self.url, poolclass=NullPool, **opts)
+        try:
+            with self._probe_engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception:
+            log.warning("replica probe failed: %s", self._probe_engine.url, exc_info=True)
+            return False
+        return True
+
+    def dispose(self, close: bool = True):
+        if self._engine is not None:
+            self._engine.dispose(close=close)
+        if self._probe_engine is not None:
+            self._probe_engine.dispose(close=close)
+        if self._async_engine is not None:
+            self._async_engine.sync_engine.dispose(close=False)
+
+    def engines(self):
+        """The sync engines built so far (an AsyncEngine's sync_engine for async)."""
+        if self._engine is not None:
+            yield self._engine
+        if self._async_engine is not None:
+            yield self._async_engine.sync_engine
+
+    def snapshot(self, now: float) -> dict:
+        out = {"healthy": self.healthy and self.down_until <= now, "failures": self.failures}
+        if self._engine is not None:
+            out["sync"] = self.stats.snapshot(self._engine.pool)
+        if self._async_engine is not None:
+            out["async"] = self.async_stats.snapshot(self._async_engine.sync_engine.pool)
+        return out
+
+
+class ReplicaSet:
+    """The configured replicas, round-robin over the healthy ones, plus read-your-writes.
+
+    stick(key) keeps that user's reads on the primary for `sticky` seconds, so a
+    user never reads a replica that hasn't caught up with their own write yet.
+    `store` (a shared cache backend, see cache.py) carries that across workers.
+    With background=False nothing probes by itself: call check() (tests).
+    """
+
+    def __init__(
+        self,
+        urls=(),
+        to_async=None,
+        sticky: float = STICKY_SECONDS,
+        check: float = CHECK_SECONDS,
+        retry: float = RETRY_SECONDS,
+        clock=time.monotonic,
+        background: bool = True,
+        store=None,
+    ):
+        self.replicas = [Replica(u, to_async(u) if to_async else None, self) for u in urls]
+        self.sticky = sticky
+        self.interval = check
+        self.retry = retry
+        self.clock = clock
+        self.background = background
+        self.store = store
+        self.store_errors = 0
+        self.hooks = []  # called with each replica engine as it's built
+        self.reads = {"replica": 0, "sticky": 0, "fallback": 0}
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+        self._stuck: dict[str, float] = {}
+        self._checker: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    # ---------- Read-your-writes ----------
+    def stick(self, key):
+        if not self.replicas or key is None:
+            return
+        now = self.clock()
+        with self._lock:
+            self._stuck[key] = now + self.sticky
+            if len(self._stuck) > 10000:
+                # drop the expired ones now and then instead of on every read
+                self._stuck = {k: t for k, t in self._stuck.items() if t > now}
+        self._shared("set", f"sticky:{key}", b"1", self.sticky)
+
+    def is_stuck(self, key) -> bool:
+        if key is None:
+            return False
+        if self._stuck.get(key, 0.0) > self.clock():
+            return True
+        return self._shared("get", f"sticky:{key}") is not None
+
+    def _shared(self, method: str, *args):
+        # a store that's down only costs other workers' read-your-writes, not the read
+        if self.store is None:
+            return None
+        try:
+            return getattr(self.store, method)(*args)
+        except Exception:
+            self.store_errors += 1
+            return None
+
+    def instrument(self, hook):
+        """Run hook(engine) on every replica engine, those built so far and later ones."""
+        if hook in self.hooks:
+            return
+        self.hooks.append(hook)
+        for replica in self.replicas:
+            for engine in replica.engines():
+                hook(engine)
+
+    # ---------- Health ----------
+    def mark_down(self, replica: Replica):
+        now = self.clock()
+        with self._lock:
+            replica.healthy = False
+            if replica.down_until > now:
+                return  # already out (a failed probe may also fire handle_error)
+            replica.down_until = now + self.retry
+            replica.failures += 1
+
+    def check(self):
+        """Probe every replica that isn't waiting out DB_REPLICA_RETRY; pick() reads the result."""
+        for replica in self.replicas:
+            now = self.clock()
+            if replica.down_until > now:
+                continue
+            replica.checked_at = now
+            if replica.probe():
+                replica.healthy = True
+            else:
+                self.mark_down(replica)
+
+    def _run(self, stop: threading.Event):
+        while True:
+            self.check()
+            if stop.wait(self.interval):
+                return
+
+    def start(self):
+        """Start the health checker thread, once (and again in a forked worker)."""
+        with self._lock:
+            if self._checker is not None or not self.replicas:
+                return
+            self._stop = threading.Event()
+            self._checker = threading.Thread(
+                target=self._run, args=(self._stop,), name="replica-health", daemon=True
+            )
+            self._checker.start()
+
+    # ---------- Picking ----------
+    def _choose(self, key) -> Replica | None:
+        """The next healthy replica for `key`; None while it's sticky or nothing is healthy."""
+        if self.background and self._checker is None:
+            self.start()
+        if self.is_stuck(key):
+            self._count("sticky")
+            return None
+        now = self.clock()
+        n = len(self.replicas)
+        start = next(self._next) % n
+        for replica in (self.replicas[(start + i) % n] for i in range(n)):
+            if replica.healthy and replica.down_until <= now:
+                self._count("replica")
+                return replica
+        self._count("fallback")
+        return None
+
+    def _count(self, where: str):
+        with self._lock:
+            self.reads[where] += 1
+
+    def pick(self, key=None):
+        """A healthy replica's sync Engine for `key`'s reads, or None for the primary."""
+        replica = self._choose(key) if self.replicas else None
+        return replica.engine if replica is not None else None
+
+    def pick_async(self, key=None):
+        """pick() for AsyncSessions: the replica AsyncEngine's sync_engine, or None."""
+        replica = self._choose(key) if self.replicas else None
+        return replica.async_engine.sync_engine if replica is not None else None
+
+    def stats(self) -> dict:
+        now = self.clock()
+        with self._lock:
+            stuck = sum(t > now for t in self._stuck.values())
+            reads = dict(self.reads)
+        return {
+            "sticky_seconds": self.sticky,
+            "sticky_users": stuck,
+            "sticky_shared": self.store is not None,
+            "sticky_store_errors": self.store_errors,
+            "reads": reads,
+            "replicas": [r.snapshot(now) for r in self.replicas],
+        }
+
+    def dispose(self, close: bool = True):
+        """close=False after fork: the checker thread didn't come along, start() anew."""
+        checker, self._checker = self._checker, None
+        if checker is not None and close:
+            self._stop.set()
+            checker.join()
+        for replica in self.replicas:
+            replica.dispose(close)
@@ -0,0 +1,212 @@
+# app/responses.py - response pipeline: JSON encoding and compression
+#
+#   RESPONSE_FAST_LISTS (1)      hot list endpoints dump rows straight to JSON with
+#                                orjson instead of validating them into response
+#                                models first (see dump_rows)
+#   RESPONSE_COMPRESSION (br,gzip)  encodings offered, in order of preference;
+#                                "" turns compression off
+#   RESPONSE_MIN_SIZE (1024)     bodies smaller than this go out uncompressed
+#   RESPONSE_GZIP_LEVEL (4)  RESPONSE_BROTLI_QUALITY (4)
+#                                past these, ratio gains are small and CPU grows fast
+#
+# orjson and brotli are optional: without orjson the stdlib encoder is used, without
+# brotli only gzip is offered.
+#
+# Routes with a response_model are left on FastAPI's default response class on
+# purpose: that path already serializes through pydantic-core straight to bytes,
+# and any custom response_class would turn it off.
+import json
+import os
+import zlib
+
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional
+    orjson = None
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+FAST_LISTS = os.getenv("RESPONSE_FAST_LISTS", "1") == "1"
+COMPRESSION = [
+    e.strip() for e in os.getenv("RESPONSE_COMPRESSION", "br,gzip").split(",") if e.strip()
+]
+MIN_SIZE = int(os.getenv("RESPONSE_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "4"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+# Compressing a few hundred KB takes milliseconds; do that off the event loop
+_OFFLOAD_SIZE = 64 * 1024
+
+
+# ---------- JSON ----------
+def dumps(content) -> bytes:
+    if orjson is not None:
+        # OPT_UTC_Z writes aware UTC datetimes as ...Z, the same as pydantic
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+def _default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat().replace("+00:00", "Z")
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def dump_rows(schema, rows, headers=None, status_code: int = 200) -> ORJSONResponse:
+    """Serialize ORM rows as a list of `schema` without building pydantic models.
+
+    Reads schema's fields straight off each row (missing attributes become None),
+    so it is only for flat output schemas of plain columns, with no validators,
+    aliases or nested models. The route keeps its response_model for the docs.
+    """
+    fields = tuple(schema.model_fields)
+    content = [{f: getattr(row, f, None) for f in fields} for row in rows]
+    if headers is not None:
+        # e.g. the handler's injected Response, whose headers FastAPI would otherwise merge
+        headers = {k: v for k, v in headers.items() if k.lower() != "content-length"}
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+
+# ---------- Compression ----------
+def _accepted(header: str) -> set[str]:
+    accepted = set()
+    for part in header.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        for p in params.split(";"):
+            name, _, value = p.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if token and q > 0:
+            accepted.add(token)
+    return accepted
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        # flushed per chunk so streamed bodies (exports) still arrive incrementally
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._c.finish()
+        return self._c.flush()
+
+    def whole(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.finish()
+        return self._c.compress(data) + self._c.flush()
+
+
+async def _run(fn, data: bytes) -> bytes:
+    if len(data) >= _OFFLOAD_SIZE:
+        return await run_in_threadpool(fn, data)
+    return fn(data)
+
+
+class CompressionMiddleware:
+    """gzip/brotli for responses of at least `minimum_size` bytes, whole or streamed.
+
+    Skips bodies that are already encoded, event streams (which must not be held
+    back) and anything smaller than the threshold. ETags are weakened on encoded
+    responses, as nginx does, since the bytes differ per encoding.
+    """
+
+    def __init__(
+        self,
+        app,
+        encodings=None,
+        minimum_size: int = MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ):
+        self.app = app
+        offered = COMPRESSION if encodings is None else encodings
+        self.encodings = [e for e in offered if e == "gzip" or (e == "br" and brotli is not None)]
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            return await self.app(scope, receive, send)
+        accepted = _accepted(Headers(scope=scope).get("accept-encoding", ""))
+        encoding = next((e for e in self.encodings if e in accepted), None)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        encoder = None  # set once we've decided to compress a streamed body
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if encoder is not None:
+                data = await _run(encoder.chunk, body)
+                if not more:
+                    data += encoder.finish()
+                return await send({"type": "http.response.body", "body": data, "more_body": more})
+
+            headers = MutableHeaders(scope=start)
+            if (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith("text/event-stream")
+                or (not more and len(body) < self.minimum_size)
+            ):
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            enc = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            if more:
+                encoder = enc
+                del headers["content-length"]
+                await send(start)
+                return await send(
+                    {
+                        "type": "http.response.body",
+                        "body": await _run(enc.chunk, body),
+                        "more_body": True,
+                    }
+                )
+            data = await _run(enc.whole, body)
+            headers["Content-Length"] = str(len(data))
+            await send(start)
+            await send({"type": "http.response.body", "body": data})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,303 @@
+# app/retention.py - log partition maintenance and retention
+#
+# On Postgres, logs is range-partitioned by created_at into monthly tables
+# (alembic 0005). Retention detaches and drops whole expired partitions, which is
+# O(1) and leaves nothing to vacuum, instead of deleting rows.
+# Anywhere logs is a plain table (SQLite locally, or Postgres before 0005) the
+# same calls fall back to deleting in short, bounded transactions.
+#
+# The job worker runs a pass every JOBS_EVERY_LOGS_RETENTION seconds (app/jobs.py,
+# logs.retention); by hand:
+#   python -m app.retention            # create upcoming partitions + drop expired ones
+#   python -m app.retention --dry-run  # only print what would happen
+# Each partition is created or dropped in a transaction of its own, and one that
+# fails is logged and skipped, so it can't hold up the rest of the pass.
+import argparse
+import logging
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select, text, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import aggregates, models
+
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "90"))
+PARTITION_MONTHS_AHEAD = int(os.getenv("LOG_PARTITION_MONTHS_AHEAD", "2"))
+PURGE_CHUNK_ROWS = int(os.getenv("LOG_PURGE_CHUNK_ROWS", "10000"))
+
+_BOUND = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+log = logging.getLogger(__name__)
+
+
+# ---------- Partition planning (pure, dialect independent) ----------
+def month_start(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(ts: datetime, months: int) -> datetime:
+    y, m = divmod(ts.month - 1 + months, 12)
+    return ts.replace(year=ts.year + y, month=m + 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+
+def expired(
+    partitions: list[tuple[str, datetime | None, datetime | None]], cutoff: datetime
+) -> list[str]:
+    """Partitions whose every row is older than cutoff, i.e. upper bound <= cutoff.
+
+    The DEFAULT partition (no bounds) is never expired.
+    """
+    return [name for name, _, upper in partitions if upper is not None and upper <= cutoff]
+
+
+# ---------- Postgres catalog helpers ----------
+def is_partitioned(conn: Connection, table: str = "logs") -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    kind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}
+    ).scalar()
+    return kind == "p"
+
+
+def _parse_bound(raw: str) -> datetime | None:
+    raw = raw.strip()
+    if raw.upper() in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(raw.strip("'")).astimezone(timezone.utc)
+
+
+def list_partitions(conn: Connection, table: str = "logs"):
+    """[(name, lower, upper)] from pg_inherits; MINVALUE/DEFAULT bounds are None."""
+    rows = conn.execute(
+        text("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:t)
+            ORDER BY c.relname
+            """),
+        {"t": table},
+    )
+    out = []
+    for name, bound in rows:
+        m = _BOUND.search(bound or "")
+        if m:
+            out.append((name, _parse_bound(m.group(1)), _parse_bound(m.group(2))))
+        else:  # DEFAULT partition
+            out.append((name, None, None))
+    return out
+
+
+# ---------- Jobs ----------
+def _create_partition(
+    conn: Connection, table: str, name: str, start: datetime, end: datetime, default: str | None
+):
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    in_range = f"created_at >= '{start.isoformat()}' AND created_at < '{end.isoformat()}'"
+    if (
+        default is None
+        or not conn.execute(text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1")).first()
+    ):
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}"))
+        return
+    # the default partition already holds rows of this range (logs written past the
+    # pre-created months), which CREATE ... PARTITION OF refuses: take the default
+    # out, create the partition, move the rows over and put the default back
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}"))
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+            f"INSERT INTO {table} SELECT * FROM moved"
+        )
+    )
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+
+
+def ensure_partitions(
+    conn: Connection,
+    table: str = "logs",
+    now: datetime | None = None,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    dry_run: bool = False,
+    failed: list[str] | None = None,
+) -> list[str]:
+    """Create monthly partitions from this month through `months_ahead` months out.
+
+    Each one commits on its own; one that fails is rolled back, logged and added to
+    `failed`, and the rest are still created.
+    """
+    if not is_partitioned(conn, table):
+        return []
+    existing = list_partitions(conn, table)
+    default = next((name for name, lo, hi in existing if lo is None and hi is None), None)
+    first = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for i in range(months_ahead + 1):
+        start, end = add_months(first, i), add_months(first, i + 1)
+        # skip ranges already covered (e.g. the legacy partition attached by 0005)
+        if any(
+            (lo is None or lo < end) and (hi is not None and hi > start) for _, lo, hi in existing
+        ):
+            continue
+        name = partition_name(table, start)
+        if not dry_run:
+            try:
+                _create_partition(conn, table, name, start, end, default)
+                conn.commit()
+            except SQLAlchemyError:
+                conn.rollback()
+                log.exception("retention: creating partition %s failed", name)
+                if failed is not None:
+                    failed.append(name)
+                continue
+        created.append(name)
+    return created
+
+
+def drop_expired(
+    conn: Connection,
+    table: str = "logs",
+    retention_days: int = LOG_RETENTION_DAYS,
+    now: datetime | None = None,
+    dry_run: bool = False,
+    failed: list[str] | None = None,
+) -> list[str]:
+    """Drop whole partitions past retention; returns their names.
+
+    As in ensure_partitions, one that fails is skipped and added to `failed`.
+    On an unpartitioned table, deletes expired rows in PURGE_CHUNK_ROWS chunks instead
+    and returns an empty list.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    if not is_partitioned(conn, table):
+        if not dry_run:
+            _delete_older_than(conn, cutoff)
+        return []
+    names = expired(list_partitions(conn, table), cutoff)
+    if dry_run:
+        return names
+    dropped = []
+    for name in names:
+        try:
+            # count (one pass over the partition) and fix the project counters while
+            # logs is still readable: DETACH takes an ACCESS EXCLUSIVE lock on it,
+            # held only for the detach and drop, and each partition commits on its own
+            counts = conn.execute(
+                text(f"SELECT project_id, count(*) FROM {name} GROUP BY project_id")
+            )
+            aggregates.logs_removed(conn, dict(counts.all()))
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            conn.commit()
+        except SQLAlchemyError:
+            conn.rollback()
+            log.exception("retention: dropping partition %s failed", name)
+            if failed is not None:
+                failed.append(name)
+            continue
+        dropped.append(name)
+    return dropped
+
+
+def run(
+    conn: Connection,
+    retention_days: int = LOG_RETENTION_DAYS,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    dry_run: bool = False,
+) -> dict:
+    """One maintenance pass: create upcoming partitions, then drop expired ones."""
+    failed: list[str] = []
+    created = ensure_partitions(conn, months_ahead=months_ahead, dry_run=dry_run, failed=failed)
+    dropped = drop_expired(conn, retention_days=retention_days, dry_run=dry_run, failed=failed)
+    conn.commit()
+    return {"created": created, "dropped": dropped, "failed": failed}
+
+
+def _delete_older_than(conn: Connection, cutoff: datetime):
+    while True:
+        ids = (
+            select(models.Log.id).where(models.Log.created_at < cutoff).limit(PURGE_CHUNK_ROWS)
+        ).scalar_subquery()
+        gone = (
+            conn.execute(
+                delete(models.Log).where(models.Log.id.in_(ids)).returning(models.Log.project_id)
+            )
+            .scalars()
+            .all()
+        )
+        aggregates.logs_removed(conn, Counter(gone))
+        conn.commit()
+        if len(gone) < PURGE_CHUNK_ROWS:
+            return
+
+
+def purge_project_logs(db: Session, project_ids, chunk: int = PURGE_CHUNK_ROWS) -> int:
+    """Delete the logs of the given projects in short transactions of at most `chunk` rows.
+
+    Avoids one huge DELETE holding locks and bloating a single transaction when a busy
+    project is removed. Each chunk is a (created_at, id) range found on the
+    (project_id, created_at) index, so rows sharing a timestamp (an ingest batch)
+    can't make it unbounded, and it stays cheap on partitioned tables too.
+    Commits as it goes, so call it before deleting the projects.
+    """
+    Log = models.Log
+    total = 0
+    for project_id in sorted(set(project_ids)):
+        while True:
+            edge = db.execute(
+                select(Log.created_at, Log.id)
+                .where(Log.project_id == project_id)
+                .order_by(Log.created_at, Log.id)
+                .offset(chunk - 1)
+                .limit(1)
+            ).first()
+            stmt = delete(Log).where(Log.project_id == project_id)
+            if edge is not None:
+                # the plain created_at bound lets Postgres prune partitions
+                stmt = stmt.where(
+                    Log.created_at <= edge.created_at, tuple_(Log.created_at, Log.id) <= tuple(edge)
+                )
+            n = db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+            aggregates.logs_removed(db, {project_id: n})
+            db.commit()
+            total += n
+            if edge is None:
+                break
+    return total
+
+
+def main(argv=None):
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description="Maintain log partitions and apply retention")
+    parser.add_argument("--days", type=int, default=LOG_RETENTION_DAYS, help="retention in days")
+    parser.add_argument(
+        "--ahead", type=int, default=PARTITION_MONTHS_AHEAD, help="months to pre-create"
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    with engine.connect() as conn:
+        result = run(conn, retention_days=args.days, months_ahead=args.ahead, dry_run=args.dry_run)
+    verb = "would " if args.dry_run else ""
+    print(f"{verb}create: {result['created'] or '-'}")
+    print(f"{verb}drop:   {result['dropped'] or '-'}")
+    if result["failed"]:
+        print(f"failed: {result['failed']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from ..auth import authenticate, create_access_token, get_db
+
+from .. import ratelimit
+from ..auth import authenticate, create_access_token
+from ..database import get_db
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-@router.post("/token")
+
+@router.post("/token", dependencies=[Depends(ratelimit.per_ip("login"))])
 def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = authenticate(db, form.username, form.password)
     if not user:
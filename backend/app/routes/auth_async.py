@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import ratelimit
+from ..auth import authenticate_async, create_access_token
+from ..database import get_async_db
+
+router = APIRouter(prefix="/auth", tags=["Auth"])
+
+
+@router.post("/token", dependencies=[Depends(ratelimit.per_ip("login"))])
+async def login(
+    form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
+):
+    user = await authenticate_async(db, form.username, form.password)
+    if not user:
+        raise HTTPException(401, "Incorrect username or password")
+    return {"access_token": create_access_token(user.username), "token_type": "bearer"}
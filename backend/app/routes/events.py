@@ -0,0 +1,100 @@
+# app/routes/events.py - GET /events: the signed-in user's change feed as server-sent events
+# (see events.py for the event types, resuming and the env knobs).
+#
+#   GET /events                    every event for the user's projects
+#   GET /events?project_id=7       one project's events
+#   POST /events/ticket            a single-use ticket for GET /events?ticket=
+# EventSource can't send an Authorization header: a browser first fetches a ticket
+# (with the header) and opens the stream with ?ticket=, which works once and only for
+# EVENTS_TICKET_SECONDS. A reconnecting client needs a fresh ticket, and passes the
+# last id it saw as ?last_event_id= (other clients can send Last-Event-ID).
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from .. import events, models, ratelimit
+from ..auth import get_current_user
+from ..database import get_db
+
+router = APIRouter(tags=["Events"])
+
+
+def feed_available():
+    # without redis the broker, history and tickets are per process (see events.py)
+    if events.WORKERS > 1 and not events.broker.shared:
+        raise HTTPException(503, "The change feed needs EVENTS_BACKEND=redis under several workers")
+
+
+def stream_user(
+    request: Request, ticket: str | None = Query(default=None), db: Session = Depends(get_db)
+) -> models.User:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return get_current_user(request, token, db)
+    user_id = events.tickets.redeem(ticket) if ticket else None
+    user = db.get(models.User, user_id) if user_id is not None else None
+    if user is None:
+        raise HTTPException(401, "Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+
+def _check_project(project_id: int | None, user: models.User, db: Session):
+    if project_id is None:
+        return
+    owned = (
+        db.query(models.Project.id)
+        .filter(
+            models.Project.id == project_id,
+            models.Project.owner_id == user.id,
+            models.Project.deleted_at.is_(None),
+        )
+        .first()
+    )
+    if not owned:
+        raise HTTPException(404, "Project not found")
+
+
+def owned_scope(
+    project_id: int | None = Query(default=None),
+    user: models.User = Depends(stream_user),
+    db: Session = Depends(get_db),
+):
+    _check_project(project_id, user, db)
+    # release the connection now rather than when the stream ends
+    db.close()
+    return user.id, project_id
+
+
+@router.post("/events/ticket", dependencies=[Depends(feed_available)])
+def stream_ticket(current_user: models.User = Depends(get_current_user)):
+    return {"ticket": events.tickets.issue(current_user.id), "expires_in": events.tickets.ttl}
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    dependencies=[
+        Depends(feed_available),
+        Depends(ratelimit.per_user("user", current_user=stream_user)),
+    ],
+)
+async def event_stream(
+    request: Request,
+    scope: tuple[int, int | None] = Depends(owned_scope),
+    last_event_id: str | None = Query(default=None),
+):
+    user_id, project_id = scope
+    sub, resumed = events.broker.subscribe(
+        user_id, project_id, request.headers.get("last-event-id") or last_event_id
+    )
+    if sub is None:
+        raise HTTPException(
+            503, "Too many event streams, retry shortly", headers={"Retry-After": "5"}
+        )
+    return StreamingResponse(
+        events.stream(sub, resumed),
+        media_type="text/event-stream",
+        # no proxy buffering (nginx) or caching of the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
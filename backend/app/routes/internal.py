@@ -0,0 +1,78 @@
+# Operational endpoints for dashboards/scrapers; hidden from the public OpenAPI schema.
+# Only mounted with INTERNAL_METRICS=1. With INTERNAL_TOKEN set, each request must send
+# `Authorization: Bearer <INTERNAL_TOKEN>`; without it, only expose the port to the
+# scraper's network. Like any other route they're subject to admission control.
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from .. import database, dbpool, events, profiling, ratelimit
+from ..cache import project_cache
+
+TOKEN = os.getenv("INTERNAL_TOKEN", "")
+
+
+def require_token(authorization: str = Header("")):
+    if TOKEN and not hmac.compare_digest(authorization.encode(), f"Bearer {TOKEN}".encode()):
+        raise HTTPException(401, "Invalid token", headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_token)],
+)
+
+
+@router.get("/pool")
+def pool_metrics():
+    """Live connection pool state plus checkout wait/latency histograms (replicas too, if any)."""
+    out = {
+        "config": {
+            "pool_size": dbpool.POOL_SIZE,
+            "max_overflow": dbpool.MAX_OVERFLOW,
+            "pool_timeout": dbpool.POOL_TIMEOUT,
+            "pool_recycle": dbpool.POOL_RECYCLE,
+            "pool_pre_ping": dbpool.POOL_PRE_PING,
+            "statement_timeout_ms": dbpool.STATEMENT_TIMEOUT_MS,
+        },
+        "sync": database.pool_stats.snapshot(database.engine.pool),
+    }
+    if database.async_engine is not None:
+        out["async"] = database.async_pool_stats.snapshot(database.async_engine.sync_engine.pool)
+    if database.replicas:
+        out["replicas"] = database.replicas.stats()
+    return out
+
+
+@router.get("/cache")
+def cache_metrics():
+    """Project cache hit rates per kind (p = single project, l = list page)."""
+    return project_cache.stats()
+
+
+@router.get("/limits")
+def limit_metrics():
+    """Rate limit budgets with allowed/limited counts, and admission control state."""
+    return {"rate_limits": ratelimit.limiter.stats(), "admission": ratelimit.admission.stats()}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text format: per-route latency/SQL (PROFILING=1) and pool histograms."""
+    body = profiling.metrics.prometheus()
+    body += profiling.pool_prometheus("sync", database.pool_stats, database.engine.pool)
+    if database.async_engine is not None:
+        body += profiling.pool_prometheus(
+            "async", database.async_pool_stats, database.async_engine.sync_engine.pool
+        )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@router.get("/events")
+def event_metrics():
+    """Open event streams, events published and slow subscribers dropped."""
+    return events.broker.stats()
@@ -0,0 +1,31 @@
+# app/routes/jobs.py - status of background jobs (app/jobs.py) started by the user's requests
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from .. import models, ratelimit, schemas
+from ..auth import get_current_user
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/jobs", tags=["Jobs"], dependencies=[Depends(ratelimit.per_user("user"))]
+)
+
+
+@router.get("/{job_id}", response_model=schemas.JobOut)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    job = db.get(models.Job, job_id)
+    if job is None or job.owner_id != current_user.id:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+def accepted(job: models.Job):
+    """202 with the job and where to poll it, for routes that hand work to the queue."""
+    body = schemas.JobOut.model_validate(job).model_dump(mode="json")
+    return JSONResponse(body, status_code=202, headers={"Location": f"/jobs/{job.id}"})
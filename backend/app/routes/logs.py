@@ -1,29 +1,258 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from .. import schemas, models
-from ..database import SessionLocal
 
-router = APIRouter(prefix="/logs", tags=["Logs"])
+from .. import aggregates, events, ingest, models, ratelimit, responses, schemas
+from ..auth import get_current_user
+from ..database import SessionLocal, get_db
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter(
+    prefix="/logs", tags=["Logs"], dependencies=[Depends(ratelimit.per_user("user"))]
+)
+# Project-scoped log routes: /projects/{project_id}/logs...
+project_router = APIRouter(
+    prefix="/projects/{project_id}/logs",
+    tags=["Logs"],
+    dependencies=[Depends(ratelimit.per_user("user"))],
+)
 
-@router.post("/", response_model=schemas.Log)
-def create_log(log: schemas.LogCreate, db: Session = Depends(get_db)):
-    proj = db.query(models.Project).get(log.project_id)
+LOG_INGEST_MAX = int(os.getenv("LOG_INGEST_MAX", "10000"))
+# how far a client's created_at may be behind / ahead of the server clock, in seconds:
+# anything outside would skew last_log_at and land in expired or default partitions
+LOG_INGEST_MAX_AGE = int(os.getenv("LOG_INGEST_MAX_AGE", "86400"))
+LOG_INGEST_MAX_AHEAD = int(os.getenv("LOG_INGEST_MAX_AHEAD", "300"))
+EXPORT_BATCH_ROWS = int(os.getenv("LOG_EXPORT_BATCH_ROWS", "5000"))
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+_ingest_items = TypeAdapter(List[schemas.LogIngest])
+
+
+def _owned_project(db: Session, project_id: int, user_id: int) -> models.Project:
+    proj = (
+        db.query(models.Project)
+        .filter(
+            models.Project.id == project_id,
+            models.Project.owner_id == user_id,
+            models.Project.deleted_at.is_(None),
+        )
+        .first()
+    )
     if not proj:
         raise HTTPException(404, "Project not found")
-    obj = models.Log(project_id=log.project_id, content=log.content)
-    db.add(obj); db.commit(); db.refresh(obj)
+    return proj
+
+
+@router.post("/", response_model=schemas.LogOut, status_code=status.HTTP_201_CREATED)
+def create_log(
+    log: schemas.LogCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    _owned_project(db, log.project_id, current_user.id)
+    obj = models.Log(
+        project_id=log.project_id, message=log.message, created_at=datetime.now(timezone.utc)
+    )
+    db.add(obj)
+    db.flush()
+    aggregates.logs_added(db, [{"project_id": obj.project_id, "created_at": obj.created_at}])
+    events.logs_written(
+        db,
+        [{"project_id": obj.project_id, "message": obj.message, "created_at": obj.created_at}],
+        current_user.id,
+    )
+    db.commit()
+    db.refresh(obj)
     return obj
 
-@router.get("/", response_model=list[schemas.Log])
-def list_logs(project_id: int | None = Query(default=None), db: Session = Depends(get_db)):
-    q = db.query(models.Log)
+
+@router.get("/", response_model=List[schemas.LogOut])
+def list_logs(
+    project_id: int | None = Query(default=None),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    q = (
+        db.query(models.Log)
+        .join(models.Project, models.Project.id == models.Log.project_id)
+        .filter(models.Project.owner_id == current_user.id, models.Project.deleted_at.is_(None))
+    )
     if project_id is not None:
         q = q.filter(models.Log.project_id == project_id)
-    return q.order_by(models.Log.date.desc(), models.Log.id.desc()).all()
+    rows = q.order_by(models.Log.created_at.desc(), models.Log.id.desc()).limit(limit).all()
+    if responses.FAST_LISTS:
+        return responses.dump_rows(schemas.LogOut, rows)
+    return rows
+
+
+# ---------- Batched ingest ----------
+def _as_utc(ts: datetime) -> datetime:
+    # naive client timestamps are taken as UTC
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _check_timestamps(items: list[schemas.LogIngest], now: datetime):
+    earliest = now - timedelta(seconds=LOG_INGEST_MAX_AGE)
+    latest = now + timedelta(seconds=LOG_INGEST_MAX_AHEAD)
+    errors = [
+        {
+            "type": "value_error",
+            "loc": ("body", i, "created_at"),
+            "msg": f"created_at must be between {earliest.isoformat()} and {latest.isoformat()}",
+            "input": item.created_at.isoformat(),
+        }
+        for i, item in enumerate(items)
+        if item.created_at and not earliest <= _as_utc(item.created_at) <= latest
+    ]
+    if errors:
+        raise RequestValidationError(errors)
+
+
+async def ingest_body(request: Request) -> list[schemas.LogIngest]:
+    """Parse a JSON array (or single object) or an NDJSON body into LogIngest items."""
+    raw = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type in NDJSON_TYPES:
+            items = [json.loads(line) for line in raw.splitlines() if line.strip()]
+        else:
+            data = json.loads(raw)
+            items = data if isinstance(data, list) else [data]
+    except ValueError:
+        raise HTTPException(400, "Malformed JSON body") from None
+    if len(items) > LOG_INGEST_MAX:
+        raise HTTPException(413, f"At most {LOG_INGEST_MAX} log lines per request")
+    try:
+        return _ingest_items.validate_python(items)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors()) from e
+
+
+@project_router.post(
+    "", response_model=schemas.LogIngestResult, status_code=status.HTTP_201_CREATED
+)
+def ingest_logs(
+    project_id: int,
+    response: Response,
+    items: list[schemas.LogIngest] = Depends(ingest_body),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    _owned_project(db, project_id, current_user.id)
+    now = datetime.now(timezone.utc)
+    _check_timestamps(items, now)
+    rows = [
+        {
+            "project_id": project_id,
+            "message": item.message,
+            "created_at": _as_utc(item.created_at) if item.created_at else now,
+        }
+        for item in items
+    ]
+
+    if ingest.LOG_BUFFER:
+        if not ingest.log_buffer.add(rows):
+            raise HTTPException(503, "Log buffer full, retry shortly", headers={"Retry-After": "1"})
+        # accepted, durable once the buffer flushes
+        response.status_code = status.HTTP_202_ACCEPTED
+        return schemas.LogIngestResult(accepted=len(rows), buffered=True)
+
+    ingest.write_logs(db, rows, owner_id=current_user.id)
+    db.commit()
+    return schemas.LogIngestResult(accepted=len(rows), buffered=False)
+
+
+# ---------- Streaming export ----------
+_EXPORT_COLUMNS = ("id", "project_id", "message", "created_at")
+
+
+def _export_rows(project_id: int, since: datetime | None, until: datetime | None):
+    """Yield batches of log rows through a server-side cursor.
+
+    Runs on its own session because the body is produced after the handler has
+    returned. Plain column rows (not ORM objects) keep the identity map empty, so
+    memory is bounded by one batch whatever the table size.
+    """
+    stmt = select(*(getattr(models.Log, c) for c in _EXPORT_COLUMNS)).where(
+        models.Log.project_id == project_id
+    )
+    if since:
+        stmt = stmt.where(models.Log.created_at >= since)
+    if until:
+        stmt = stmt.where(models.Log.created_at < until)
+    stmt = stmt.order_by(models.Log.created_at, models.Log.id)
+
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_ROWS)
+        )
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+
+def _ndjson(batches):
+    for batch in batches:
+        yield "".join(
+            json.dumps(
+                {
+                    "id": r.id,
+                    "project_id": r.project_id,
+                    "message": r.message,
+                    "created_at": r.created_at.isoformat(),
+                },
+                separators=(",", ":"),
+            )
+            + "\n"
+            for r in batch
+        )
+
+
+def _csv(batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(_EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows((r.id, r.project_id, r.message, r.created_at.isoformat()) for r in batch)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+@project_router.get("/export", dependencies=[Depends(ratelimit.per_user("export"))])
+def export_logs(
+    project_id: int,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    since: datetime | None = Query(default=None, description="Inclusive lower bound on created_at"),
+    until: datetime | None = Query(default=None, description="Exclusive upper bound on created_at"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    _owned_project(db, project_id, current_user.id)
+    # the rows stream from their own session: hand this one's connection back first
+    db.close()
+    batches = _export_rows(project_id, since, until)
+    if format == "csv":
+        body, media_type = _csv(batches), "text/csv"
+    else:
+        body, media_type = _ndjson(batches), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="project-{project_id}-logs.{format}"'
+        },
+    )
@@ -1,24 +1,50 @@
 # app/routes/projects.py
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import os
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select, true
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List
 
-from ..database import SessionLocal
-from .. import models, schemas
-from ..auth import get_current_user  # must return models.User
+from .. import cache, etags, events, jobs, models, ratelimit, responses, schemas, search
+from ..auth import get_current_user, get_read_db  # must return models.User
+from ..cache import project_cache
+from ..database import get_db
+from ..pagination import NEXT_CURSOR_HEADER, keyset, split_page
+from ..retention import PURGE_CHUNK_ROWS
+from .jobs import accepted
+
+router = APIRouter(
+    prefix="/projects", tags=["Projects"], dependencies=[Depends(ratelimit.per_user("user"))]
+)
 
-router = APIRouter(prefix="/projects", tags=["Projects"])
+_logs = models.Log.__table__
+_projects = models.Project.__table__
+PROJECT_FIELDS = tuple(schemas.ProjectOut.model_fields)
+LOG_FIELDS = tuple(schemas.LogOut.model_fields)
+# ?include=logs embeds each project's newest logs_limit logs (one query for the whole page)
+INCLUDE = Query(default=None, description="logs: embed each project's most recent logs")
+LOGS_LIMIT = Query(
+    10, ge=1, le=100, description="With include=logs: logs per project, newest first"
+)
+# DELETE of a project with more logs than this answers 202 and leaves it to the job worker
+DELETE_INLINE_LOGS = int(os.getenv("PROJECT_DELETE_INLINE_LOGS", str(PURGE_CHUNK_ROWS)))
 
 
-# ---------- DB Session dependency ----------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def _get_owned(db: Session, project_id: int, user_id: int) -> models.Project:
+    obj = (
+        db.query(models.Project)
+        .filter(
+            models.Project.id == project_id,
+            models.Project.owner_id == user_id,
+            models.Project.deleted_at.is_(None),
+        )
+        .first()
+    )
+    if not obj:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return obj
 
 
 # ---------- CREATE ----------
@@ -34,53 +60,203 @@ def create_project(
         owner_id=current_user.id,
     )
     db.add(obj)
+    etags.touch_owners(db, [current_user.id])
     db.commit()
     db.refresh(obj)
+    events.project_event(current_user.id, "project.created", obj)
     return obj
 
 
+# ---------- Embedded logs ----------
+def recent_logs_stmt(dialect: str, project_ids, n: int):
+    """The n newest logs of every one of these projects, in one statement.
+
+    Each project's logs are read off ix_logs_project_id_created_at newest first and
+    the scan stops after n, however many logs the project has.
+    """
+    newest = (_logs.c.created_at.desc(), _logs.c.id.desc())
+    if dialect == "postgresql":
+        top = (
+            select(*(_logs.c[f] for f in LOG_FIELDS))
+            .where(_logs.c.project_id == _projects.c.id)
+            .order_by(*newest)
+            .limit(n)
+            .lateral("top")
+        )
+        return (
+            select(top)
+            .select_from(_projects)
+            .join(top, true())
+            .where(_projects.c.id.in_(project_ids))
+            .order_by(top.c.project_id, top.c.created_at.desc(), top.c.id.desc())
+        )
+    # no LATERAL: the same per-project LIMIT as a subquery correlated to each project
+    # (a row_number() window would number every log of every project first)
+    newest_ids = _logs.alias("newest")
+    top_ids = (
+        select(newest_ids.c.id)
+        .where(newest_ids.c.project_id == _projects.c.id)
+        .order_by(newest_ids.c.created_at.desc(), newest_ids.c.id.desc())
+        .limit(n)
+    )
+    return (
+        select(*(_logs.c[f] for f in LOG_FIELDS))
+        .select_from(_projects)
+        .join(_logs, _logs.c.id.in_(top_ids.scalar_subquery()))
+        .where(_projects.c.id.in_(project_ids))
+        .order_by(_logs.c.project_id, *newest)
+    )
+
+
+def embed_logs(projects, log_rows) -> list[dict]:
+    """ProjectOut dicts with a "logs" list each, from recent_logs_stmt's rows."""
+    by_project = {p.id: [] for p in projects}
+    for row in log_rows:
+        by_project[row.project_id].append(row._asdict())
+    return [
+        {**{f: getattr(p, f, None) for f in PROJECT_FIELDS}, "logs": by_project[p.id]}
+        for p in projects
+    ]
+
+
+def _with_logs(db: Session, projects, n: int) -> list[dict]:
+    if not projects:
+        return []
+    rows = db.execute(
+        recent_logs_stmt(db.get_bind().dialect.name, [p.id for p in projects], n)
+    ).all()
+    return embed_logs(projects, rows)
+
+
 # ---------- READ (List) ----------
-@router.get("/", response_model=List[schemas.ProjectOut])
+@router.get(
+    "/",
+    response_model=List[schemas.ProjectOut],
+    dependencies=[Depends(ratelimit.per_user("search", when=search.is_search))],
+)
 def list_projects(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user),
-    q: str | None = Query(default=None, description="Search title/description (case-insensitive)"),
+    q: str | None = Query(
+        default=None, description="Full-text search over title/description, ranked"
+    ),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="Deprecated: prefer cursor for deep pages"),
+    cursor: str | None = Query(
+        default=None, description=f"Opaque cursor from {NEXT_CURSOR_HEADER}"
+    ),
+    include: Literal["logs"] | None = INCLUDE,
+    logs_limit: int = LOGS_LIMIT,
 ):
-    query = db.query(models.Project).filter(models.Project.owner_id == current_user.id)
-    if q:
-        like = f"%{q}%"
-        query = query.filter(
-            or_(
-                models.Project.title.ilike(like),
-                models.Project.description.ilike(like),
-            )
+    if cursor is not None and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    logs = logs_limit if include else 0
+
+    if project_cache.enabled:
+        entry = project_cache.fetch(
+            "l",
+            f"u{current_user.id}",
+            etags.query_digest(request),
+            lambda: _list_entry(db, request, current_user.id, q, limit, offset, cursor, logs),
+            cache.LIST_TTL,
         )
+        return etags.cached_response(request, entry)
+
+    # read the stamp before the rows, so a concurrent write can only make the tag older
+    etag = etags.list_etag(current_user.id, db.scalar(etags.list_stamp(current_user.id)), request)
+    if etags.not_modified(request, etag):
+        return etags.not_modified_response(etag)
+
+    rows, next_cursor = _list_page(db, current_user.id, q, limit, offset, cursor)
+    headers = etags.cache_headers(etag)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if logs:
+        return responses.ORJSONResponse(_with_logs(db, rows, logs), headers=headers)
+    response.headers.update(headers)
+    if responses.FAST_LISTS:
+        return responses.dump_rows(schemas.ProjectOut, rows, headers=response.headers)
+    return rows
+
+
+def _list_page(db: Session, user_id: int, q, limit: int, offset: int, cursor):
+    query = db.query(models.Project).filter(
+        models.Project.owner_id == user_id, models.Project.deleted_at.is_(None)
+    )
+    rank = None
+    if q:
+        query, rank = search.apply_search(query, db.get_bind().dialect.name, q)
+
+    # newest first, or best match first when searching; the cursor seeks past the
+    # last row seen instead of scanning skipped rows
+    query = keyset(query, models.Project.id, cursor, rank)
+
+    # fetch one extra row to know whether another page exists
+    return split_page(query.offset(offset).limit(limit + 1).all(), limit, rank is not None)
 
-    # order by newest first (fallback to id if you don't have timestamps)
-    query = query.order_by(models.Project.id.desc())
 
-    return query.offset(offset).limit(limit).all()
+def _list_entry(
+    db: Session, request: Request, user_id: int, q, limit, offset, cursor, logs=0
+) -> cache.Entry:
+    etag = etags.list_etag(user_id, db.scalar(etags.list_stamp(user_id)), request)
+    rows, next_cursor = _list_page(db, user_id, q, limit, offset, cursor)
+    headers = etags.cache_headers(etag)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if logs:
+        return cache.Entry(responses.dumps(_with_logs(db, rows, logs)), headers)
+    return cache.Entry(responses.dump_rows(schemas.ProjectOut, rows).body, headers)
 
 
 # ---------- READ (By ID) ----------
 @router.get("/{project_id}", response_model=schemas.ProjectOut)
 def get_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user),
+    include: Literal["logs"] | None = INCLUDE,
+    logs_limit: int = LOGS_LIMIT,
 ):
-    obj = (
-        db.query(models.Project)
-        .filter(models.Project.id == project_id, models.Project.owner_id == current_user.id)
-        .first()
-    )
-    if not obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    logs = logs_limit if include else 0
+    if project_cache.enabled:
+        entry = project_cache.fetch(
+            "p",
+            f"p{project_id}",
+            f"{current_user.id}.l{logs}" if logs else current_user.id,
+            lambda: _project_entry(db, project_id, current_user.id, logs),
+            cache.PROJECT_TTL,
+        )
+        return etags.cached_response(request, entry)
+
+    if etags.is_conditional(request):
+        # answer a revalidation from the (version, updated_at) stamp alone
+        stamp = db.execute(etags.project_stamp(project_id, current_user.id)).first()
+        if not stamp:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+        etag = etags.project_etag(project_id, stamp.version, logs)
+        if etags.not_modified(request, etag, stamp.updated_at):
+            return etags.not_modified_response(etag, stamp.updated_at)
+
+    obj = _get_owned(db, project_id, current_user.id)
+    headers = etags.cache_headers(etags.project_etag(obj.id, obj.version, logs), obj.updated_at)
+    if logs:
+        return responses.ORJSONResponse(_with_logs(db, [obj], logs)[0], headers=headers)
+    response.headers.update(headers)
     return obj
 
 
+def _project_entry(db: Session, project_id: int, user_id: int, logs: int = 0) -> cache.Entry:
+    obj = _get_owned(db, project_id, user_id)
+    headers = etags.cache_headers(etags.project_etag(obj.id, obj.version, logs), obj.updated_at)
+    if logs:
+        return cache.Entry(responses.dumps(_with_logs(db, [obj], logs)[0]), headers)
+    return cache.Entry(schemas.ProjectOut.model_validate(obj).model_dump_json().encode(), headers)
+
+
 # ---------- UPDATE (Partial) ----------
 @router.patch("/{project_id}", response_model=schemas.ProjectOut)
 def update_project(
@@ -89,13 +265,7 @@ def update_project(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    obj = (
-        db.query(models.Project)
-        .filter(models.Project.id == project_id, models.Project.owner_id == current_user.id)
-        .first()
-    )
-    if not obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    obj = _get_owned(db, project_id, current_user.id)
 
     # apply only provided fields
     if payload.title is not None:
@@ -103,8 +273,11 @@ def update_project(
     if payload.description is not None:
         obj.description = payload.description
 
+    etags.touch_owners(db, [current_user.id])
+    cache.invalidate_projects(db, [obj.id])
     db.commit()
     db.refresh(obj)
+    events.project_event(current_user.id, "project.updated", obj)
     return obj
 
 
@@ -116,42 +289,42 @@ def replace_project(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    obj = (
-        db.query(models.Project)
-        .filter(models.Project.id == project_id, models.Project.owner_id == current_user.id)
-        .first()
-    )
-    if not obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    obj = _get_owned(db, project_id, current_user.id)
 
     obj.title = payload.title
     obj.description = payload.description
 
+    etags.touch_owners(db, [current_user.id])
+    cache.invalidate_projects(db, [obj.id])
     db.commit()
     db.refresh(obj)
+    events.project_event(current_user.id, "project.updated", obj)
     return obj
 
 
 # ---------- DELETE ----------
-@router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/{project_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={202: {"model": schemas.JobOut, "description": "Deletion queued; poll the job"}},
+)
 def delete_project(
     project_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    obj = (
-        db.query(models.Project)
-        .filter(models.Project.id == project_id, models.Project.owner_id == current_user.id)
-        .first()
-    )
-    if not obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    obj = _get_owned(db, project_id, current_user.id)
 
-    # If your DB has ON DELETE CASCADE for logs, this is unnecessary.
-    # Keeping it to be safe in case FK wasn't created with cascade.
-    db.query(models.Log).filter(models.Log.project_id == obj.id).delete(synchronize_session=False)
+    # purging a big project's logs takes seconds: queue it rather than hold the worker,
+    # with the project hidden from now on
+    if obj.log_count > DELETE_INLINE_LOGS:
+        job = jobs.queue_project_delete(db, obj, current_user.id)
+        db.commit()
+        events.project_deleted(current_user.id, obj.id)
+        return accepted(job)
 
-    db.delete(obj)
-    db.commit()
+    # Delete logs first in short chunked transactions rather than one huge DELETE
+    # (or an equally huge ON DELETE CASCADE) on a busy project; the job's work, inline.
+    jobs.delete_project(db, obj.id, current_user.id)
     # 204 = no body
     return
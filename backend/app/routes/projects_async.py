@@ -0,0 +1,212 @@
+# app/routes/projects_async.py
+# Async twin of routes/projects.py, mounted when DB_ASYNC=1.
+# Handlers run on the event loop instead of holding a threadpool worker.
+# Reads bypass the project cache (app/cache.py), whose backends block; writes still
+# invalidate it, in case sync workers share a redis backend.
+
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import cache, etags, events, jobs, models, ratelimit, responses, schemas, search
+from ..auth import get_async_read_db, get_current_user_async
+from ..database import get_async_db
+from ..pagination import NEXT_CURSOR_HEADER, keyset, split_page
+from .jobs import accepted
+from .projects import DELETE_INLINE_LOGS, INCLUDE, LOGS_LIMIT, embed_logs, recent_logs_stmt
+
+router = APIRouter(
+    prefix="/projects",
+    tags=["Projects"],
+    dependencies=[Depends(ratelimit.per_user("user", current_user=get_current_user_async))],
+)
+
+
+async def _get_owned(db: AsyncSession, project_id: int, user_id: int) -> models.Project:
+    result = await db.execute(
+        select(models.Project).where(
+            models.Project.id == project_id,
+            models.Project.owner_id == user_id,
+            models.Project.deleted_at.is_(None),
+        )
+    )
+    obj = result.scalars().first()
+    if not obj:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    return obj
+
+
+async def _with_logs(db: AsyncSession, projects, n: int) -> list[dict]:
+    if not projects:
+        return []
+    rows = (
+        await db.execute(recent_logs_stmt(db.bind.dialect.name, [p.id for p in projects], n))
+    ).all()
+    return embed_logs(projects, rows)
+
+
+# ---------- CREATE ----------
+@router.post("/", response_model=schemas.ProjectOut, status_code=status.HTTP_201_CREATED)
+async def create_project(
+    project: schemas.ProjectCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+):
+    obj = models.Project(
+        title=project.title,
+        description=project.description,
+        owner_id=current_user.id,
+    )
+    db.add(obj)
+    await db.run_sync(etags.touch_owners, [current_user.id])
+    await db.commit()
+    await db.refresh(obj)
+    events.project_event(current_user.id, "project.created", obj)
+    return obj
+
+
+# ---------- READ (List) ----------
+@router.get(
+    "/",
+    response_model=List[schemas.ProjectOut],
+    dependencies=[
+        Depends(
+            ratelimit.per_user("search", when=search.is_search, current_user=get_current_user_async)
+        )
+    ],
+)
+async def list_projects(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: models.User = Depends(get_current_user_async),
+    q: str | None = Query(
+        default=None, description="Full-text search over title/description, ranked"
+    ),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0, description="Deprecated: prefer cursor for deep pages"),
+    cursor: str | None = Query(
+        default=None, description=f"Opaque cursor from {NEXT_CURSOR_HEADER}"
+    ),
+    include: Literal["logs"] | None = INCLUDE,
+    logs_limit: int = LOGS_LIMIT,
+):
+    if cursor is not None and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+
+    etag = etags.list_etag(
+        current_user.id, await db.scalar(etags.list_stamp(current_user.id)), request
+    )
+    if etags.not_modified(request, etag):
+        return etags.not_modified_response(etag)
+
+    stmt = select(models.Project).where(
+        models.Project.owner_id == current_user.id, models.Project.deleted_at.is_(None)
+    )
+    rank = None
+    if q:
+        stmt, rank = search.apply_search(stmt, db.bind.dialect.name, q)
+    stmt = keyset(stmt, models.Project.id, cursor, rank).offset(offset).limit(limit + 1)
+    result = await db.execute(stmt)
+    rows = result.all() if rank is not None else result.scalars().all()
+    rows, next_cursor = split_page(rows, limit, rank is not None)
+    headers = etags.cache_headers(etag)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if include:
+        return responses.ORJSONResponse(await _with_logs(db, rows, logs_limit), headers=headers)
+    response.headers.update(headers)
+    if responses.FAST_LISTS:
+        return responses.dump_rows(schemas.ProjectOut, rows, headers=response.headers)
+    return rows
+
+
+# ---------- READ (By ID) ----------
+@router.get("/{project_id}", response_model=schemas.ProjectOut)
+async def get_project(
+    project_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: models.User = Depends(get_current_user_async),
+    include: Literal["logs"] | None = INCLUDE,
+    logs_limit: int = LOGS_LIMIT,
+):
+    logs = logs_limit if include else 0
+    if etags.is_conditional(request):
+        stamp = (await db.execute(etags.project_stamp(project_id, current_user.id))).first()
+        if not stamp:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+        etag = etags.project_etag(project_id, stamp.version, logs)
+        if etags.not_modified(request, etag, stamp.updated_at):
+            return etags.not_modified_response(etag, stamp.updated_at)
+
+    obj = await _get_owned(db, project_id, current_user.id)
+    headers = etags.cache_headers(etags.project_etag(obj.id, obj.version, logs), obj.updated_at)
+    if logs:
+        return responses.ORJSONResponse((await _with_logs(db, [obj], logs))[0], headers=headers)
+    response.headers.update(headers)
+    return obj
+
+
+# ---------- UPDATE (Partial) ----------
+@router.patch("/{project_id}", response_model=schemas.ProjectOut)
+async def update_project(
+    project_id: int,
+    payload: schemas.ProjectUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+):
+    obj = await _get_owned(db, project_id, current_user.id)
+    if payload.title is not None:
+        obj.title = payload.title
+    if payload.description is not None:
+        obj.description = payload.description
+    await db.run_sync(etags.touch_owners, [current_user.id])
+    await db.run_sync(cache.invalidate_projects, [obj.id])
+    await db.commit()
+    await db.refresh(obj)
+    events.project_event(current_user.id, "project.updated", obj)
+    return obj
+
+
+# ---------- UPDATE (Full) ----------
+@router.put("/{project_id}", response_model=schemas.ProjectOut)
+async def replace_project(
+    project_id: int,
+    payload: schemas.ProjectCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+):
+    obj = await _get_owned(db, project_id, current_user.id)
+    obj.title = payload.title
+    obj.description = payload.description
+    await db.run_sync(etags.touch_owners, [current_user.id])
+    await db.run_sync(cache.invalidate_projects, [obj.id])
+    await db.commit()
+    await db.refresh(obj)
+    events.project_event(current_user.id, "project.updated", obj)
+    return obj
+
+
+# ---------- DELETE ----------
+@router.delete(
+    "/{project_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={202: {"model": schemas.JobOut, "description": "Deletion queued; poll the job"}},
+)
+async def delete_project(
+    project_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+):
+    obj = await _get_owned(db, project_id, current_user.id)
+    if obj.log_count > DELETE_INLINE_LOGS:
+        job = await db.run_sync(jobs.queue_project_delete, obj, current_user.id)
+        await db.commit()
+        events.project_deleted(current_user.id, obj.id)
+        return accepted(job)
+    await db.run_sync(jobs.delete_project, obj.id, current_user.id)
+    return
@@ -0,0 +1,137 @@
+# app/routes/projects_batch.py
+# Batch create/update/delete for importers. Each call does one auth lookup and
+# returns a result per input item. Create/update are a single transaction; delete
+# purges the projects' logs in chunks first, then removes the projects in one.
+# Mounted ahead of the projects router so /projects/batch isn't captured by
+# /projects/{project_id}.
+
+import os
+from typing import Annotated, List
+
+from fastapi import APIRouter, Body, Depends, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from .. import cache, etags, events, models, ratelimit, schemas
+from ..auth import get_current_user
+from ..database import get_db
+from ..retention import purge_project_logs
+
+router = APIRouter(
+    prefix="/projects/batch", tags=["Projects"], dependencies=[Depends(ratelimit.per_user("user"))]
+)
+
+BATCH_MAX = int(os.getenv("PROJECT_BATCH_MAX", "1000"))
+
+
+def _owned_ids(db: Session, ids, user_id: int) -> set[int]:
+    rows = db.execute(
+        select(models.Project.id).where(
+            models.Project.owner_id == user_id,
+            models.Project.id.in_(set(ids)),
+            models.Project.deleted_at.is_(None),
+        )
+    )
+    return set(rows.scalars())
+
+
+def _not_found(index: int, project_id: int) -> schemas.BatchItemResult:
+    return schemas.BatchItemResult(
+        index=index, id=project_id, status=status.HTTP_404_NOT_FOUND, detail="Project not found"
+    )
+
+
+# ---------- CREATE (Batch) ----------
+@router.post("", response_model=List[schemas.BatchItemResult])
+def create_projects(
+    items: Annotated[List[schemas.ProjectCreate], Body(min_length=1, max_length=BATCH_MAX)],
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    rows = [
+        {"title": p.title, "description": p.description, "owner_id": current_user.id} for p in items
+    ]
+    # one multi-row INSERT ... RETURNING, results in input order
+    created = db.scalars(
+        insert(models.Project).returning(models.Project, sort_by_parameter_order=True), rows
+    ).all()
+    etags.touch_owners(db, [current_user.id])
+    ids = [obj.id for obj in created]
+    db.commit()
+    events.projects_batch(current_user.id, "create", ids)
+    return [
+        schemas.BatchItemResult(index=i, id=obj.id, status=status.HTTP_201_CREATED, project=obj)
+        for i, obj in enumerate(created)
+    ]
+
+
+# ---------- UPDATE (Batch, Partial) ----------
+@router.patch("", response_model=List[schemas.BatchItemResult])
+def update_projects(
+    items: Annotated[List[schemas.ProjectBatchUpdate], Body(min_length=1, max_length=BATCH_MAX)],
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    owned = _owned_ids(db, [p.id for p in items], current_user.id)
+
+    # apply only provided fields; executemany UPDATE ... WHERE id = ? per field shape
+    params = []
+    for p in items:
+        if p.id not in owned:
+            continue
+        changes = p.model_dump(exclude={"id"}, exclude_none=True)
+        if changes:
+            params.append({"id": p.id, **changes})
+    if params:
+        db.execute(update(models.Project), params)
+        etags.touch_owners(db, [current_user.id])
+        cache.invalidate_projects(db, [p["id"] for p in params])
+    db.commit()
+    events.projects_batch(current_user.id, "update", list(dict.fromkeys(p["id"] for p in params)))
+
+    fresh = {
+        obj.id: obj
+        for obj in db.scalars(select(models.Project).where(models.Project.id.in_(owned)))
+    }
+    return [
+        (
+            schemas.BatchItemResult(
+                index=i, id=p.id, status=status.HTTP_200_OK, project=fresh[p.id]
+            )
+            if p.id in owned
+            else _not_found(i, p.id)
+        )
+        for i, p in enumerate(items)
+    ]
+
+
+# ---------- DELETE (Batch) ----------
+@router.delete("", response_model=List[schemas.BatchItemResult])
+def delete_projects(
+    ids: Annotated[List[int], Body(min_length=1, max_length=BATCH_MAX)],
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    owned = _owned_ids(db, ids, current_user.id)
+    if owned:
+        purge_project_logs(db, owned)
+        db.execute(
+            delete(models.Project).where(
+                models.Project.id.in_(owned), models.Project.owner_id == current_user.id
+            )
+        )
+        etags.touch_owners(db, [current_user.id])
+        cache.invalidate_projects(db, owned)
+    db.commit()
+    events.projects_batch(current_user.id, "delete", sorted(owned))
+    # a repeated id is reported as deleted only the first time
+    results, done = [], set()
+    for i, project_id in enumerate(ids):
+        if project_id in owned and project_id not in done:
+            done.add(project_id)
+            results.append(
+                schemas.BatchItemResult(index=i, id=project_id, status=status.HTTP_204_NO_CONTENT)
+            )
+        else:
+            results.append(_not_found(i, project_id))
+    return results
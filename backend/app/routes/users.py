@@ -1,52 +1,162 @@
 # app/routes/users.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import sys
 from typing import List
 
-from ..database import SessionLocal
-from .. import models, schemas
-from ..auth import get_current_user, pwd  # pwd is your CryptContext
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import and_, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import cache, etags, models, ratelimit, responses, schemas
+from ..auth import get_current_user, get_read_db
+from ..cache import project_cache
+from ..database import get_db
+from ..pagination import NEXT_CURSOR_HEADER, keyset, keyset_by_key, split_page
+from ..passwords import hash_password
 
 router = APIRouter(prefix="/users", tags=["Users"])
+# Per-user request budget for the authenticated routes (see ratelimit.py)
+user_limit = Depends(ratelimit.per_user("user"))
+
+_users = models.User.__table__
+# What GET /users/?fields= may pick from; all of them by default
+USER_FIELDS = tuple(schemas.UserOut.model_fields)
+
+
+# ---------- Registration ----------
+def register_stmt(payload: schemas.UserCreate, password_hash: str):
+    # one round trip: the unique indexes on username/email do the checking
+    return (
+        insert(_users)
+        .values(username=payload.username, email=payload.email, password=password_hash)
+        .returning(_users.c.id, _users.c.username, _users.c.email)
+    )
+
+
+def duplicate_error(e: IntegrityError) -> HTTPException:
+    """The 400 the old pre-insert lookups gave, from the unique index the INSERT hit."""
+    orig = e.orig
+    # psycopg2 / asyncpg name the constraint; SQLite says "UNIQUE constraint failed: users.email"
+    name = getattr(getattr(orig, "diag", None), "constraint_name", None) or getattr(
+        orig.__cause__, "constraint_name", None
+    )
+    where = name or str(orig)
+    if "email" in where:
+        return HTTPException(status_code=400, detail="Email already registered")
+    if "username" in where:
+        return HTTPException(status_code=400, detail="Username already taken")
+    raise e
 
-# DB session dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 # CREATE user (register)
-@router.post("/", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=schemas.UserOut,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(ratelimit.per_ip("register"))],
+)
 def create_user(payload: schemas.UserCreate, db: Session = Depends(get_db)):
-    # check unique username/email if you want
-    if db.query(models.User).filter(models.User.username == payload.username).first():
-        raise HTTPException(status_code=400, detail="Username already taken")
-    if db.query(models.User).filter(models.User.email == payload.email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    user = models.User(
-        username=payload.username,
-        email=payload.email,
-        password=pwd.hash(payload.password),  # hash with the same context used by auth
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    try:
+        user = db.execute(register_stmt(payload, hash_password(payload.password))).one()
+        cache.invalidate_users(db)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise duplicate_error(e) from None
     return user
 
-# (Optional) LIST all users (admin/debug)
-@router.get("/", response_model=List[schemas.UserOut])
+
+# ---------- Listing ----------
+def pick_fields(fields: str | None) -> tuple[str, ...]:
+    if not fields:
+        return USER_FIELDS
+    picked = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in picked if f not in USER_FIELDS]
+    if unknown or not picked:
+        raise HTTPException(
+            status_code=400, detail=f"fields must be a subset of {','.join(USER_FIELDS)}"
+        )
+    return picked
+
+
+def username_prefix(dialect: str, prefix: str):
+    if dialect == "postgresql":
+        # served by ix_users_username_prefix (varchar_pattern_ops, alembic 0008)
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return _users.c.username.like(escaped + "%", escape="\\")
+    # SQLite's LIKE is case-insensitive and can't use the (BINARY) username index;
+    # the same case-sensitive prefix as a range can
+    upper = _prefix_upper(prefix)
+    if upper is None:
+        return _users.c.username >= prefix
+    return and_(_users.c.username >= prefix, _users.c.username < upper)
+
+
+def _prefix_upper(prefix: str) -> str | None:
+    """The smallest string above every one starting with prefix, None if there is none."""
+    # U+10FFFF can't be bumped: drop it and carry into the char before
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return None
+    bumped = ord(stem[-1]) + 1
+    if 0xD800 <= bumped <= 0xDFFF:
+        bumped = 0xE000  # surrogates don't encode to UTF-8
+    return stem[:-1] + chr(bumped)
+
+
+def list_stmt(dialect: str, fields, username: str | None, limit: int, cursor: str | None):
+    # id and username are always read, the next cursor is made of them
+    stmt = select(*(_users.c[c] for c in dict.fromkeys(("id", "username", *fields))))
+    if username:
+        # prefix search: walk the username index in order rather than sort matches by id
+        stmt = keyset_by_key(
+            stmt.where(username_prefix(dialect, username)), _users.c.username, cursor
+        )
+    else:
+        stmt = keyset(stmt, _users.c.id, cursor, descending=False)
+    return stmt.limit(limit + 1)
+
+
+def page_entry(rows, limit: int, fields, username: str | None) -> cache.Entry:
+    items, next_cursor = split_page(rows, limit, key="username" if username else None)
+    body = responses.dumps([{f: getattr(row, f) for f in fields} for row in items])
+    return cache.Entry(body, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {})
+
+
+# LIST users: id order, or username order for a prefix search
+@router.get("/", response_model=List[schemas.UserOut], dependencies=[user_limit])
 def list_users(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(
+        default=None, description=f"Opaque cursor from {NEXT_CURSOR_HEADER}"
+    ),
+    username: str | None = Query(
+        default=None, min_length=1, max_length=150, description="Username prefix"
+    ),
+    fields: str | None = Query(
+        default=None, description=f"Comma-separated subset of {','.join(USER_FIELDS)}"
+    ),
 ):
-    # You may want to restrict this endpoint. For now it lists all for debugging.
-    return db.query(models.User).order_by(models.User.id.asc()).all()
+    picked = pick_fields(fields)
+
+    def load():
+        rows = db.execute(
+            list_stmt(db.get_bind().dialect.name, picked, username, limit, cursor)
+        ).all()
+        return page_entry(rows, limit, picked, username)
+
+    if project_cache.enabled:
+        entry = project_cache.fetch("u", "users", etags.query_digest(request), load, cache.LIST_TTL)
+    else:
+        entry = load()
+    return etags.cached_response(request, entry)
+
 
 # Current user
-@router.get("/me", response_model=schemas.UserOut)
+@router.get("/me", response_model=schemas.UserOut, dependencies=[user_limit])
 def get_me(current_user: models.User = Depends(get_current_user)):
     return current_user
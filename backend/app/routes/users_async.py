@@ -0,0 +1,69 @@
+# app/routes/users_async.py
+# Async twin of routes/users.py, mounted when DB_ASYNC=1; the statements come from there.
+# The listing reads around the cache (see projects_async.py); registration still
+# invalidates it.
+
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, Request, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import cache, etags, models, ratelimit, schemas
+from ..auth import get_async_read_db, get_current_user_async
+from ..database import get_async_db
+from ..pagination import NEXT_CURSOR_HEADER
+from ..passwords import hash_password_async
+from .users import USER_FIELDS, duplicate_error, list_stmt, page_entry, pick_fields, register_stmt
+
+router = APIRouter(prefix="/users", tags=["Users"])
+user_limit = Depends(ratelimit.per_user("user", current_user=get_current_user_async))
+
+
+# CREATE user (register)
+@router.post(
+    "/",
+    response_model=schemas.UserOut,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(ratelimit.per_ip("register"))],
+)
+async def create_user(payload: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    password_hash = await hash_password_async(payload.password)
+    try:
+        user = (await db.execute(register_stmt(payload, password_hash))).one()
+        await db.run_sync(cache.invalidate_users)
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise duplicate_error(e) from None
+    return user
+
+
+# LIST users: id order, or username order for a prefix search
+@router.get("/", response_model=List[schemas.UserOut], dependencies=[user_limit])
+async def list_users(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: models.User = Depends(get_current_user_async),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(
+        default=None, description=f"Opaque cursor from {NEXT_CURSOR_HEADER}"
+    ),
+    username: str | None = Query(
+        default=None, min_length=1, max_length=150, description="Username prefix"
+    ),
+    fields: str | None = Query(
+        default=None, description=f"Comma-separated subset of {','.join(USER_FIELDS)}"
+    ),
+):
+    picked = pick_fields(fields)
+    rows = (
+        await db.execute(list_stmt(db.bind.dialect.name, picked, username, limit, cursor))
+    ).all()
+    return etags.cached_response(request, page_entry(rows, limit, picked, username))
+
+
+# Current user
+@router.get("/me", response_model=schemas.UserOut, dependencies=[user_limit])
+async def get_me(current_user: models.User = Depends(get_current_user_async)):
+    return current_user
@@ -1,7 +1,9 @@
 # app/schemas.py
 from datetime import datetime
+from typing import Any, Optional
+
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+
 
 # ------------------------
 # USER SCHEMAS
@@ -10,13 +12,16 @@ class UserBase(BaseModel):
     username: str
     email: str
 
+
 class UserCreate(UserBase):
     password: str
 
+
 class UserOut(UserBase):
     id: int
     model_config = ConfigDict(from_attributes=True)
 
+
 # ------------------------
 # PROJECT SCHEMAS
 # ------------------------
@@ -24,31 +29,83 @@ class ProjectBase(BaseModel):
     title: str
     description: Optional[str] = None
 
+
 class ProjectCreate(ProjectBase):
     pass
 
+
 class ProjectUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
 
+
 class ProjectOut(ProjectBase):
     id: int
     owner_id: int
     # keep timestamps optional unless your DB has them
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    log_count: int = 0
+    last_log_at: Optional[datetime] = None
     model_config = ConfigDict(from_attributes=True)
 
+
+# ------------------------
+# BATCH SCHEMAS
 # ------------------------
-# LOG SCHEMAS (if you expose logs)
+class ProjectBatchUpdate(ProjectUpdate):
+    id: int
+
+
+class BatchItemResult(BaseModel):
+    # position in the request array, so results can be matched back to inputs
+    index: int
+    id: Optional[int] = None
+    status: int
+    detail: Optional[str] = None
+    project: Optional[ProjectOut] = None
+
+
+# ------------------------
+# LOG SCHEMAS
 # ------------------------
 class LogBase(BaseModel):
     message: str
 
+
 class LogCreate(LogBase):
     project_id: int
 
+
+class LogIngest(LogBase):
+    # one line of a batched ingest; server time is used when omitted
+    created_at: Optional[datetime] = None
+
+
 class LogOut(LogBase):
     id: int
     project_id: int
+    created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+
+class LogIngestResult(BaseModel):
+    accepted: int
+    buffered: bool
+
+
+# ------------------------
+# JOB SCHEMAS
+# ------------------------
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    status: str  # queued | running | done | failed
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
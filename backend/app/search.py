@@ -0,0 +1,87 @@
+# app/search.py - ranked full-text search over project title/description
+#
+# Postgres: projects.search_vector is a generated tsvector column with a GIN index
+#           (alembic 0003), matched with to_tsquery and ranked by ts_rank.
+# SQLite:   projects_fts is an FTS5 external-content table kept in sync by triggers,
+#           ranked by bm25. Used for local tests and benchmarks.
+# PROJECT_SEARCH=ilike switches back to the old unindexed ILIKE scan.
+# rebuild_index() rebuilds either one (the search.rebuild job, app/jobs.py).
+import os
+import re
+
+from sqlalchemy import Float, cast, column, func, literal_column, or_, select, table, text
+
+from . import models
+
+SEARCH_MODE = os.getenv("PROJECT_SEARCH", "fts")
+
+_fts = table("projects_fts", column("rowid"), column("projects_fts"))
+
+
+def _terms(q: str) -> list[str]:
+    # only word characters reach the tsquery/MATCH syntax, so user input can't break it
+    return re.findall(r"\w+", q)
+
+
+def is_search(request) -> bool:
+    """Whether a list request searches (?q=...), for the search rate budget."""
+    return bool(request.query_params.get("q"))
+
+
+def _ilike(stmt, q: str):
+    like = f"%{q}%"
+    return stmt.where(
+        or_(
+            models.Project.title.ilike(like),
+            models.Project.description.ilike(like),
+        )
+    )
+
+
+def apply_search(stmt, dialect: str, q: str):
+    """Restrict a Project query/select to matches for `q`.
+
+    Works on both a legacy Query and a 2.0 select(). Returns (stmt, rank), where
+    rank is a "higher is better" column expression to order by, or None when
+    the ILIKE path was used and there is nothing to rank.
+    """
+    terms = _terms(q)
+    if SEARCH_MODE != "fts" or not terms:
+        return _ilike(stmt, q), None
+
+    if dialect == "postgresql":
+        # every term must match, each as a prefix ("dash" finds "dashboard")
+        tsq = func.to_tsquery("english", " & ".join(f"{t}:*" for t in terms))
+        vector = literal_column("projects.search_vector")
+        rank = cast(func.ts_rank(vector, tsq), Float)
+        return stmt.where(vector.op("@@")(tsq)), rank
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{t}"*' for t in terms)
+        # bm25 is only valid inside the FTS query itself, so rank in a subquery
+        hits = (
+            select(
+                _fts.c.rowid.label("id"), (-func.bm25(literal_column("projects_fts"))).label("rank")
+            )
+            .where(_fts.c.projects_fts.op("MATCH")(match))
+            .subquery("fts_hits")
+        )
+        stmt = stmt.join(hits, hits.c.id == models.Project.id)
+        return stmt, hits.c.rank
+
+    return _ilike(stmt, q), None
+
+
+def rebuild_index(db) -> str | None:
+    """Rebuild the full-text index from the projects table; returns its name."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # CONCURRENTLY keeps projects writable meanwhile, and can't run in a transaction
+        with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("REINDEX INDEX CONCURRENTLY ix_projects_search_vector"))
+        return "ix_projects_search_vector"
+    if dialect == "sqlite":
+        db.execute(_fts.insert().values(projects_fts="rebuild"))
+        db.commit()
+        return "projects_fts"
+    return None
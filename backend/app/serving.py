@@ -0,0 +1,50 @@
+# app/serving.py - production serving under gunicorn (see gunicorn.conf.py)
+#
+# gunicorn is the process manager: it imports the app once (preload), forks the
+# workers, restarts any that die and recycles each after WEB_MAX_REQUESTS. Each
+# worker runs uvicorn's event loop with uvloop and httptools.
+#   gunicorn -c gunicorn.conf.py app.main:app
+import os
+
+from uvicorn_worker import UvicornWorker as _UvicornWorker
+
+# cgroup v2 CPU limit of the container: "<quota> <period>", or "max <period>" if unlimited
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+
+
+def _has(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def cpu_count() -> int:
+    """CPUs this process may actually use: affinity mask, then the cgroup quota.
+
+    os.cpu_count() reports the host's cores; in a container limited to 2 CPUs on a
+    32-core host it would start 32 workers that fight over 2.
+    """
+    try:
+        n = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS
+        n = os.cpu_count() or 1
+    try:
+        with open(CGROUP_CPU_MAX) as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            n = min(n, max(1, -(-int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(n, 1)
+
+
+class UvicornWorker(_UvicornWorker):
+    # "auto" quietly falls back to asyncio/h11; name them so the choice is visible
+    # in the config, and fall back only when the wheels really aren't there
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if _has("uvloop") else "asyncio",
+        "http": "httptools" if _has("httptools") else "h11",
+        "lifespan": "on",
+    }
@@ -0,0 +1,139 @@
+# app/startup.py - what the lifespan does before the app reports ready
+#
+#   DB_POOL_WARM (2)          connections opened at startup and handed back to the
+#                             pool, so the first requests don't pay for connecting;
+#                             capped at DB_POOL_SIZE, at least 1 (for the checks)
+#   DB_CHECK_MIGRATIONS (1)   compare alembic_version with the newest migration;
+#                             while the database is behind, /ready answers 503
+#
+# The schema belongs to Alembic (`alembic upgrade head`; migrate() below does the
+# same for tests and benchmarks). Nothing at import or startup creates tables.
+# If the database is down at startup the app still starts, not ready; each /ready
+# probe retries until it comes up.
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import exc, text
+
+from . import database, dbpool
+
+POOL_WARM = min(int(os.getenv("DB_POOL_WARM", "2")), dbpool.POOL_SIZE)
+CHECK_MIGRATIONS = os.getenv("DB_CHECK_MIGRATIONS", "1") == "1"
+# Newest migration in alembic/versions. Bump it with every new migration (a test checks);
+# reading it from Alembic would put its import and script scan on every worker start.
+SCHEMA_HEAD = "0011_projects_deleted_at"
+ALEMBIC_INI = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"
+)
+
+log = logging.getLogger(__name__)
+
+
+# ---------- Alembic ----------
+def _alembic_config():
+    from alembic.config import Config
+
+    cfg = Config(ALEMBIC_INI)
+    cfg.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    # keep the app's logging as it is (env.py would otherwise reload it from the ini)
+    cfg.attributes["configure_logger"] = False
+    return cfg
+
+
+def migrate(revision: str = "head"):
+    """`alembic upgrade head` against DATABASE_URL, in-process."""
+    from alembic import command
+
+    command.upgrade(_alembic_config(), revision)
+
+
+def script_heads() -> set:
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory.from_config(_alembic_config()).get_heads())
+
+
+def schema_revisions(conn) -> set:
+    """Revisions recorded in alembic_version (empty before the first migration)."""
+    try:
+        return set(conn.scalars(text("SELECT version_num FROM alembic_version")))
+    except exc.DBAPIError:
+        conn.rollback()  # Postgres: the failed statement aborted the transaction
+        return set()
+
+
+# ---------- Readiness ----------
+class Readiness:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.detail = "starting"
+        self.startup_ms = None
+
+    def prepare(self):
+        """Create the engine, warm the pool, check the schema. Safe to call again."""
+        with self._lock:
+            if self.ready:
+                return True
+            t0 = time.perf_counter()
+            try:
+                engine = database.get_engine()
+                conns = [engine.connect() for _ in range(max(POOL_WARM, 1))]
+                try:
+                    if CHECK_MIGRATIONS:
+                        current = schema_revisions(conns[0])
+                        if current != {SCHEMA_HEAD}:
+                            self.detail = (
+                                f"database at {sorted(current) or 'no revision'}, "
+                                f"code at {SCHEMA_HEAD}: run `alembic upgrade head`"
+                            )
+                            log.warning("not ready: %s", self.detail)
+                            return False
+                    for conn in conns:
+                        conn.execute(text("SELECT 1"))
+                finally:
+                    for conn in conns:
+                        conn.close()  # back to the pool, still open
+            except exc.OperationalError as e:
+                self.detail = f"database unavailable: {e.orig}"
+                log.warning("not ready: %s", self.detail)
+                return False
+            self.ready = True
+            self.detail = "ready"
+            self.startup_ms = round((time.perf_counter() - t0) * 1000, 1)
+            return True
+
+    async def prepare_async(self):
+        # DB_ASYNC: open the async pool too (the sync engine stays for the routes that use it)
+        engine = database.get_async_engine()
+        if engine is None:
+            return
+        conns = [await engine.connect() for _ in range(max(POOL_WARM, 1))]
+        for conn in conns:
+            await conn.close()
+
+    def check(self) -> bool:
+        """Ready and the database still answers; retries startup if it never finished."""
+        if not self.ready:
+            return self.prepare()
+        try:
+            with database.get_engine().connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except exc.OperationalError as e:
+            self.detail = f"database unavailable: {e.orig}"
+            return False
+        self.detail = "ready"
+        return True
+
+    def status(self) -> dict:
+        return {
+            "status": "ready" if self.ready and self.detail == "ready" else "unavailable",
+            "detail": self.detail,
+            "startup_ms": self.startup_ms,
+            "pool_warm": POOL_WARM,
+        }
+
+
+readiness = Readiness()
@@ -0,0 +1,6 @@
+# Benchmarks measure the app, not the rate limiter: one client IP and a handful of
+# users would hit the per-client budgets (app/ratelimit.py) in seconds. RATE_LIMIT=1
+# in the environment measures with it on.
+import os
+
+os.environ.setdefault("RATE_LIMIT", "0")
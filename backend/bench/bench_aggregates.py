@@ -0,0 +1,114 @@
+# Listing 50 projects with their log counts: stored counters vs counting on the fly
+#  python -m bench.bench_aggregates [logs_per_project]
+import sys
+from datetime import datetime, timedelta, timezone
+
+from .common import make_client, measure, register, report, summarize, use_sqlite
+
+use_sqlite()
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app import ingest, models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+
+PROJECTS, LIMIT = 200, 50
+
+
+def seed(client, headers, per_project):
+    ids = [
+        client.post("/projects/", json={"title": f"p{i}"}, headers=headers).json()["id"]
+        for i in range(PROJECTS)
+    ]
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    db = SessionLocal()
+    for pid in ids:
+        # write_logs keeps the counters current, exactly like the ingest endpoint
+        ingest.write_logs(
+            db,
+            [
+                {"project_id": pid, "message": "bench", "created_at": start + timedelta(seconds=i)}
+                for i in range(per_project)
+            ],
+        )
+        db.commit()
+    db.close()
+
+
+def page(db, owner_id):
+    stmt = (
+        select(models.Project)
+        .where(models.Project.owner_id == owner_id)
+        .order_by(models.Project.id.desc())
+        .limit(LIMIT)
+    )
+    return db.scalars(stmt).all()
+
+
+def n_plus_one(owner_id):
+    # what a dashboard has to do without the counters: one COUNT/MAX per project
+    db = SessionLocal()
+    try:
+        return [
+            (
+                p.id,
+                *db.execute(
+                    select(func.count(), func.max(models.Log.created_at)).where(
+                        models.Log.project_id == p.id
+                    )
+                ).one(),
+            )
+            for p in page(db, owner_id)
+        ]
+    finally:
+        db.close()
+
+
+def grouped(owner_id):
+    # the best single-query alternative: aggregate logs per page of projects
+    db = SessionLocal()
+    try:
+        ids = [p.id for p in page(db, owner_id)]
+        stmt = (
+            select(models.Log.project_id, func.count(), func.max(models.Log.created_at))
+            .where(models.Log.project_id.in_(ids))
+            .group_by(models.Log.project_id)
+        )
+        return db.execute(stmt).all()
+    finally:
+        db.close()
+
+
+def stored(owner_id):
+    db = SessionLocal()
+    try:
+        return [(p.id, p.log_count, p.last_log_at) for p in page(db, owner_id)]
+    finally:
+        db.close()
+
+
+def main(per_project=2_000, n=50):
+    client = make_client()
+    headers = register(client)
+    owner_id = client.get("/users/me", headers=headers).json()["id"]
+    seed(client, headers, per_project)
+    assert [c for _, c, _ in stored(owner_id)] == [c for _, c, _ in n_plus_one(owner_id)]
+
+    report(
+        f"{LIMIT} projects + log stats ({PROJECTS * per_project} logs)",
+        [
+            (
+                "GET /projects/ (counters)",
+                summarize(
+                    measure(lambda: client.get(f"/projects/?limit={LIMIT}", headers=headers), n)
+                ),
+            ),
+            ("query: stored counters", summarize(measure(lambda: stored(owner_id), n))),
+            ("query: COUNT per project", summarize(measure(lambda: n_plus_one(owner_id), n))),
+            ("query: grouped COUNT", summarize(measure(lambda: grouped(owner_id), n))),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
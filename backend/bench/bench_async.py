@@ -0,0 +1,91 @@
+# Throughput of GET /projects/ at 50/200/1000 concurrent clients, sync vs async handlers.
+# Each mode runs in its own subprocess because DB_ASYNC is read at import time.
+#  python -m bench.bench_async [seconds]
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+LEVELS = (50, 200, 1000)
+# Same pool for both modes, sized to Starlette's 40 threads: with the default 5+10
+# pool, sync handlers deadlock (every thread waits on a connection whose session
+# can only be closed by another thread) and the run degrades into pool timeouts.
+POOL_ENV = {"DB_POOL_SIZE": "40", "DB_MAX_OVERFLOW": "0", "DB_POOL_TIMEOUT": "5"}
+
+
+async def _drive(seconds):
+    import httpx
+
+    from app.main import app
+    from app.startup import migrate
+
+    from .common import register
+
+    migrate()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as ac:
+        # register/login through a sync client sharing the same DB
+        from fastapi.testclient import TestClient
+
+        with TestClient(app) as tc:
+            headers = register(tc)
+            for i in range(20):
+                tc.post("/projects/", json={"title": f"p{i}", "description": "x"}, headers=headers)
+
+        results = {}
+        for clients in LEVELS:
+            done = errors = 0
+            deadline = time.perf_counter() + seconds
+
+            async def worker(deadline=deadline):
+                nonlocal done, errors
+                while time.perf_counter() < deadline:
+                    r = await ac.get("/projects/", headers=headers)
+                    if r.status_code == 200:
+                        done += 1
+                    else:
+                        errors += 1
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(clients)))
+            results[clients] = {
+                "rps": round(done / (time.perf_counter() - t0), 1),
+                "errors": errors,
+            }
+        return results
+
+
+def main(seconds=5.0):
+    db_dir = tempfile.mkdtemp()
+    rows = {}
+    for mode in ("0", "1"):
+        env = dict(
+            os.environ,
+            DB_ASYNC=mode,
+            DATABASE_URL=f"sqlite:///{db_dir}/bench_{mode}.db",
+            **POOL_ENV,
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.bench_async", "--child", str(seconds)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        rows["async" if mode == "1" else "sync"] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print("\nGET /projects/ throughput (req/s, errors)")
+    print(f"  {'clients':<10}" + "".join(f"{m:>20}" for m in rows))
+    for clients in LEVELS:
+        cells = [rows[m][str(clients)] for m in rows]
+        print(f"  {clients:<10}" + "".join(f"{c['rps']:>14} {c['errors']:>5}" for c in cells))
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        print(json.dumps(asyncio.run(_drive(float(sys.argv[-1])))))
+    else:
+        main(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0)
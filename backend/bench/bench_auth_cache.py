@@ -0,0 +1,32 @@
+# Per-request latency of GET /projects/ with and without the token cache
+from .common import make_client, measure, register, report, summarize, use_sqlite
+
+use_sqlite()
+
+from app.auth import token_cache  # noqa: E402
+
+
+def main(n=2000):
+    client = make_client()
+    headers = register(client)
+    for i in range(20):
+        client.post("/projects/", json={"title": f"p{i}", "description": "bench"}, headers=headers)
+
+    def call():
+        return client.get("/projects/", headers=headers)
+
+    size = token_cache.maxsize
+    token_cache.maxsize = 0
+    token_cache.clear()
+    cold = summarize(measure(call, n))
+
+    token_cache.maxsize = size
+    token_cache.clear()
+    warm = summarize(measure(call, n))
+
+    report("GET /projects/ (20 rows)", [("no token cache", cold), ("token cache", warm)])
+    print(f"  cache stats: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Importer throughput: looped single-row API vs /projects/batch
+#  python -m bench.bench_batch [rows]
+import sys
+import time
+
+from .common import make_client, register, use_sqlite
+
+use_sqlite()
+
+CHUNK = 500
+
+
+def _rate(label, n, fn):
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    print(f"  {label:<32} {n / dt:>10.0f} rows/s  ({dt:.2f}s)")
+
+
+def main(rows=5000):
+    client = make_client()
+    looped, batched = register(client), register(client)
+    items = [{"title": f"p{i}", "description": "imported"} for i in range(rows)]
+    chunks = [items[i : i + CHUNK] for i in range(0, rows, CHUNK)]
+    print(f"\n{rows} projects, batch size {CHUNK}")
+
+    _rate(
+        "POST /projects/ (looped)",
+        rows,
+        lambda: [client.post("/projects/", json=p, headers=looped) for p in items],
+    )
+    created = []
+    _rate(
+        "POST /projects/batch",
+        rows,
+        lambda: [
+            created.extend(
+                r["id"] for r in client.post("/projects/batch", json=c, headers=batched).json()
+            )
+            for c in chunks
+        ],
+    )
+
+    ids = [p["id"] for p in client.get("/projects/?limit=200", headers=looped).json()]
+    n = len(ids)
+    _rate(
+        f"PATCH /projects/{{id}} (looped, {n})",
+        n,
+        lambda: [client.patch(f"/projects/{i}", json={"title": "x"}, headers=looped) for i in ids],
+    )
+    _rate(
+        "PATCH /projects/batch",
+        rows,
+        lambda: [
+            client.patch(
+                "/projects/batch",
+                json=[{"id": i, "title": "x"} for i in created[k : k + CHUNK]],
+                headers=batched,
+            )
+            for k in range(0, rows, CHUNK)
+        ],
+    )
+    _rate(
+        f"DELETE /projects/{{id}} (looped, {n})",
+        n,
+        lambda: [client.delete(f"/projects/{i}", headers=looped) for i in ids],
+    )
+    _rate(
+        "DELETE /projects/batch",
+        rows,
+        lambda: [
+            client.request(
+                "DELETE", "/projects/batch", json=created[k : k + CHUNK], headers=batched
+            )
+            for k in range(0, rows, CHUNK)
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,89 @@
+# Read latency and hit rate for project reads with the read-through cache off, on the
+# memory backend and on a redis-compatible backend (fakeredis, in-process, so it shows
+# the client/encoding overhead but not a network hop), plus a miss stampede.
+#  python -m bench.bench_cache [operations]
+import random
+import threading
+import time
+
+from .common import make_client, register, report, summarize, use_sqlite
+
+use_sqlite("cache.db")
+
+from app.cache import Cache, Entry, MemoryBackend, RedisBackend, project_cache  # noqa: E402
+
+
+def _mixed(client, headers, pids, n, write_every=10):
+    # 9 reads (single projects and first list pages) per write, like a dashboard
+    rnd = random.Random(5)
+    reads = []
+    for i in range(n):
+        if i % write_every == 0:
+            client.patch(f"/projects/{rnd.choice(pids)}", json={"title": f"t{i}"}, headers=headers)
+            continue
+        url = f"/projects/{rnd.choice(pids)}" if rnd.random() < 0.7 else "/projects/?limit=50"
+        t0 = time.perf_counter()
+        assert client.get(url, headers=headers).status_code == 200
+        reads.append((time.perf_counter() - t0) * 1000)
+    return reads
+
+
+def _stampede(threads=32, load_ms=20):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(load_ms / 1000)
+        return Entry(b"[]", {})
+
+    c = Cache(MemoryBackend(100))
+    barrier = threading.Barrier(threads)
+
+    def hit():
+        barrier.wait()
+        c.fetch("l", 1, "q", loader, 60)
+
+    workers = [threading.Thread(target=hit) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return len(calls)
+
+
+def main(n=3000):
+    client = make_client()
+    headers = register(client)
+    rnd = random.Random(1)
+    pids = [
+        client.post(
+            "/projects/",
+            json={"title": f"p{i}", "description": "word " * rnd.randint(50, 300)},
+            headers=headers,
+        ).json()["id"]
+        for i in range(50)
+    ]
+    backends = {"no cache": None, "memory": MemoryBackend(10000)}
+    try:
+        import fakeredis
+
+        backends["redis (fakeredis)"] = RedisBackend(fakeredis.FakeRedis())
+    except ImportError:
+        pass
+
+    rows, rates = [], {}
+    for label, backend in backends.items():
+        project_cache.backend = backend
+        project_cache._counts.clear()
+        rows.append((label, summarize(_mixed(client, headers, pids, n))))
+        rates[label] = {k: v["hit_rate"] for k, v in project_cache.stats().get("kinds", {}).items()}
+    report(f"project reads, 1 write per 9 reads, {n} operations", rows)
+    for label, r in rates.items():
+        print(f"  {label:<18} hit rate {r}")
+    print(f"\n32 concurrent misses on one key, 20 ms loader: {_stampede()} load(s)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
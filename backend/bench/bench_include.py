@@ -0,0 +1,155 @@
+# Pages of 200 projects with their newest logs (GET /projects/?include=logs).
+# Compares ways of loading each project's newest logs for one page:
+#  N+1:          a LIMIT query per project, which is what walking a lazy Project.logs does
+#  selectinload: one query, but it reads every log of every project on the page
+#  row_number(): one windowed query, which numbers every log of the page's projects
+#  recent_logs_stmt: one query, LATERAL on Postgres or a correlated LIMIT elsewhere,
+#                read off the (project_id, created_at) index newest first
+# then the endpoint end to end, with and without include=logs.
+#  python -m bench.bench_include [logs per project] [--postgres]
+# Uses DATABASE_URL when set, otherwise a throwaway SQLite file.
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from .common import make_client, measure, register, report, summarize, use_sqlite
+
+if "--postgres" in sys.argv:
+    from .suite import _throwaway_postgres
+
+    os.environ["DATABASE_URL"] = _throwaway_postgres()
+use_sqlite("include.db")
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.routes import projects  # noqa: E402
+
+PAGE = 200
+N_LOGS = 10
+_logs = models.Log.__table__
+
+
+def seed(client, headers, per_project):
+    t0 = time.perf_counter()
+    r = client.post(
+        "/projects/batch",
+        json=[{"title": f"p{i}", "description": "d"} for i in range(PAGE)],
+        headers=headers,
+    )
+    ids = [item["id"] for item in r.json()]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        for pid in ids:
+            conn.execute(
+                insert(_logs),
+                [
+                    {
+                        "project_id": pid,
+                        "message": f"line {i}",
+                        "created_at": start + timedelta(seconds=i),
+                    }
+                    for i in range(per_project)
+                ],
+            )
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE logs"))
+    print(
+        f"seeded {PAGE} projects x {per_project} logs in {time.perf_counter() - t0:.1f}s",
+        file=sys.stderr,
+    )
+    return ids
+
+
+def n_plus_one(db, page):
+    return [
+        db.execute(
+            select(_logs)
+            .where(_logs.c.project_id == p.id)
+            .order_by(_logs.c.created_at.desc(), _logs.c.id.desc())
+            .limit(N_LOGS)
+        ).all()
+        for p in page
+    ]
+
+
+def select_in(db, ids):
+    page = db.scalars(
+        select(models.Project)
+        .where(models.Project.id.in_(ids))
+        .options(selectinload(models.Project.logs))
+    ).all()
+    return [
+        sorted(p.logs, key=lambda log: (log.created_at, log.id), reverse=True)[:N_LOGS]
+        for p in page
+    ]
+
+
+def windowed(db, ids):
+    rn = (
+        func.row_number()
+        .over(
+            partition_by=_logs.c.project_id, order_by=(_logs.c.created_at.desc(), _logs.c.id.desc())
+        )
+        .label("rn")
+    )
+    ranked = select(_logs, rn).where(_logs.c.project_id.in_(ids)).subquery()
+    return db.execute(select(ranked).where(ranked.c.rn <= N_LOGS)).all()
+
+
+def main(per_project=1000, n=30):
+    client = make_client()
+    headers = register(client)
+    ids = seed(client, headers, per_project)
+    dialect = engine.dialect.name
+
+    db = SessionLocal()
+    page = db.scalars(select(models.Project).where(models.Project.id.in_(ids))).all()
+    cases = {
+        "N+1: LIMIT query per project": lambda: n_plus_one(db, page),
+        "selectinload(Project.logs)": lambda: select_in(db, ids),
+        "row_number() window": lambda: windowed(db, ids),
+        "recent_logs_stmt": lambda: db.execute(
+            projects.recent_logs_stmt(dialect, ids, N_LOGS)
+        ).all(),
+    }
+    rows = []
+    for label, fn in cases.items():
+        rows.append(
+            (label, summarize(measure(lambda fn=fn: (fn(), db.expunge_all()), n, warmup=3)))
+        )
+    report(f"newest {N_LOGS} logs of {PAGE} projects, {per_project} logs each ({dialect})", rows)
+    assert len(db.execute(projects.recent_logs_stmt(dialect, ids, N_LOGS)).all()) == PAGE * N_LOGS
+
+    explain = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    stmt = projects.recent_logs_stmt(dialect, ids[:3], N_LOGS).compile(
+        engine, compile_kwargs={"literal_binds": True}
+    )
+    plan = db.execute(text(explain + str(stmt))).all()
+    print("plan:", "; ".join(str(row[-1]).strip() for row in plan))
+    db.close()
+
+    url = f"/projects/?limit={PAGE}"
+    rows = [
+        ("GET /projects/", summarize(measure(lambda: client.get(url, headers=headers), n))),
+        (
+            f"GET /projects/?include=logs&logs_limit={N_LOGS}",
+            summarize(
+                measure(
+                    lambda: client.get(f"{url}&include=logs&logs_limit={N_LOGS}", headers=headers),
+                    n,
+                )
+            ),
+        ),
+    ]
+    report(f"page of {PAGE} projects end to end, CACHE_BACKEND={os.environ['CACHE_BACKEND']}", rows)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    main(int(args[0]) if args else 1000)
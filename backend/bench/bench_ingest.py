@@ -0,0 +1,58 @@
+# Sustained log ingest rows/sec: JSON arrays, NDJSON, and small posts through the buffer
+#  python -m bench.bench_ingest [seconds]
+import json
+import sys
+import time
+
+from .common import make_client, register, use_sqlite
+
+use_sqlite()
+
+from app import ingest  # noqa: E402
+
+
+def _sustain(seconds, post):
+    rows = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        rows += post()
+    return rows / (time.perf_counter() - t0)
+
+
+def main(seconds=5.0):
+    client = make_client()
+    headers = register(client)
+    pid = client.post("/projects/", json={"title": "ingest"}, headers=headers).json()["id"]
+    url = f"/projects/{pid}/logs"
+    batch = [{"message": f"GET /api/thing/{i} 200 12ms"} for i in range(1000)]
+    ndjson = "\n".join(json.dumps(r) for r in batch)
+    ndjson_headers = {**headers, "Content-Type": "application/x-ndjson"}
+    small = batch[:10]
+
+    def post(body=None, content=None, hdrs=headers):
+        r = client.post(url, json=body, content=content, headers=hdrs)
+        r.raise_for_status()
+        return r.json()["accepted"]
+
+    print(f"\nSustained ingest for {seconds:.0f}s per mode")
+    ingest.LOG_BUFFER = False
+    for label, fn in (
+        ("JSON array x1000", lambda: post(batch)),
+        ("NDJSON x1000", lambda: post(content=ndjson, hdrs=ndjson_headers)),
+        ("JSON array x10 (direct)", lambda: post(small)),
+    ):
+        print(f"  {label:<28} {_sustain(seconds, fn):>10.0f} rows/s")
+
+    ingest.LOG_BUFFER = True
+    rate = _sustain(seconds, lambda: post(small))
+    t0 = time.perf_counter()
+    ingest.log_buffer.close()
+    drain = time.perf_counter() - t0
+    print(
+        f"  {'JSON array x10 (buffered)':<28} {rate:>10.0f} rows/s  (final drain {drain:.2f}s, "
+        f"flushed {ingest.log_buffer.flushed}, failed {ingest.log_buffer.failed})"
+    )
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0)
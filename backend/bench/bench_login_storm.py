@@ -0,0 +1,108 @@
+# p99 of unrelated GET /projects/ calls while a storm of logins runs, with password
+# hashing in-process (PASSWORD_WORKERS=0, the old behaviour) vs in the process pool.
+# Each mode runs in its own subprocess because the settings are read at import time.
+#  python -m bench.bench_login_storm [seconds] [concurrent_logins]
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {"in-process": "0", "process pool": "2"}
+
+
+async def _drive(seconds, logins):
+    import httpx
+
+    from app.main import app
+    from app.passwords import hasher
+    from app.startup import migrate
+
+    from .common import summarize
+
+    migrate()
+
+    # ASGITransport doesn't run the lifespan; start the hashing pool as startup would
+    hasher.start()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as ac:
+        for username in ("storm_reader", "storm_login"):
+            await ac.post(
+                "/users/",
+                json={
+                    "username": username,
+                    "email": f"{username}@example.com",
+                    "password": "pass123",
+                },
+            )
+        r = await ac.post("/auth/token", data={"username": "storm_reader", "password": "pass123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        for i in range(20):
+            await ac.post("/projects/", json={"title": f"p{i}"}, headers=headers)
+
+        async def probe(deadline, out):
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                r = await ac.get("/projects/", headers=headers)
+                assert r.status_code == 200
+                out.append((time.perf_counter() - t0) * 1000)
+                await asyncio.sleep(0.005)
+
+        async def login(deadline, counts):
+            form = {"username": "storm_login", "password": "pass123"}
+            while time.perf_counter() < deadline:
+                r = await ac.post("/auth/token", data=form)
+                counts[r.status_code] = counts.get(r.status_code, 0) + 1
+
+        quiet = []
+        await probe(time.perf_counter() + min(seconds, 2.0), quiet)
+
+        storm, counts = [], {}
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(
+            probe(deadline, storm), *(login(deadline, counts) for _ in range(logins))
+        )
+    hasher.shutdown()
+    return {
+        "quiet": summarize(quiet),
+        "storm": summarize(storm),
+        "logins_per_s": round(counts.get(200, 0) / seconds, 1),
+        "rejected": counts.get(503, 0),
+    }
+
+
+def main(seconds=5.0, logins=20):
+    db_dir = tempfile.mkdtemp()
+    rows = {}
+    for label, workers in MODES.items():
+        env = dict(
+            os.environ,
+            PASSWORD_WORKERS=workers,
+            DATABASE_URL=f"sqlite:///{db_dir}/storm_{workers}.db",
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.bench_login_storm", "--child", str(seconds), str(logins)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        rows[label] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"\nGET /projects/ latency (ms) with {logins} concurrent logins, {os.cpu_count()} CPU(s)")
+    for label, r in rows.items():
+        print(
+            f"  {label:<13} quiet p99={r['quiet']['p99_ms']:<8}"
+            f" storm p50={r['storm']['p50_ms']:<8} p99={r['storm']['p99_ms']:<9}"
+            f" logins/s={r['logins_per_s']:<7} 503s={r['rejected']}"
+        )
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        args = sys.argv[sys.argv.index("--child") + 1 :]
+        print(json.dumps(asyncio.run(_drive(float(args[0]), int(args[1])))))
+    else:
+        main(*(float(a) if i == 0 else int(a) for i, a in enumerate(sys.argv[1:3])))
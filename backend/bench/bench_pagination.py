@@ -0,0 +1,56 @@
+# Latency of a deep page (page 1000 at limit=20) with offset vs keyset cursor
+#  python -m bench.bench_pagination
+from .common import make_client, measure, register, report, summarize, use_sqlite
+
+use_sqlite()
+
+from app import models  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.pagination import encode_cursor  # noqa: E402
+
+PAGE, LIMIT = 1000, 20
+
+
+def seed(user_id, n):
+    db = SessionLocal()
+    db.execute(
+        models.Project.__table__.insert(),
+        [{"title": f"p{i}", "description": "bench", "owner_id": user_id} for i in range(n)],
+    )
+    db.commit()
+    db.close()
+
+
+def main(n=200):
+    client = make_client()
+    headers = register(client)
+    me = client.get("/users/me", headers=headers).json()
+    # pad with another user's rows so the owner filter matters too
+    other = register(client)
+    other_id = client.get("/users/me", headers=other).json()["id"]
+    seed(other_id, 50_000)
+    seed(me["id"], 50_000)
+
+    offset = (PAGE - 1) * LIMIT
+    expected = client.get(f"/projects/?limit={LIMIT}&offset={offset}", headers=headers).json()
+    # the cursor for page N is the last id of page N-1
+    prev = client.get(f"/projects/?limit=1&offset={offset - 1}", headers=headers).json()[0]["id"]
+    cursor = encode_cursor(prev)
+    got = client.get(f"/projects/?limit={LIMIT}&cursor={cursor}", headers=headers).json()
+    assert got == expected
+
+    by_offset = summarize(
+        measure(lambda: client.get(f"/projects/?limit={LIMIT}&offset={offset}", headers=headers), n)
+    )
+    by_cursor = summarize(
+        measure(lambda: client.get(f"/projects/?limit={LIMIT}&cursor={cursor}", headers=headers), n)
+    )
+    first = summarize(measure(lambda: client.get(f"/projects/?limit={LIMIT}", headers=headers), n))
+    report(
+        f"GET /projects/ page {PAGE} (50k rows/user)",
+        [("page 1", first), ("offset", by_offset), ("cursor", by_cursor)],
+    )
+
+
+if __name__ == "__main__":
+    main()
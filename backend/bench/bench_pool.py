@@ -0,0 +1,74 @@
+# Saturate a deliberately small pool and watch the /internal/pool wait metrics.
+# Each worker thread checks out a connection, runs a query and holds it ~5 ms (a
+# stand-in for a slow query), then spends ~1 ms outside the pool (serializing a
+# response), so past pool_size + max_overflow workers start queueing.
+#  DB_POOL_SIZE=4 DB_MAX_OVERFLOW=2 DB_POOL_TIMEOUT=0.5 python -m bench.bench_pool [seconds]
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("DB_POOL_SIZE", "4")
+os.environ.setdefault("DB_MAX_OVERFLOW", "2")
+os.environ.setdefault("DB_POOL_TIMEOUT", "0.5")
+os.environ.setdefault("INTERNAL_METRICS", "1")
+
+from .common import make_client, use_sqlite  # noqa: E402
+
+use_sqlite()
+
+from sqlalchemy import exc, func, select  # noqa: E402
+
+from app import database, models  # noqa: E402
+
+LEVELS = (2, 6, 12, 24, 48)
+HOLD_SECONDS = 0.005
+THINK_SECONDS = 0.001
+
+
+def _work(deadline, counts):
+    while time.perf_counter() < deadline:
+        try:
+            with database.SessionLocal() as db:
+                db.scalar(select(func.count()).select_from(models.Project))
+                time.sleep(HOLD_SECONDS)
+            counts["ok"] += 1
+            time.sleep(THINK_SECONDS)
+        except exc.TimeoutError:
+            counts["timeouts"] += 1
+
+
+def main(seconds=2.0):
+    client = make_client()
+    print(
+        f"\npool_size={os.environ['DB_POOL_SIZE']} max_overflow={os.environ['DB_MAX_OVERFLOW']} "
+        f"timeout={os.environ['DB_POOL_TIMEOUT']}s, {HOLD_SECONDS * 1000:.0f} ms hold per checkout"
+    )
+    print(
+        f"  {'threads':>7} {'ops/s':>8} {'timeouts':>8} {'waited':>7} {'wait max ms':>13} "
+        f"{'wait mean ms':>12} {'checkout mean ms':>16}"
+    )
+    for threads in LEVELS:
+        database.pool_stats.reset()
+        counts = {"ok": 0, "timeouts": 0}
+        deadline = time.perf_counter() + seconds
+        workers = [threading.Thread(target=_work, args=(deadline, counts)) for _ in range(threads)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        # read back through the endpoint, as a dashboard would
+        sync = client.get("/internal/pool").json()["sync"]
+        wait, checkout = sync["wait"], sync["checkout"]
+        print(
+            f"  {threads:>7} {counts['ok'] / seconds:>8.0f} {sync['timeouts']:>8}"
+            f" {wait['count']:>7}"
+            f"{wait['max_seconds'] * 1000:>13.1f} {wait['mean_seconds'] * 1000:>12.2f} "
+            f"{checkout['mean_seconds'] * 1000:>16.2f}"
+        )
+    print("\n  wait histogram at the last level (cumulative, seconds):")
+    print("  " + "  ".join(f"le {k}: {v}" for k, v in wait["buckets"].items()))
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2.0)
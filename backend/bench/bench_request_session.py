@@ -0,0 +1,108 @@
+# Authenticated GET /projects/ with the pool saturated: one session per request (auth and
+# handler share database.get_db) against the old layout, where get_current_user had its
+# own session and so held a second connection for the rest of the request.
+# The token and project caches are off so every request looks the user up and queries,
+# and admission control is off so the pool itself is what gives.
+#  python -m bench.bench_request_session [seconds] [--postgres]
+# Pool: DB_POOL_SIZE=4 DB_MAX_OVERFLOW=0 DB_POOL_TIMEOUT=2 unless set.
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("DB_POOL_SIZE", "4")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+os.environ.setdefault("DB_POOL_TIMEOUT", "2")
+os.environ.setdefault("AUTH_CACHE_SIZE", "0")
+os.environ.setdefault("CACHE_BACKEND", "none")
+os.environ.setdefault("RATE_LIMIT", "0")
+os.environ.setdefault("ADMIT_MAX_POOL_QUEUE", "0")
+
+if "--postgres" in sys.argv:
+    from .suite import _throwaway_postgres
+
+    os.environ["DATABASE_URL"] = _throwaway_postgres()
+
+from .common import make_client, register, use_sqlite  # noqa: E402
+
+use_sqlite("request_session.db")
+
+import httpx  # noqa: E402
+from fastapi import Depends, Request  # noqa: E402
+
+from app import database  # noqa: E402
+from app.auth import get_current_user, oauth2_scheme  # noqa: E402
+from app.main import app  # noqa: E402
+
+LEVELS = (1, 2, 4, 8, 16, 32)
+
+
+def _own_session():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def separate_session_user(
+    request: Request, token: str = Depends(oauth2_scheme), db=Depends(_own_session)
+):
+    # the old auth.get_db: a session of its own, closed only once the request is done
+    return get_current_user(request, token, db)
+
+
+async def drive(headers, clients, seconds):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as ac:
+        done = errors = 0
+        deadline = time.perf_counter() + seconds
+
+        async def worker():
+            nonlocal done, errors
+            while time.perf_counter() < deadline:
+                r = await ac.get("/projects/", headers=headers)
+                if r.status_code == 200:
+                    done += 1
+                else:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        return done / (time.perf_counter() - t0), errors
+
+
+def main(seconds=3.0):
+    client = make_client()
+    headers = register(client)
+    for i in range(20):
+        client.post("/projects/", json={"title": f"p{i}", "description": "x"}, headers=headers)
+
+    modes = {"shared session": None, "separate auth session": separate_session_user}
+    results = {}
+    for label, override in modes.items():
+        app.dependency_overrides.pop(get_current_user, None)
+        if override:
+            app.dependency_overrides[get_current_user] = override
+        for clients in LEVELS:
+            database.pool_stats.reset()
+            rps, errors = asyncio.run(drive(headers, clients, seconds))
+            results[label, clients] = (rps, errors, database.pool_stats.timeouts)
+    app.dependency_overrides.clear()
+
+    print(
+        f"\nGET /projects/ with pool_size={os.environ['DB_POOL_SIZE']} max_overflow="
+        f"{os.environ['DB_MAX_OVERFLOW']} timeout={os.environ['DB_POOL_TIMEOUT']}s "
+        f"({database.engine.dialect.name}): req/s, errors, pool timeouts"
+    )
+    print(f"  {'clients':<8}" + "".join(f"{label:>30}" for label in modes))
+    for clients in LEVELS:
+        cells = [results[label, clients] for label in modes]
+        print(
+            f"  {clients:<8}" + "".join(f"{rps:>18.0f} {err:>5} {to:>5}" for rps, err, to in cells)
+        )
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    main(float(args[0]) if args else 3.0)
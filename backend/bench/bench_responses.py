@@ -0,0 +1,129 @@
+# Bytes on the wire and CPU per request for GET /projects/?limit=200 (200 projects
+# with ~1.5 KB descriptions) across response pipeline settings.
+# Each setting runs in its own subprocess because they are read at import time.
+#  python -m bench.bench_responses [requests]
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {
+    "before (model, no compr.)": {"RESPONSE_FAST_LISTS": "0", "RESPONSE_COMPRESSION": ""},
+    "orjson rows": {"RESPONSE_FAST_LISTS": "1", "RESPONSE_COMPRESSION": ""},
+    "orjson rows + gzip": {"RESPONSE_FAST_LISTS": "1", "RESPONSE_COMPRESSION": "gzip"},
+    "orjson rows + br": {"RESPONSE_FAST_LISTS": "1", "RESPONSE_COMPRESSION": "br"},
+}
+
+
+def _drive(n):
+    from .common import make_client, register, summarize
+
+    client = make_client()
+    headers = register(client)
+    rnd = random.Random(3)
+    vocab = [
+        "".join(rnd.choices("abcdefghijklmnopqrstuvwxyz", k=rnd.randint(3, 9))) for _ in range(3000)
+    ]
+    client.post(
+        "/projects/batch",
+        json=[
+            {
+                "title": " ".join(rnd.choices(vocab, k=4)),
+                "description": " ".join(rnd.choices(vocab, k=250)),
+            }
+            for _ in range(200)
+        ],
+        headers=headers,
+    )
+    headers = {**headers, "Accept-Encoding": "br, gzip"}
+
+    def fetch():
+        with client.stream("GET", "/projects/?limit=200", headers=headers) as r:
+            return len(b"".join(r.iter_raw()))
+
+    wire = fetch()
+    for _ in range(10):
+        fetch()
+    latencies = []
+    cpu0 = time.process_time()
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fetch()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    cpu = (time.process_time() - cpu0) / n * 1000
+    return {"bytes": wire, "cpu_ms": round(cpu, 3), **summarize(latencies)}
+
+
+def _serializers(n=200):
+    # the serialization step alone, same rows, no HTTP
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/ser.db")
+    from datetime import datetime, timezone
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    from app import models, responses, schemas
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        models.Project(
+            id=i,
+            title=f"title {i}",
+            description="word " * 300,
+            owner_id=1,
+            log_count=i,
+            last_log_at=now,
+            version=1,
+            updated_at=now,
+        )
+        for i in range(200)
+    ]
+    adapter = TypeAdapter(List[schemas.ProjectOut])
+
+    def timed(fn):
+        t0 = time.process_time()
+        for _ in range(n):
+            fn()
+        return round((time.process_time() - t0) / n * 1000, 3)
+
+    return {
+        "response_model (validate + dump_json)": timed(
+            lambda: adapter.dump_json(adapter.validate_python(rows))
+        ),
+        "dump_rows (orjson)": timed(lambda: responses.dump_rows(schemas.ProjectOut, rows).body),
+    }
+
+
+def main(n=200):
+    db_dir = tempfile.mkdtemp()
+    rows = {}
+    for i, (label, env) in enumerate(MODES.items()):
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_dir}/resp_{i}.db", **env)
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.bench_responses", "--child", str(n)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        rows[label] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"\nGET /projects/?limit=200, {n} requests")
+    for label, r in rows.items():
+        print(
+            f"  {label:<27} bytes={r['bytes']:<8} cpu/req={r['cpu_ms']:<7}ms "
+            f"p50={r['p50_ms']:<7}ms p99={r['p99_ms']}ms"
+        )
+    print("\nserializing 200 ProjectOut rows (CPU ms per call)")
+    for label, ms in _serializers().items():
+        print(f"  {label:<38} {ms}")
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        print(json.dumps(_drive(int(sys.argv[-1]))))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,113 @@
+# Retention and project-delete cost: row DELETE + VACUUM vs dropping partitions (Postgres only)
+#  DATABASE_URL=postgresql+psycopg2://.../scratch python -m bench.bench_retention [rows]
+# Creates and drops its own bench_* tables; point it at a throwaway database.
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, text
+
+from app import retention
+
+MONTHS = 6
+
+
+def _timed(conn, sql, **params):
+    t0 = time.perf_counter()
+    r = conn.execute(text(sql), params)
+    return time.perf_counter() - t0, r
+
+
+def _setup(conn, rows, first):
+    for t in ("bench_logs_plain", "bench_logs_part"):
+        conn.execute(text(f"DROP TABLE IF EXISTS {t} CASCADE"))
+    conn.execute(
+        text(
+            "CREATE TABLE bench_logs_plain (id bigserial PRIMARY KEY, project_id int NOT NULL, "
+            "message text, created_at timestamptz NOT NULL)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE TABLE bench_logs_part (id bigserial, project_id int NOT NULL, message text, "
+            "created_at timestamptz NOT NULL, PRIMARY KEY (id, created_at))"
+            " PARTITION BY RANGE (created_at)"
+        )
+    )
+    retention.ensure_partitions(conn, table="bench_logs_part", now=first, months_ahead=MONTHS - 1)
+    for t in ("bench_logs_plain", "bench_logs_part"):
+        # rows spread evenly over MONTHS months, 10 projects
+        conn.execute(
+            text(
+                f"INSERT INTO {t} (project_id, message, created_at) "
+                "SELECT g % 10, 'GET /api/things 200 ' || g, "
+                f":first + (g::float / :rows) * interval '{MONTHS * 30 - 1} days' "
+                "FROM generate_series(1, :rows) g"
+            ),
+            {"first": first, "rows": rows},
+        )
+        conn.execute(text(f"CREATE INDEX ON {t} (project_id, created_at)"))
+        conn.execute(text(f"ANALYZE {t}"))
+    conn.commit()
+
+
+def main(rows=2_000_000):
+    url = os.getenv("DATABASE_URL", "")
+    if not url.startswith("postgresql"):
+        sys.exit("bench_retention needs DATABASE_URL pointing at a throwaway Postgres database")
+    engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    first = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    cutoff_days_from_now = (datetime.now(timezone.utc) - retention.add_months(first, 3)).days
+
+    with engine.connect() as conn:
+        _setup(conn, rows, first)
+        print(f"\n{rows:,} rows over {MONTHS} months; expire the oldest 3 months")
+
+        dt, r = _timed(
+            conn,
+            "DELETE FROM bench_logs_plain WHERE created_at < :c",
+            c=retention.add_months(first, 3),
+        )
+        vac, _ = _timed(conn, "VACUUM bench_logs_plain")
+        print(f"  plain:       DELETE {r.rowcount:,} rows {dt:7.2f}s   VACUUM {vac:6.2f}s")
+
+        t0 = time.perf_counter()
+        dropped = retention.drop_expired(
+            conn, table="bench_logs_part", retention_days=cutoff_days_from_now
+        )
+        dt = time.perf_counter() - t0
+        vac, _ = _timed(conn, "VACUUM bench_logs_part")
+        print(f"  partitioned: DROP {len(dropped)} partitions {dt:7.2f}s   VACUUM {vac:6.2f}s")
+
+        print("\nDelete one project's logs (1/10 of the remaining rows)")
+        dt, r = _timed(conn, "DELETE FROM bench_logs_plain WHERE project_id = 1")
+        print(f"  single DELETE:   {r.rowcount:,} rows in one transaction of {dt:.2f}s")
+
+        # same statement shape as app.retention.purge_project_logs
+        chunk, longest, total, t0 = retention.PURGE_CHUNK_ROWS, 0.0, 0, time.perf_counter()
+        while True:
+            t1 = time.perf_counter()
+            edge = conn.execute(
+                text(
+                    "SELECT created_at FROM bench_logs_part WHERE project_id = 1 "
+                    "ORDER BY created_at OFFSET :n LIMIT 1"
+                ),
+                {"n": chunk - 1},
+            ).scalar()
+            sql = "DELETE FROM bench_logs_part WHERE project_id = 1"
+            r = conn.execute(text(sql + (" AND created_at <= :e" if edge else "")), {"e": edge})
+            longest, total = max(longest, time.perf_counter() - t1), total + r.rowcount
+            if edge is None:
+                break
+        print(
+            f"  chunked ({chunk:,}): {total:,} rows in {time.perf_counter() - t0:.2f}s, "
+            f"longest transaction {longest:.3f}s"
+        )
+
+        for t in ("bench_logs_plain", "bench_logs_part"):
+            conn.execute(text(f"DROP TABLE IF EXISTS {t} CASCADE"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
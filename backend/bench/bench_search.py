@@ -0,0 +1,61 @@
+# Project search over 100k synthetic projects: FTS index vs the ILIKE scan
+#  python -m bench.bench_search [rows]
+import random
+import sys
+
+from .common import make_client, measure, register, report, summarize, use_sqlite
+
+use_sqlite()
+
+from app import models, search  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+
+_rnd = random.Random(7)
+# random letter "words" so prefixes don't collide the way word1/word10/word100 would
+WORDS = ["".join(_rnd.choices("abcdefghijklmnopqrstuvwxyz", k=7)) for _ in range(20_000)]
+
+
+def seed(user_id, n, batch=10_000):
+    rnd = random.Random(42)
+    db = SessionLocal()
+    for start in range(0, n, batch):
+        db.execute(
+            models.Project.__table__.insert(),
+            [
+                {
+                    "title": " ".join(rnd.choices(WORDS, k=3)),
+                    "description": " ".join(rnd.choices(WORDS, k=60)),
+                    "owner_id": user_id,
+                }
+                for _ in range(min(batch, n - start))
+            ],
+        )
+    db.commit()
+    db.close()
+
+
+def main(rows=100_000, n=50):
+    client = make_client()
+    headers = register(client)
+    seed(client.get("/users/me", headers=headers).json()["id"], rows)
+
+    results = []
+    # a term in ~300 projects, two terms that rarely co-occur, and a miss (worst case)
+    for term in (WORDS[42], f"{WORDS[42]} {WORDS[7]}", "zzzzzzzzz"):
+        url = f"/projects/?limit=50&q={term}"
+        for mode in ("ilike", "fts"):
+            search.SEARCH_MODE = mode
+            results.append(
+                (
+                    f"{mode:<5} q={term!r}",
+                    summarize(
+                        measure(lambda url=url: client.get(url, headers=headers), n, warmup=3)
+                    ),
+                )
+            )
+    search.SEARCH_MODE = "fts"
+    report(f"GET /projects/?q=... over {rows:,} projects", results)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,78 @@
+# Import time, startup time and time-to-first-request of a fresh worker process.
+# "old" repeats what importing app.main used to do (build the engine and run
+# create_all, which inspects every table) and skips the lifespan; "new" imports
+# without touching the database and runs the lifespan (pool warmup, schema check).
+# The first request is a login for an unknown user: one indexed SELECT, no hashing.
+# Runs against DATABASE_URL if set (e.g. Postgres, where the round trips show),
+# otherwise a migrated SQLite file.
+#  python -m bench.bench_startup [runs]
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def _child(mode):
+    import httpx  # the client's own import isn't the app's
+
+    t0 = time.perf_counter()
+    from app.main import app
+
+    if mode == "old":
+        from app import database
+
+        database.Base.metadata.create_all(bind=database.engine)
+    imported = time.perf_counter()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as ac:
+        if mode == "new":
+            async with app.router.lifespan_context(app):
+                started = time.perf_counter()
+                r = await ac.post("/auth/token", data={"username": "nobody", "password": "x"})
+        else:
+            started = time.perf_counter()
+            r = await ac.post("/auth/token", data={"username": "nobody", "password": "x"})
+        first = time.perf_counter()
+    assert r.status_code == 401, r.text
+    return {
+        "import_ms": (imported - t0) * 1000,
+        "startup_ms": (started - imported) * 1000,
+        "first_request_ms": (first - started) * 1000,
+        "total_ms": (first - t0) * 1000,
+    }
+
+
+def main(runs=5):
+    env = dict(os.environ, PASSWORD_WORKERS="0")
+    if "DATABASE_URL" not in env:
+        env["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/startup.db"
+    subprocess.run(
+        [sys.executable, "-c", "from app.startup import migrate; migrate()"], env=env, check=True
+    )
+
+    print(f"\nfresh process, {env['DATABASE_URL'].split(':')[0]}, median of {runs} runs (ms)")
+    for mode in ("old", "new"):
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-m", "bench.bench_startup", "--child", mode],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        med = {k: round(statistics.median(s[k] for s in samples), 1) for k in samples[0]}
+        print(f"  {mode:<4} " + "  ".join(f"{k}={v}" for k, v in med.items()))
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        print(json.dumps(asyncio.run(_child(sys.argv[-1]))))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,163 @@
+# GET /users/ and registration against a large users table (1M rows by default).
+# Registration: the old sequence (two uniqueness SELECTs, INSERT, refresh SELECT) vs
+# the single INSERT ... RETURNING, both with a precomputed hash so only the database
+# work is compared; then POST /users/ end to end. Listing: what the old unpaginated
+# route did (every row, once) vs first/deep pages, prefix search and ?fields=, with
+# and without the read-through cache.
+#  python -m bench.bench_users [users] [--postgres]
+# Uses DATABASE_URL when set, otherwise a throwaway SQLite file.
+import hashlib
+import os
+import resource
+import sys
+import time
+import uuid
+
+from .common import make_client, measure, register, report, summarize, use_sqlite
+
+if "--postgres" in sys.argv:
+    from .suite import _throwaway_postgres
+
+    os.environ["DATABASE_URL"] = _throwaway_postgres()
+use_sqlite("users.db")
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+from sqlalchemy import insert, select, text  # noqa: E402
+
+from app import models, schemas  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.pagination import encode_cursor  # noqa: E402
+from app.passwords import hash_password  # noqa: E402
+from app.routes import users  # noqa: E402
+
+_users = models.User.__table__
+
+
+def seed(n, password_hash):
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        for start in range(0, n, 20_000):
+            rows = []
+            for i in range(start, min(n, start + 20_000)):
+                name = f"{hashlib.md5(str(i).encode()).hexdigest()[:8]}_{i}"
+                rows.append(
+                    {"username": name, "email": f"{name}@example.com", "password": password_hash}
+                )
+            conn.execute(insert(_users), rows)
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE users"))
+    print(f"seeded {n} users in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+
+def old_register(db, payload, password_hash):
+    # what routes/users.create_user did before
+    if db.query(models.User).filter(models.User.username == payload.username).first():
+        raise ValueError
+    if db.query(models.User).filter(models.User.email == payload.email).first():
+        raise ValueError
+    user = models.User(username=payload.username, email=payload.email, password=password_hash)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def new_register(db, payload, password_hash):
+    user = db.execute(users.register_stmt(payload, password_hash)).one()
+    db.commit()
+    return user
+
+
+def _payload():
+    name = f"reg_{uuid.uuid4().hex[:12]}"
+    return schemas.UserCreate(username=name, email=f"{name}@example.com", password="pass123")
+
+
+def main(n_users=1_000_000, n=200):
+    client = make_client()
+    password_hash = hash_password("pass123")
+    seed(n_users, password_hash)
+    headers = register(client)
+
+    rows = []
+    for label, fn in (
+        ("old: 2 SELECTs + INSERT + refresh", old_register),
+        ("new: INSERT ... RETURNING", new_register),
+    ):
+        db = SessionLocal()
+        lat = measure(lambda fn=fn, db=db: fn(db, _payload(), password_hash), n)
+        db.close()
+        stats = summarize(lat)
+        rows.append((label, {**stats, "per_s": round(1000 / stats["mean_ms"], 1)}))
+    api = summarize(
+        measure(lambda: client.post("/users/", json=_payload().model_dump()), 50, warmup=5)
+    )
+    rows.append(("POST /users/ (with hashing)", {**api, "per_s": round(1000 / api["mean_ms"], 1)}))
+    report(f"registration, {n_users} existing users", rows)
+
+    # the old GET /users/: every row through the ORM and the response model, once
+    db = SessionLocal()
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    everyone = db.query(models.User).order_by(models.User.id.asc()).all()
+    body = [schemas.UserOut.model_validate(u).model_dump() for u in everyone]
+    old_ms = (time.perf_counter() - t0) * 1000
+    grown = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss0) // 1024
+    print(f"\nold GET /users/ (all {len(body)} rows, once): {old_ms:.0f} ms, peak RSS +{grown} MB")
+    del everyone, body
+    db.close()
+
+    mid = db.execute(
+        select(_users.c.id).order_by(_users.c.id).offset(n_users // 2).limit(1)
+    ).scalar()
+    prefix = "abc"
+    matches = db.execute(
+        select(_users.c.id).where(users.username_prefix(engine.dialect.name, prefix))
+    ).all()
+    cases = {
+        "first page (50)": {},
+        "middle page, cursor": {"cursor": encode_cursor(mid)},
+        f"prefix '{prefix}' ({len(matches)} matches)": {"username": prefix},
+        "prefix 'ab', fields=id,username": {"username": "ab", "fields": "id,username"},
+    }
+    rows = []
+    for label, params in cases.items():
+        r = client.get("/users/", params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        rows.append(
+            (
+                label,
+                summarize(
+                    measure(
+                        lambda params=params: client.get("/users/", params=params, headers=headers),
+                        n,
+                    )
+                ),
+            )
+        )
+    report(f"GET /users/, {n_users} users, CACHE_BACKEND={os.environ['CACHE_BACKEND']}", rows)
+
+    if engine.dialect.name == "sqlite":
+        plan = db.execute(
+            text(
+                "EXPLAIN QUERY PLAN "
+                + str(
+                    users.list_stmt("sqlite", users.USER_FIELDS, prefix, 50, None).compile(
+                        engine, compile_kwargs={"literal_binds": True}
+                    )
+                )
+            )
+        ).all()
+        print("prefix plan:", "; ".join(row[-1] for row in plan))
+    elif engine.dialect.name == "postgresql":
+        stmt = users.list_stmt("postgresql", users.USER_FIELDS, prefix, 50, None)
+        plan = db.execute(
+            text("EXPLAIN " + str(stmt.compile(engine, compile_kwargs={"literal_binds": True})))
+        ).all()
+        print("prefix plan:", "; ".join(row[0].strip() for row in plan))
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    main(int(args[0]) if args else 1_000_000)
@@ -0,0 +1,199 @@
+# Throughput of the gunicorn profile (gunicorn.conf.py) at 1..N workers, over real HTTP.
+# Starts gunicorn on a migrated database, seeds one user with projects, then drives
+# GET /projects/{id} and GET /projects/ from --clients load processes (each with
+# --concurrency connections) for --seconds per worker count. A last run recycles
+# workers every few hundred requests and reports errors and worker restarts.
+#  python -m bench.bench_workers [--workers 1,2,4] [--seconds 10] [--clients 2] [--concurrency 16]
+# Runs against DATABASE_URL if set (Postgres is what production looks like), otherwise
+# a throwaway SQLite file. The load processes share the machine with the server:
+# scaling stops at the number of cores, and earlier if the clients need them too.
+import argparse
+import asyncio
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    def __init__(self, env, workers, **extra):
+        self.port = _free_port()
+        self.log = tempfile.NamedTemporaryFile("w+", suffix=".log")
+        self.env = dict(
+            env,
+            PORT=str(self.port),
+            WEB_CONCURRENCY=str(workers),
+            **{k: str(v) for k, v in extra.items()},
+        )
+        self.url = f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        import httpx
+
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+            cwd=BACKEND,
+            env=self.env,
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if httpx.get(f"{self.url}/ready").status_code == 200:
+                    return self
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError(f"gunicorn did not become ready:\n{self.output()}")
+
+    def __exit__(self, *exc):
+        self.proc.send_signal(signal.SIGTERM)
+        self.proc.wait(30)
+
+    def output(self):
+        self.log.seek(0)
+        return self.log.read()
+
+    def boots(self):
+        return len(re.findall(r"Booting worker with pid", self.output()))
+
+
+def seed(url, projects):
+    import httpx
+
+    with httpx.Client(base_url=url) as c:
+        c.post(
+            "/users/",
+            json={"username": "bench", "email": "bench@example.com", "password": "pass123"},
+        )
+        token = c.post("/auth/token", data={"username": "bench", "password": "pass123"}).json()[
+            "access_token"
+        ]
+        headers = {"Authorization": f"Bearer {token}"}
+        batch = [{"title": f"project {i}", "description": "x" * 200} for i in range(projects)]
+        r = c.post("/projects/batch", json=batch, headers=headers)
+        r.raise_for_status()
+        return headers, [p["id"] for p in r.json()]
+
+
+async def _load(url, headers, ids, seconds, concurrency):
+    import httpx
+
+    done = errors = resets = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(i):
+        nonlocal done, errors, resets
+        async with httpx.AsyncClient(base_url=url, headers=headers, timeout=30) as ac:
+            n = i
+            while time.perf_counter() < deadline:
+                n += 1
+                path = f"/projects/{ids[n % len(ids)]}" if n % 2 else "/projects/?limit=20"
+                for attempt in range(3):
+                    try:
+                        r = await ac.get(path)
+                        break
+                    except httpx.TransportError:
+                        # a recycled worker closes its idle keep-alive connections; like
+                        # a proxy would, retry the (idempotent) GET on another connection
+                        resets += 1
+                        if attempt == 2:
+                            raise
+                errors += r.status_code != 200
+                done += 1
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return done, errors, resets
+
+
+def _load_process(args):
+    return asyncio.run(_load(*args))
+
+
+def drive(url, headers, ids, seconds, clients, concurrency):
+    with multiprocessing.Pool(clients) as pool:
+        t0 = time.perf_counter()
+        results = pool.map(_load_process, [(url, headers, ids, seconds, concurrency)] * clients)
+        wall = time.perf_counter() - t0
+    done, errors, resets = (sum(col) for col in zip(*results, strict=True))
+    return round(done / wall, 1), done, errors, resets
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--workers", default=None, help="comma-separated worker counts (default 1,2,..,CPUs)"
+    )
+    p.add_argument("--seconds", type=float, default=10)
+    p.add_argument("--clients", type=int, default=2, help="load generator processes")
+    p.add_argument("--concurrency", type=int, default=16, help="connections per load process")
+    p.add_argument("--projects", type=int, default=200)
+    args = p.parse_args(argv)
+
+    from app.serving import cpu_count
+
+    env = dict(os.environ, CACHE_BACKEND=os.getenv("CACHE_BACKEND", "none"), WEB_MAX_REQUESTS="0")
+    if "DATABASE_URL" not in env:
+        env["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/workers.db"
+    subprocess.run(
+        [sys.executable, "-c", "from app.startup import migrate; migrate()"],
+        cwd=BACKEND,
+        env=env,
+        check=True,
+    )
+    counts = (
+        [int(n) for n in args.workers.split(",")]
+        if args.workers
+        else sorted({1, *(2**k for k in range(1, 4) if 2**k <= cpu_count()), cpu_count()})
+    )
+
+    with Server(env, 1) as server:
+        headers, ids = seed(server.url, args.projects)
+
+    print(
+        f"\n{env['DATABASE_URL'].split(':')[0]}, {cpu_count()} CPU(s),"
+        f" {args.clients}x{args.concurrency} connections, {args.seconds:.0f}s per run"
+    )
+    base = None
+    for n in counts:
+        with Server(env, n) as server:
+            drive(
+                server.url, headers, ids, 1, args.clients, args.concurrency
+            )  # warm every worker's pool
+            rps, done, errors, _ = drive(
+                server.url, headers, ids, args.seconds, args.clients, args.concurrency
+            )
+        base = base or rps
+        print(f"  workers={n:<3} rps={rps:<9} x{rps / base:.2f}  requests={done}  errors={errors}")
+
+    # recycling: every worker restarts a few times during the run, without failed requests
+    n = counts[-1]
+    every = max(200, int(base * args.seconds / n / 3))
+    with Server(env, n, WEB_MAX_REQUESTS=every, WEB_MAX_REQUESTS_JITTER=every // 10) as server:
+        rps, done, errors, resets = drive(
+            server.url, headers, ids, args.seconds, args.clients, args.concurrency
+        )
+        restarts = server.boots() - n
+    print(
+        f"  recycling every ~{every} requests, workers={n}: rps={rps}  requests={done}  "
+        f"errors={errors}  retried resets={resets}  worker restarts={restarts}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Shared helpers for the benchmark scripts in bench/
+# Run from backend/, e.g.: python -m bench.bench_auth_cache
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+
+def use_sqlite(name="bench.db"):
+    """Point the app at a throwaway SQLite file unless DATABASE_URL is already set."""
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/{name}")
+
+
+def make_client():
+    """TestClient on the app, after bringing the database to the newest migration."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.startup import migrate
+
+    migrate()
+    return TestClient(app)
+
+
+def register(client, username=None, password="pass123"):
+    username = username or f"bench_{uuid.uuid4().hex[:10]}"
+    client.post(
+        "/users/",
+        json={"username": username, "email": f"{username}@example.com", "password": password},
+    )
+    r = client.post("/auth/token", data={"username": username, "password": password})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def measure(fn, n, warmup=10):
+    """Call fn() n times and return per-call latencies in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def summarize(latencies):
+    s = sorted(latencies)
+
+    def pick(p):
+        return s[min(len(s) - 1, int(len(s) * p))]
+
+    return {
+        "n": len(s),
+        "mean_ms": round(statistics.fmean(s), 3),
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+    }
+
+
+def report(title, rows):
+    print(f"\n{title}")
+    for label, stats in rows:
+        cols = "  ".join(f"{k}={v}" for k, v in stats.items())
+        print(f"  {label:<28} {cols}")
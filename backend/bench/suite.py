@@ -0,0 +1,332 @@
+# End-to-end benchmark suite: seeds users/projects/logs, then drives the real ASGI app
+# in-process over httpx and reports throughput and p50/p95/p99 per endpoint.
+#  python -m bench.suite [--users 5] [--projects 200] [--logs 20]
+#                        [--requests 300] [--concurrency 8] [--warmup 20] [--out results.json]
+#                        [--baseline FILE [--threshold 0.25]] [--save-baseline FILE]
+#                        [--postgres] [--only list,get,...]
+# Uses DATABASE_URL when set, otherwise a throwaway SQLite file; --postgres starts a
+# throwaway Postgres instead (needs `pip install pgserver`). With --baseline, exits 1
+# when an endpoint's p50/p95 grows, or its throughput drops, by more than --threshold.
+# Baselines are only comparable on the same machine, database and settings; the
+# results file records the settings that matter next to the numbers.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from .common import summarize
+
+# Read at import time by the app; recorded with the results
+SETTINGS = (
+    "DB_ASYNC",
+    "DB_POOL_SIZE",
+    "DB_MAX_OVERFLOW",
+    "CACHE_BACKEND",
+    "RESPONSE_FAST_LISTS",
+    "RESPONSE_COMPRESSION",
+    "PASSWORD_WORKERS",
+    "PROFILING",
+    "LOG_BUFFER_ROWS",
+    "RATE_LIMIT",
+)
+METRICS = ("p50_ms", "p95_ms")
+
+
+# ---------- Seeding ----------
+class World:
+    def __init__(self, rnd):
+        self.rnd = rnd
+        self.users = []  # (username, auth headers)
+        self.projects = {}  # username -> [project ids]
+        self.vocab = [
+            "".join(rnd.choices("abcdefghijklmnopqrstuvwxyz", k=rnd.randint(4, 9)))
+            for _ in range(500)
+        ]
+        self.created = asyncio.Queue()  # ids made by "create", consumed by "delete"
+
+    def pick(self):
+        username, headers = self.rnd.choice(self.users)
+        return headers, self.projects[username]
+
+    def words(self, n):
+        return " ".join(self.rnd.choices(self.vocab, k=n))
+
+
+async def seed(ac, world, users, projects, logs):
+    for u in range(users):
+        username = f"bench_{u}_{world.rnd.randrange(1 << 30):x}"
+        r = await ac.post(
+            "/users/",
+            json={"username": username, "email": f"{username}@example.com", "password": "pass123"},
+        )
+        r.raise_for_status()
+        r = await ac.post("/auth/token", data={"username": username, "password": "pass123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        ids = []
+        for start in range(0, projects, 500):
+            batch = [
+                {"title": world.words(3), "description": world.words(40)}
+                for _ in range(min(500, projects - start))
+            ]
+            r = await ac.post("/projects/batch", json=batch, headers=headers)
+            r.raise_for_status()
+            ids += [item["id"] for item in r.json()]
+        if logs:
+            for pid in ids:
+                lines = [{"message": world.words(8)} for _ in range(logs)]
+                (
+                    await ac.post(f"/projects/{pid}/logs", json=lines, headers=headers)
+                ).raise_for_status()
+        world.users.append((username, headers))
+        world.projects[username] = ids
+
+
+# ---------- Scenarios ----------
+# Each takes (client, world, state) and makes exactly one request; state is per worker
+async def login(ac, world, state):
+    username, _ = world.rnd.choice(world.users)
+    return await ac.post("/auth/token", data={"username": username, "password": "pass123"})
+
+
+async def list_projects(ac, world, state):
+    headers, _ = world.pick()
+    return await ac.get("/projects/?limit=50", headers=headers)
+
+
+async def search(ac, world, state):
+    headers, _ = world.pick()
+    return await ac.get(
+        "/projects/", params={"q": world.rnd.choice(world.vocab), "limit": 20}, headers=headers
+    )
+
+
+async def paginate(ac, world, state):
+    # walk one user's projects page by page, starting over at the end
+    if not state.get("headers"):
+        state["headers"], _ = world.pick()
+    params = {"limit": 20, **({"cursor": state["cursor"]} if state.get("cursor") else {})}
+    r = await ac.get("/projects/", params=params, headers=state["headers"])
+    state["cursor"] = r.headers.get("x-next-cursor")
+    if not state["cursor"]:
+        state["headers"] = None
+    return r
+
+
+async def get_project(ac, world, state):
+    headers, ids = world.pick()
+    return await ac.get(f"/projects/{world.rnd.choice(ids)}", headers=headers)
+
+
+async def create(ac, world, state):
+    headers, _ = world.pick()
+    r = await ac.post(
+        "/projects/",
+        json={"title": world.words(3), "description": world.words(40)},
+        headers=headers,
+    )
+    if r.status_code == 201:
+        world.created.put_nowait((headers, r.json()["id"]))
+    return r
+
+
+async def update(ac, world, state):
+    headers, ids = world.pick()
+    return await ac.patch(
+        f"/projects/{world.rnd.choice(ids)}", json={"title": world.words(3)}, headers=headers
+    )
+
+
+async def delete(ac, world, state):
+    headers, pid = world.created.get_nowait()
+    return await ac.delete(f"/projects/{pid}", headers=headers)
+
+
+async def ingest(ac, world, state):
+    headers, ids = world.pick()
+    lines = [{"message": world.words(8)} for _ in range(20)]
+    return await ac.post(f"/projects/{world.rnd.choice(ids)}/logs", json=lines, headers=headers)
+
+
+async def list_logs(ac, world, state):
+    headers, ids = world.pick()
+    return await ac.get(
+        "/logs/", params={"project_id": world.rnd.choice(ids), "limit": 100}, headers=headers
+    )
+
+
+# name -> (scenario, share of --requests); login is CPU-bound hashing, so fewer calls
+SCENARIOS = {
+    "login": (login, 0.1),
+    "list": (list_projects, 1),
+    "search": (search, 1),
+    "paginate": (paginate, 1),
+    "get": (get_project, 1),
+    "create": (create, 1.25),  # leaves enough for delete's warmup + run
+    "update": (update, 1),
+    "delete": (delete, 1),  # deletes what "create" made, so runs after it
+    "ingest": (ingest, 1),
+    "list_logs": (list_logs, 1),
+}
+
+
+async def run_scenario(ac, world, fn, n, concurrency, warmup):
+    latencies, errors = [], 0
+    remaining = 0
+
+    async def worker(record):
+        nonlocal remaining, errors
+        state = {}
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            try:
+                r = await fn(ac, world, state)
+            except asyncio.QueueEmpty:
+                return
+            if record:
+                latencies.append((time.perf_counter() - t0) * 1000)
+                errors += r.status_code >= 400
+
+    # unrecorded warmup: caches, prepared plans, pool connections
+    remaining = warmup
+    await asyncio.gather(*(worker(False) for _ in range(concurrency)))
+    remaining = n
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(True) for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    if not latencies:
+        return None
+    return {**summarize(latencies), "rps": round(len(latencies) / wall, 1), "errors": errors}
+
+
+async def run(args):
+    import httpx
+
+    from app.main import app
+    from app.startup import migrate
+
+    migrate()
+    world = World(random.Random(args.seed))
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    # ASGITransport doesn't send lifespan events; run startup/shutdown around the run
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=60
+        ) as ac:
+            t0 = time.perf_counter()
+            await seed(ac, world, args.users, args.projects, args.logs)
+            seed_s = time.perf_counter() - t0
+            print(
+                f"seeded {args.users} users x {args.projects} projects x {args.logs} logs"
+                f" in {seed_s:.1f}s",
+                file=sys.stderr,
+            )
+            endpoints = {}
+            for name, (fn, share) in SCENARIOS.items():
+                if args.only and name not in args.only:
+                    continue
+                n = max(10, int(args.requests * share))
+                result = await run_scenario(ac, world, fn, n, args.concurrency, min(args.warmup, n))
+                if result is not None:
+                    endpoints[name] = result
+                    print(
+                        f"  {name:<10} " + "  ".join(f"{k}={v}" for k, v in result.items()),
+                        file=sys.stderr,
+                    )
+
+    from app.database import engine
+
+    return {
+        "meta": {
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "volumes": {"users": args.users, "projects": args.projects, "logs": args.logs},
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_seconds": round(seed_s, 2),
+            "settings": {k: os.environ[k] for k in SETTINGS if k in os.environ},
+        },
+        "endpoints": endpoints,
+    }
+
+
+# ---------- Baseline ----------
+def compare(results, baseline, threshold):
+    """Rows of (endpoint, metric, base, now, change) plus the regressions among them."""
+    rows, regressions = [], []
+    for name, now in results["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base:
+            continue
+        for metric in (*METRICS, "rps"):
+            if not base.get(metric):
+                continue
+            change = now[metric] / base[metric] - 1
+            # latency regresses upwards, throughput downwards
+            worse = change > threshold if metric != "rps" else change < -threshold
+            rows.append((name, metric, base[metric], now[metric], change, worse))
+            if worse:
+                regressions.append(f"{name} {metric}")
+    return rows, regressions
+
+
+def _throwaway_postgres():
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit("--postgres needs `pip install pgserver` (or set DATABASE_URL yourself)")
+    server = pgserver.get_server(tempfile.mkdtemp(), cleanup_mode="delete")
+    return server.get_uri().replace("postgresql://", "postgresql+psycopg2://", 1)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--users", type=int, default=5)
+    p.add_argument("--projects", type=int, default=200, help="per user")
+    p.add_argument("--logs", type=int, default=20, help="per project")
+    p.add_argument("--requests", type=int, default=300, help="per endpoint")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--warmup", type=int, default=20, help="unrecorded requests per endpoint first")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--only", type=lambda s: set(s.split(",")), default=None)
+    p.add_argument("--out", help="write results JSON here")
+    p.add_argument("--baseline", help="results JSON to compare against")
+    p.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    p.add_argument("--save-baseline", help="also write the results here as the new baseline")
+    p.add_argument("--postgres", action="store_true", help="start a throwaway Postgres (pgserver)")
+    args = p.parse_args(argv)
+
+    if args.postgres:
+        os.environ["DATABASE_URL"] = _throwaway_postgres()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/suite.db")
+
+    results = asyncio.run(run(args))
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.threshold)
+        print(f"\nvs {args.baseline} (threshold {args.threshold:+.0%})")
+        for name, metric, base, now, change, worse in rows:
+            flag = "  REGRESSION" if worse else ""
+            print(f"  {name:<10} {metric:<7} {base:>9} -> {now:<9} {change:+7.1%}{flag}")
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
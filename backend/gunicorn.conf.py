@@ -0,0 +1,59 @@
+# gunicorn.conf.py - production serving: gunicorn -c gunicorn.conf.py app.main:app
+#
+#   WEB_CONCURRENCY (CPUs)         worker processes; defaults to the CPUs this container
+#                                  may use (affinity + cgroup quota, see app/serving.py)
+#   WEB_MAX_WORKERS (8)            cap on the default above
+#   WEB_MAX_REQUESTS (5000)        recycle a worker after this many requests, so slow
+#   WEB_MAX_REQUESTS_JITTER (500)  memory growth is bounded; jitter keeps the workers
+#                                  from all restarting at once. 0 disables recycling
+#   WEB_TIMEOUT (30)               kill a worker that stops answering the arbiter
+#   WEB_GRACEFUL_TIMEOUT (30)      time a recycled/stopping worker gets to finish
+#   WEB_KEEPALIVE (5)              idle keep-alive seconds
+#   PORT (8000)
+#
+# The app is imported once in the arbiter (preload_app) and the workers are forked
+# from it, so the imported code and module state are shared copy-on-write. Importing
+# the app opens no connections (engines are lazy); each worker's lifespan creates
+# and warms its own pool, and post_fork drops anything inherited anyway.
+#
+# Per-process state under several workers: the memory cache would serve a page
+# another worker changed, so CACHE_BACKEND defaults to redis when CACHE_URL is set
+# and to none otherwise; /internal/metrics reports the worker that answered. The
+# change feed (/events) likewise goes through redis when CACHE_URL is set; without
+# it the feed is per process and answers 503 under several workers.
+import gc
+import os
+
+from app.serving import cpu_count
+
+os.environ.setdefault("CACHE_BACKEND", "redis" if os.getenv("CACHE_URL") else "none")
+os.environ.setdefault("EVENTS_BACKEND", "redis" if os.getenv("CACHE_URL") else "memory")
+# Each worker has its own hashing pool; one process each is plenty next to N workers
+os.environ.setdefault("PASSWORD_WORKERS", "1")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(
+    os.getenv("WEB_CONCURRENCY") or min(cpu_count(), int(os.getenv("WEB_MAX_WORKERS", "8")))
+)
+# the app reads the count it's actually served with (app/events.py)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "app.serving.UvicornWorker"
+preload_app = True
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "500"))
+timeout = int(os.getenv("WEB_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+
+
+def when_ready(server):
+    # move everything the import allocated out of the collector's reach: a gc pass
+    # in a worker would otherwise write to (and so copy) every shared page it scans
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app.database import dispose_after_fork
+
+    dispose_after_fork()
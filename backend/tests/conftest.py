@@ -0,0 +1,45 @@
+import os
+import tempfile
+import uuid
+
+# Tests run against a throwaway SQLite file unless DATABASE_URL is already set
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+# Hash in-process: every TestClient exit shuts the hashing pool down, and respawning
+# it per test costs more than the hashing (tests/test_passwords.py covers the pool)
+os.environ.setdefault("PASSWORD_WORKERS", "0")
+# Every test client shares one IP and registers freely; tests/test_ratelimit.py turns it on
+os.environ.setdefault("RATE_LIMIT", "0")
+# Mount /internal/* (off by default); tests/test_pool.py covers INTERNAL_TOKEN
+os.environ.setdefault("INTERNAL_METRICS", "1")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.startup import migrate
+
+# The schema comes from the migrations only, as in production
+migrate()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def register(client, username=None, password="pass123"):
+    username = username or f"user_{uuid.uuid4().hex[:10]}"
+    r = client.post(
+        "/users/",
+        json={"username": username, "email": f"{username}@example.com", "password": password},
+    )
+    assert r.status_code == 201, r.text
+    r = client.post("/auth/token", data={"username": username, "password": password})
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return register(client)
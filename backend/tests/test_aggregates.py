@@ -0,0 +1,121 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.engine import make_url
+
+from app import aggregates, ingest, models, retention
+from app.cache import project_cache
+from app.database import SessionLocal, engine
+
+UTC = timezone.utc
+
+
+def _project(client, headers):
+    return client.post("/projects/", json={"title": "counted"}, headers=headers).json()["id"]
+
+
+def _stats(client, headers, pid):
+    p = client.get(f"/projects/{pid}", headers=headers).json()
+    return p["log_count"], p["last_log_at"]
+
+
+def _ts(value):
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+
+def test_counters_follow_every_write_path(client, auth_headers):
+    pid = _project(client, auth_headers)
+    assert _stats(client, auth_headers, pid) == (0, None)
+
+    client.post("/logs/", json={"project_id": pid, "message": "one"}, headers=auth_headers)
+    count, last = _stats(client, auth_headers, pid)
+    assert count == 1 and last is not None
+
+    newest = datetime.now(UTC) + timedelta(seconds=30)
+    client.post(
+        f"/projects/{pid}/logs",
+        json=[
+            {"message": "new", "created_at": newest.isoformat()},
+            {"message": "old", "created_at": (newest - timedelta(hours=1)).isoformat()},
+        ],
+        headers=auth_headers,
+    )
+    count, last = _stats(client, auth_headers, pid)
+    assert count == 3
+    # an older timestamp arriving later never moves last_log_at backwards
+    assert _ts(last) == newest.replace(tzinfo=None)
+
+    listed = {p["id"]: p for p in client.get("/projects/", headers=auth_headers).json()}
+    assert listed[pid]["log_count"] == 3
+
+
+def test_logs_move_the_version_but_not_updated_at(client, auth_headers):
+    pid = _project(client, auth_headers)
+    edited = datetime(2001, 1, 1, tzinfo=UTC)
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.Project).where(models.Project.id == pid).values(updated_at=edited)
+        )
+        version = conn.scalar(select(models.Project.version).where(models.Project.id == pid))
+
+    client.post(f"/projects/{pid}/logs", json=[{"message": "x"}], headers=auth_headers)
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(models.Project.version, models.Project.updated_at).where(
+                models.Project.id == pid
+            )
+        ).one()
+    assert row.version == version + 1
+    assert row.updated_at.replace(tzinfo=None) == edited.replace(tzinfo=None)
+
+
+@pytest.mark.skipif(
+    make_url(os.environ["DATABASE_URL"]).get_backend_name() != "sqlite",
+    reason="the unpartitioned retention fallback; logs is partitioned on Postgres",
+)
+def test_retention_fallback_subtracts_deleted_rows(client, auth_headers):
+    now = datetime.now(UTC)
+    pid = _project(client, auth_headers)
+    # older than ingest takes from clients, so written directly
+    with SessionLocal() as db:
+        ingest.write_logs(
+            db,
+            [{"project_id": pid, "message": "x", "created_at": now - timedelta(days=400)}] * 2
+            + [{"project_id": pid, "message": "x", "created_at": now}],
+        )
+        db.commit()
+    with engine.connect() as conn:
+        retention.drop_expired(conn, retention_days=365)
+        conn.commit()
+    assert _stats(client, auth_headers, pid)[0] == 1
+
+    db = SessionLocal()
+    try:
+        retention.purge_project_logs(db, [pid], chunk=1)
+        assert _stats(client, auth_headers, pid) == (0, None)
+    finally:
+        db.close()
+
+
+def test_reconcile_repairs_drift(client, auth_headers):
+    pid = _project(client, auth_headers)
+    client.post(f"/projects/{pid}/logs", json=[{"message": "x"}] * 4, headers=auth_headers)
+    expected = _stats(client, auth_headers, pid)
+
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.Project)
+            .where(models.Project.id == pid)
+            .values(log_count=99, last_log_at=None)
+        )
+    # a write behind the app's back: nothing invalidated the cached project
+    project_cache.clear()
+    assert _stats(client, auth_headers, pid)[0] == 99
+
+    with engine.begin() as conn:
+        assert aggregates.reconcile(conn, [pid]) == 1
+    count, last = _stats(client, auth_headers, pid)
+    assert count == 4
+    assert _ts(last) == _ts(expected[1])
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import get_async_db, to_async_url
+from app.routes import auth_async, projects_async, users_async
+from tests.conftest import register
+
+
+def test_to_async_url():
+    assert to_async_url("postgresql+psycopg2://u:p@db/x") == "postgresql+asyncpg://u:p@db/x"
+    assert to_async_url("sqlite:///./dev.db") == "sqlite+aiosqlite:///./dev.db"
+
+
+@pytest.fixture
+def async_client():
+    engine = create_async_engine(to_async_url(os.environ["DATABASE_URL"]))
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    for r in (auth_async, users_async, projects_async):
+        app.include_router(r.router)
+    app.dependency_overrides[get_async_db] = override
+    with TestClient(app) as c:
+        yield c
+
+
+def test_async_project_crud(async_client):
+    headers = register(async_client)
+    r = async_client.post("/projects/", json={"title": "a", "description": "x"}, headers=headers)
+    assert r.status_code == 201
+    pid = r.json()["id"]
+
+    assert (
+        async_client.patch(f"/projects/{pid}", json={"title": "b"}, headers=headers).json()["title"]
+        == "b"
+    )
+    assert [p["id"] for p in async_client.get("/projects/?q=b", headers=headers).json()] == [pid]
+    assert async_client.delete(f"/projects/{pid}", headers=headers).status_code == 204
+    assert async_client.get(f"/projects/{pid}", headers=headers).status_code == 404
+
+
+def test_async_register_rejects_duplicate(async_client):
+    register(async_client, username="dup_async")
+    r = async_client.post(
+        "/users/", json={"username": "dup_async", "email": "other@example.com", "password": "x"}
+    )
+    assert r.status_code == 400
@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from app import auth, models
+from app.auth import TokenCache, token_cache
+from app.cache import RedisBackend
+from app.database import SessionLocal
+
+
+def test_second_request_is_a_cache_hit(client, auth_headers):
+    token_cache.clear()
+    assert client.get("/projects/", headers=auth_headers).status_code == 200
+    assert client.get("/projects/", headers=auth_headers).status_code == 200
+    stats = token_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+def test_cached_user_is_served_by_me(client, auth_headers):
+    first = client.get("/users/me", headers=auth_headers).json()
+    second = client.get("/users/me", headers=auth_headers).json()
+    assert first == second
+
+
+def test_entry_never_outlives_token_exp():
+    cache = TokenCache(maxsize=10, ttl=3600)
+    user = models.User(id=1, username="a", email="a@example.com")
+    cache.put("tok", user, exp=time.time() + 0.05)
+    assert cache.get("tok") is not None
+    time.sleep(0.1)
+    assert cache.get("tok") is None
+    # already-expired tokens are not stored at all
+    cache.put("old", user, exp=time.time() - 1)
+    assert cache.get("old") is None
+
+
+def test_cache_is_bounded():
+    cache = TokenCache(maxsize=2, ttl=60)
+    for i in range(3):
+        cache.put(f"t{i}", models.User(id=i, username=f"u{i}", email=""), exp=None)
+    assert cache.get("t0") is None
+    assert cache.get("t2") is not None
+    assert cache.stats()["size"] == 2
+
+
+def test_updating_user_evicts_entry(client, auth_headers):
+    token_cache.clear()
+    me = client.get("/users/me", headers=auth_headers).json()
+    assert token_cache.stats()["size"] == 1
+
+    db = SessionLocal()
+    user = db.get(models.User, me["id"])
+    user.email = "changed_" + user.email
+    db.commit()
+    db.close()
+
+    assert token_cache.stats()["size"] == 0
+    assert client.get("/users/me", headers=auth_headers).json()["email"].startswith("changed_")
+
+
+def test_a_change_reaches_other_workers_through_redis(client, auth_headers, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    here, elsewhere = (
+        TokenCache(maxsize=10, ttl=60, store=RedisBackend(fakeredis.FakeRedis(server=server)))
+        for _ in range(2)
+    )
+    monkeypatch.setattr(auth, "token_cache", here)
+    me = client.get("/users/me", headers=auth_headers).json()
+    user = models.User(**me)
+    elsewhere.put("tok", user, exp=None)
+    assert elsewhere.get("tok") == me and here.stats()["size"] == 1
+
+    with SessionLocal() as db:
+        db.get(models.User, me["id"]).email = "moved_" + me["email"]
+        db.flush()
+        db.rollback()
+    # a change that didn't commit leaves the other workers alone
+    assert elsewhere.get("tok") == me
+
+    with SessionLocal() as db:
+        db.get(models.User, me["id"]).email = "moved_" + me["email"]
+        db.commit()
+    assert here.stats()["size"] == 0
+    assert elsewhere.get("tok") is None and elsewhere.stats()["size"] == 0
+    assert client.get("/users/me", headers=auth_headers).json()["email"].startswith("moved_")
+
+    # a lookup that read the row before a change committed is cached as outdated
+    before = elsewhere.version(me["username"])
+    with SessionLocal() as db:
+        db.get(models.User, me["id"]).email = "again_" + me["email"]
+        db.commit()
+    elsewhere.put("tok", user, exp=None, version=before)
+    assert elsewhere.get("tok") is None
+
+
+def test_unreadable_store_means_a_miss():
+    class Down:
+        def get(self, key):
+            raise ConnectionError("redis is down")
+
+    cache = TokenCache(maxsize=10, ttl=60, store=Down())
+    user = models.User(id=1, username="a", email="")
+    cache.put("tok", user, exp=None, version=cache.version(user.username))
+    # the version couldn't be read, so nothing was cached
+    assert cache.get("tok") is None and cache.stats() == {
+        "size": 0,
+        "hits": 0,
+        "misses": 1,
+        "shared": True,
+        "store_errors": 1,
+    }
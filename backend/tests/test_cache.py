@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app import etags
+from app.cache import Cache, Entry, MemoryBackend, RedisBackend, project_cache
+from app.database import DB_ASYNC, SessionLocal, engine
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(project_cache, "backend", RedisBackend(fakeredis.FakeRedis()))
+    return project_cache.backend
+
+
+@pytest.mark.skipif(DB_ASYNC, reason="async handlers read around the cache")
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_reads_are_cached_and_writes_invalidate(client, auth_headers, request, backend):
+    if backend == "redis":
+        request.getfixturevalue("fake_redis")
+    pid = client.post("/projects/", json={"title": "before"}, headers=auth_headers).json()["id"]
+    before = project_cache.stats()["kinds"].get("p", {}).get("hits", 0)
+    assert client.get(f"/projects/{pid}", headers=auth_headers).json()["title"] == "before"
+    assert client.get(f"/projects/{pid}", headers=auth_headers).json()["title"] == "before"
+    assert client.get("/projects/", headers=auth_headers).json()[0]["title"] == "before"
+    assert project_cache.stats()["kinds"]["p"]["hits"] == before + 1
+
+    client.patch(f"/projects/{pid}", json={"title": "after"}, headers=auth_headers)
+    assert client.get(f"/projects/{pid}", headers=auth_headers).json()["title"] == "after"
+    assert client.get("/projects/", headers=auth_headers).json()[0]["title"] == "after"
+
+    client.post(f"/projects/{pid}/logs", json=[{"message": "x"}], headers=auth_headers)
+    assert client.get(f"/projects/{pid}", headers=auth_headers).json()["log_count"] == 1
+
+    client.delete(f"/projects/{pid}", headers=auth_headers)
+    assert client.get(f"/projects/{pid}", headers=auth_headers).status_code == 404
+    assert client.get("/projects/", headers=auth_headers).json() == []
+
+
+def test_cached_revalidation_skips_the_database(client, auth_headers):
+    pid = client.post("/projects/", json={"title": "t"}, headers=auth_headers).json()["id"]
+    r = client.get(f"/projects/{pid}", headers=auth_headers)
+    etag = r.headers["etag"]
+
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        r = client.get(f"/projects/{pid}", headers={**auth_headers, "If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.headers["etag"] == etag
+        r = client.get(f"/projects/{pid}", headers=auth_headers)
+        assert r.status_code == 200 and r.json()["id"] == pid
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert statements == []
+
+
+def test_memory_backend_bounds_and_ttl():
+    backend = MemoryBackend(maxsize=2)
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.get("a")  # a is now the most recent
+    backend.set("c", b"3")
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+    assert backend.info()["evictions"] == 1
+
+    backend.set("short", b"x", ttl=0.05)
+    assert backend.get("short") == b"x"
+    time.sleep(0.1)
+    assert backend.get("short") is None
+
+
+def test_memory_backend_add_has_one_winner():
+    backend = MemoryBackend(maxsize=10)
+    start = threading.Barrier(16)
+    won = []
+
+    def race(i):
+        start.wait()
+        if backend.add("lock:k", str(i).encode(), ttl=5):
+            won.append(i)
+
+    threads = [threading.Thread(target=race, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(won) == 1 and backend.get("lock:k") == str(won[0]).encode()
+
+
+def test_concurrent_misses_load_once():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return Entry(b"[]", {"ETag": '"x"'})
+
+    # two caches on one redis: two workers, each with its own threads
+    workers = [Cache(RedisBackend(fakeredis.FakeRedis(server=server))) for _ in range(2)]
+    results = []
+    threads = [
+        threading.Thread(target=lambda c=c: results.append(c.fetch("l", "u1", "q", loader, 60)))
+        for c in workers
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len(results) == 16 and all(r.body == b"[]" for r in results)
+    assert sum(c.stats()["kinds"]["l"]["coalesced"] for c in workers) == 15
+
+
+def test_invalidation_waits_for_commit(client, auth_headers):
+    user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+    gen = project_cache.generation(f"u{user_id}")
+    db = SessionLocal()
+    try:
+        etags.touch_owners(db, [user_id])
+        assert project_cache.generation(f"u{user_id}") == gen
+        db.rollback()
+        assert project_cache.generation(f"u{user_id}") == gen
+        etags.touch_owners(db, [user_id])
+        db.commit()
+        assert project_cache.generation(f"u{user_id}") != gen
+    finally:
+        db.close()
+
+
+def test_connection_invalidation_waits_for_commit(client, auth_headers):
+    user_id = client.get("/users/me", headers=auth_headers).json()["id"]
+    gen = project_cache.generation(f"u{user_id}")
+    with engine.connect() as conn:
+        etags.touch_owners(conn, [user_id])
+        assert project_cache.generation(f"u{user_id}") == gen
+        conn.rollback()
+        assert project_cache.generation(f"u{user_id}") == gen
+        etags.touch_owners(conn, [user_id])
+        conn.commit()
+    assert project_cache.generation(f"u{user_id}") != gen
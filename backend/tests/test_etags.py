@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.database import engine
+from tests.conftest import register
+
+
+@contextmanager
+def _statements():
+    seen = []
+
+    def listener(_conn, _cur, statement, *_):
+        seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def _project(client, headers, title="tagged"):
+    return client.post("/projects/", json={"title": title}, headers=headers).json()["id"]
+
+
+def test_project_etag_roundtrip(client, auth_headers):
+    pid = _project(client, auth_headers)
+    r = client.get(f"/projects/{pid}", headers=auth_headers)
+    etag, last_modified = r.headers["ETag"], r.headers["Last-Modified"]
+    assert r.json()["updated_at"]
+    assert r.headers["Cache-Control"] == "private, no-cache"
+
+    with _statements() as seen:
+        r = client.get(f"/projects/{pid}", headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert r.headers["ETag"] == etag
+    # answered from the version stamp; the full row is never selected
+    assert not any("projects.title" in s for s in seen)
+
+    r = client.get(f"/projects/{pid}", headers={**auth_headers, "If-Modified-Since": last_modified})
+    assert r.status_code == 304
+    r = client.get(
+        f"/projects/{pid}",
+        headers={**auth_headers, "If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"},
+    )
+    assert r.status_code == 200
+
+    client.patch(f"/projects/{pid}", json={"title": "renamed"}, headers=auth_headers)
+    r = client.get(f"/projects/{pid}", headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["title"] == "renamed"
+    assert r.headers["ETag"] != etag
+
+    # log counters are part of the payload too
+    etag = r.headers["ETag"]
+    client.post(f"/projects/{pid}/logs", json=[{"message": "x"}], headers=auth_headers)
+    r = client.get(f"/projects/{pid}", headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["log_count"] == 1
+
+
+def test_list_etag_tracks_every_write(client, auth_headers):
+    pid = _project(client, auth_headers)
+
+    def revalidate(etag, query=""):
+        return client.get(f"/projects/{query}", headers={**auth_headers, "If-None-Match": etag})
+
+    etag = client.get("/projects/", headers=auth_headers).headers["ETag"]
+    assert revalidate(etag).status_code == 304
+    # another page/search of the same data is a different representation
+    assert revalidate(etag, "?limit=1").status_code == 200
+
+    # someone else's writes don't invalidate this user's list
+    other = register(client)
+    _project(client, other)
+    assert revalidate(etag).status_code == 304
+
+    writes = [
+        lambda: _project(client, auth_headers, "second"),
+        lambda: client.put(f"/projects/{pid}", json={"title": "put"}, headers=auth_headers),
+        lambda: client.patch(
+            "/projects/batch", json=[{"id": pid, "title": "batched"}], headers=auth_headers
+        ),
+        lambda: client.post(f"/projects/{pid}/logs", json=[{"message": "x"}], headers=auth_headers),
+        lambda: client.delete(f"/projects/{pid}", headers=auth_headers),
+    ]
+    for write in writes:
+        write()
+        r = revalidate(etag)
+        assert r.status_code == 200
+        etag = r.headers["ETag"]
+        assert revalidate(etag).status_code == 304
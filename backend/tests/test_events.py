@@ -0,0 +1,356 @@
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from app import events
+from app.events import Broker, RedisRelay, Tickets
+from app.main import app
+from tests.conftest import register
+
+
+def _parse(frames: bytes) -> list[tuple[str, dict]]:
+    out = []
+    for block in frames.decode().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1)
+            for line in block.splitlines()
+            if line and not line.startswith((":", "retry"))
+        )
+        if "event" in fields:
+            out.append(
+                (
+                    fields["event"],
+                    {
+                        **json.loads(fields["data"]),
+                        **({"_id": fields["id"]} if "id" in fields else {}),
+                    },
+                )
+            )
+    return out
+
+
+async def _drain(gen, upto: int) -> bytes:
+    """The next `upto` frames of a stream() generator."""
+    return b"".join([await anext(gen) for _ in range(upto)])
+
+
+@pytest.mark.asyncio
+async def test_fan_out_in_order_filtered_by_user_and_project():
+    broker = Broker(queue_size=10, history=100)
+    mine, other, one_project = (
+        broker.subscribe(1)[0],
+        broker.subscribe(2)[0],
+        broker.subscribe(1, project_id=7)[0],
+    )
+    for i in range(3):
+        broker.publish(1, "project.updated", {"id": 7, "n": i}, project_id=7)
+    broker.publish(1, "project.deleted", {"id": 8}, project_id=8)
+    broker.publish(2, "project.deleted", {"id": 9}, project_id=9)
+    await asyncio.sleep(0)  # deliveries run on the loop
+
+    assert [e.seq for e in mine.queue] == [1, 2, 3, 4]
+    assert [e.seq for e in one_project.queue] == [1, 2, 3]
+    assert [e.seq for e in other.queue] == [5]
+    assert _parse(mine.queue[0].frame) == [
+        ("project.updated", {"id": 7, "n": 0, "_id": f"{events.EPOCH}-1"})
+    ]
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_dropped_and_resumes_from_last_event_id(monkeypatch):
+    broker = Broker(queue_size=3, history=100)
+    monkeypatch.setattr(events, "broker", broker)
+    slow, _ = broker.subscribe(1)
+    fast, _ = broker.subscribe(1)
+    gen = events.stream(slow, None)
+    assert b": connected" in await anext(gen)
+    for i in range(5):
+        broker.publish(1, "project.updated", {"n": i})
+        await asyncio.sleep(0)
+        fast.queue.clear()  # keeps up
+    assert slow.closed == "overflow" and not fast.closed and broker.dropped == 1
+
+    got = _parse(await _drain(gen, 4))
+    assert [kind for kind, _ in got] == ["project.updated"] * 3 + ["overflow"]
+    with pytest.raises(StopAsyncIteration):
+        await anext(gen)
+    assert broker.subscribers == 1  # the slow one is gone
+
+    # reconnect with the last id seen: the two it missed are replayed, then live events
+    again, resumed = broker.subscribe(1, last_event_id=got[2][1]["_id"])
+    assert resumed is True
+    broker.publish(1, "project.updated", {"n": 5})
+    await asyncio.sleep(0)
+    assert [e.seq for e in again.queue] == [4, 5, 6]
+
+
+@pytest.mark.asyncio
+async def test_unknown_or_expired_last_event_id_gets_a_reset(monkeypatch):
+    broker = Broker(queue_size=10, history=2)
+    monkeypatch.setattr(events, "broker", broker)
+    for i in range(5):
+        broker.publish(1, "project.updated", {"n": i})
+    for last_id in (f"{events.EPOCH}-1", "deadbeef-4", "garbage"):
+        sub, resumed = broker.subscribe(1, last_event_id=last_id)
+        assert resumed is False and not sub.queue
+        gen = events.stream(sub, resumed)
+        await anext(gen)
+        assert _parse(await anext(gen)) == [("reset", {})]
+        await gen.aclose()
+    sub, resumed = broker.subscribe(1, last_event_id=f"{events.EPOCH}-3")
+    assert resumed is True and [e.seq for e in sub.queue] == [4, 5]
+    assert broker.subscribers == 1
+
+
+# ---------- Through the app ----------
+class Connection:
+    """An SSE request driven straight through the ASGI app, kept open until close()."""
+
+    def __init__(self, path: str, headers: dict):
+        self.scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "server": ("test", 80),
+            "client": ("127.0.0.1", 1234),
+            "root_path": "",
+            "path": path.split("?")[0],
+            "raw_path": path.split("?")[0].encode(),
+            "query_string": path.partition("?")[2].encode(),
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        }
+        self.status = None
+        self.body = b""
+        self.arrived = asyncio.Event()
+        self._gone = asyncio.Event()
+        self._sent_request = False
+        self.task = asyncio.create_task(app(self.scope, self.receive, self.send))
+
+    async def receive(self):
+        if not self._sent_request:
+            self._sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self._gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        elif message.get("body"):
+            self.body += message["body"]
+            self.arrived.set()
+
+    async def next_events(self, kinds: set, timeout=5.0) -> list:
+        async with asyncio.timeout(timeout):
+            while not kinds <= {kind for kind, _ in _parse(self.body)}:
+                self.arrived.clear()
+                await self.arrived.wait()
+        return _parse(self.body)
+
+    async def close(self):
+        self._gone.set()
+        await self.task
+
+
+@pytest.mark.asyncio
+async def test_events_endpoint_streams_project_and_log_changes(client):
+    headers = register(client)
+    project = client.post(
+        "/projects/", json={"title": "Feed", "description": "d"}, headers=headers
+    ).json()
+    ticket = client.post("/events/ticket", headers=headers).json()["ticket"]
+    everything = Connection(f"/events?ticket={ticket}", {})
+    one = Connection(f"/events?project_id={project['id']}", headers)
+    for conn in (everything, one):
+        async with asyncio.timeout(5):
+            await conn.arrived.wait()
+        assert conn.status == 200
+
+    other = client.post(
+        "/projects/", json={"title": "Other", "description": "d"}, headers=headers
+    ).json()
+    client.patch(f"/projects/{project['id']}", json={"title": "Feed 2"}, headers=headers)
+    client.post(
+        f"/projects/{project['id']}/logs",
+        json=[{"message": f"line {i}"} for i in range(3)],
+        headers=headers,
+    )
+    client.delete(f"/projects/{other['id']}", headers=headers)
+
+    got = await everything.next_events(
+        {"project.created", "project.updated", "logs.created", "project.deleted"}
+    )
+    assert [k for k, _ in got] == [
+        "project.created",
+        "project.updated",
+        "logs.created",
+        "project.deleted",
+    ]
+    assert got[1][1]["title"] == "Feed 2"
+    assert (
+        got[2][1]["count"] == 3 and [line["message"] for line in got[2][1]["lines"]][-1] == "line 2"
+    )
+
+    got = await one.next_events({"project.updated", "logs.created"})
+    assert [k for k, _ in got] == ["project.updated", "logs.created"]
+
+    # other users' streams and projects are off limits
+    stranger = register(client)
+    assert client.get(f"/events?project_id={project['id']}", headers=stranger).status_code == 404
+    assert client.get("/events").status_code == 401
+    # a ticket works once; the bearer token itself isn't taken from the URL
+    assert client.get(f"/events?ticket={ticket}").status_code == 401
+    token = headers["Authorization"].split()[1]
+    assert client.get(f"/events?access_token={token}").status_code == 401
+    for conn in (everything, one):
+        await conn.close()
+    assert events.broker.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_events_written_while_away_are_replayed(client):
+    headers = register(client)
+    first = client.post(
+        "/projects/", json={"title": "Seen", "description": "d"}, headers=headers
+    ).json()
+    conn = Connection("/events", headers)
+    async with asyncio.timeout(5):
+        await conn.arrived.wait()
+    client.patch(f"/projects/{first['id']}", json={"title": "Seen 2"}, headers=headers)
+    last_id = (await conn.next_events({"project.updated"}))[-1][1]["_id"]
+    await conn.close()
+
+    # nobody is watching while these happen; they're still kept for the resume
+    second = client.post(
+        "/projects/", json={"title": "Missed", "description": "d"}, headers=headers
+    ).json()
+    client.post(f"/projects/{second['id']}/logs", json=[{"message": "hi"}], headers=headers)
+    again = Connection(f"/events?last_event_id={last_id}", headers)
+    got = await again.next_events({"project.created", "logs.created"})
+    assert [k for k, _ in got] == ["project.created", "logs.created"]
+    assert got[0][1]["title"] == "Missed"
+    await again.close()
+
+
+def test_events_refused_under_several_workers(client, monkeypatch):
+    headers = register(client)
+    monkeypatch.setattr(events, "WORKERS", 2)
+    assert client.get("/events", headers=headers).status_code == 503
+    assert client.post("/events/ticket", headers=headers).status_code == 503
+
+
+def _wait_for(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_workers_share_one_feed_through_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    a, b = (
+        Broker(queue_size=10, relay=RedisRelay(fakeredis.FakeRedis(server=server), block_ms=50))
+        for _ in range(2)
+    )
+    a.start()
+    try:
+        a.publish(1, "project.created", {"id": 7}, project_id=7)
+        _wait_for(lambda: a.stats()["history"] == 1)
+        # a worker started later loads what's already in the stream
+        b.start()
+        _wait_for(lambda: b.stats()["history"] == 1)
+        on_b, _ = b.subscribe(1)
+        a.publish(1, "project.updated", {"id": 7, "n": 1}, project_id=7)
+        a.publish(2, "project.updated", {"id": 9}, project_id=9)
+        async with asyncio.timeout(5):
+            while len(on_b.queue) < 1 or b.stats()["history"] < 3:
+                await asyncio.sleep(0.01)
+        (got,) = on_b.queue
+        assert _parse(got.frame)[0][0] == "project.updated"
+        # the ids are the stream's, the same in every worker: resume anywhere
+        first_id = _parse(a._history[0].frame)[0][1]["_id"]
+        assert _parse(b._history[0].frame)[0][1]["_id"] == first_id
+        again, resumed = b.subscribe(1, last_event_id=first_id)
+        assert resumed is True and [e.frame for e in again.queue] == [got.frame]
+        assert b.subscribe(1, last_event_id=f"{events.EPOCH}-1")[1] is False
+    finally:
+        a.close()
+        b.close()
+    assert a.stats()["relay_errors"] == b.stats()["relay_errors"] == 0
+
+    client = fakeredis.FakeRedis(server=server)
+    ticket = Tickets(client=client).issue(5)
+    other = Tickets(client=fakeredis.FakeRedis(server=server))
+    assert other.redeem(ticket) == 5 and other.redeem(ticket) is None
+
+
+@pytest.mark.asyncio
+async def test_events_served_under_several_workers_with_redis(client, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    headers = register(client)
+    monkeypatch.setattr(events, "WORKERS", 2)
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(events, "broker", Broker(relay=RedisRelay(redis, block_ms=50)))
+    monkeypatch.setattr(events, "tickets", Tickets(client=redis))
+    events.broker.start()
+    try:
+        r = client.post("/events/ticket", headers=headers)
+        assert r.status_code == 200 and redis.exists(f"ticket:{r.json()['ticket']}")
+        conn = Connection(f"/events?ticket={r.json()['ticket']}", {})
+        async with asyncio.timeout(5):
+            await conn.arrived.wait()
+        client.post("/projects/", json={"title": "Relayed", "description": "d"}, headers=headers)
+        got = await conn.next_events({"project.created"})
+        assert got[-1][1]["title"] == "Relayed" and redis.xlen(RedisRelay.KEY) == 1
+        await conn.close()
+    finally:
+        events.broker.close()
+
+
+def _rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc/self/statm")
+@pytest.mark.asyncio
+async def test_memory_per_idle_subscriber(client):
+    """5k open, idle /events connections: what each one costs while it waits."""
+    headers = register(client)
+    n = 5000
+    # warm up first, so one-off allocations (imports, caches, pools) aren't counted
+    warm = Connection("/events", headers)
+    async with asyncio.timeout(10):
+        await warm.arrived.wait()
+    await warm.close()
+    gc.collect()
+    before = _rss()
+    conns = [Connection("/events", headers) for _ in range(n)]
+    async with asyncio.timeout(120):
+        while sum(c.arrived.is_set() for c in conns) < n:
+            await asyncio.sleep(0.05)
+    gc.collect()
+    held = _rss() - before
+    assert events.broker.subscribers == n and all(c.status == 200 for c in conns)
+
+    # one publish reaches all of them
+    client.post("/projects/", json={"title": "Broadcast", "description": "d"}, headers=headers)
+    async with asyncio.timeout(30):
+        while not all(b"project.created" in c.body for c in conns):
+            await asyncio.sleep(0.05)
+    for c in conns:
+        await c.close()
+    assert events.broker.subscribers == 0
+
+    per_conn = held / n
+    print(f"\n{n} idle subscribers: {held / 2**20:.1f} MiB, {per_conn / 1024:.1f} KiB each")
+    assert per_conn < 64 * 1024
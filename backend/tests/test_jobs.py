@@ -0,0 +1,232 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app import aggregates, jobs, models
+from app.database import SessionLocal
+from app.jobs import Worker
+from app.routes import projects, projects_async
+from tests.conftest import register
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime.now(timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+
+def _utc(ts):
+    # SQLite hands back naive UTC
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _job(job_id):
+    with SessionLocal() as db:
+        return db.get(models.Job, job_id)
+
+
+def _kind(monkeypatch, kind, fn, limit=1):
+    monkeypatch.setitem(jobs.HANDLERS, kind, jobs.Handler(fn, limit))
+
+
+def test_large_project_delete_is_queued_and_run_in_process(client, monkeypatch):
+    for module in (projects, projects_async):
+        monkeypatch.setattr(module, "DELETE_INLINE_LOGS", 5)
+    headers, stranger = register(client), register(client)
+    big = client.post("/projects/", json={"title": "big"}, headers=headers).json()["id"]
+    small = client.post("/projects/", json={"title": "small"}, headers=headers).json()["id"]
+    client.post(
+        f"/projects/{big}/logs", json=[{"message": f"m{i}"} for i in range(20)], headers=headers
+    )
+    client.post(f"/projects/{small}/logs", json=[{"message": "m"}], headers=headers)
+
+    r = client.delete(f"/projects/{big}", headers=headers)
+    assert r.status_code == 202
+    job = r.json()
+    assert job["kind"] == "project.delete" and job["status"] == "queued"
+    assert r.headers["location"] == f"/jobs/{job['id']}"
+    assert client.get(f"/jobs/{job['id']}", headers=stranger).status_code == 404
+    # gone for its owner straight away, though the row and logs are still there
+    assert client.get(f"/projects/{big}", headers=headers).status_code == 404
+    assert big not in {p["id"] for p in client.get("/projects/", headers=headers).json()}
+    assert client.get(f"/logs/?project_id={big}", headers=headers).json() == []
+    late = client.post(f"/projects/{big}/logs", json=[{"message": "late"}], headers=headers)
+    assert late.status_code == 404
+    assert client.delete(f"/projects/{big}", headers=headers).status_code == 404
+    with SessionLocal() as db:
+        assert db.get(models.Project, big).deleted_at is not None
+
+    assert Worker().drain() >= 1
+    r = client.get(f"/jobs/{job['id']}", headers=headers)
+    assert r.json()["status"] == "done" and r.json()["result"] == {"deleted": True, "logs": 20}
+    assert r.json()["attempts"] == 1 and r.json()["finished_at"]
+    assert client.get(f"/projects/{big}", headers=headers).status_code == 404
+    assert client.get(f"/logs/?project_id={big}", headers=headers).json() == []
+
+    # below the threshold it's still done inline
+    assert client.delete(f"/projects/{small}", headers=headers).status_code == 204
+    assert client.get(f"/projects/{small}", headers=headers).status_code == 404
+
+
+def test_failed_attempts_back_off_then_fail(monkeypatch):
+    monkeypatch.setattr(jobs, "BACKOFF", 10)
+    calls = Counter()
+
+    def flaky(db, fail_times):
+        calls["flaky"] += 1
+        if calls["flaky"] <= fail_times:
+            raise RuntimeError("not yet")
+        return {"ok": True}
+
+    def broken(db):
+        raise ValueError("always")
+
+    _kind(monkeypatch, "test.flaky", flaky)
+    _kind(monkeypatch, "test.broken", broken)
+    with SessionLocal() as db:
+        flaky_id = jobs.enqueue(db, "test.flaky", {"fail_times": 2}).id
+        broken_id = jobs.enqueue(db, "test.broken", max_attempts=2).id
+        db.commit()
+    clock = Clock()
+    worker = Worker(clock=clock)
+
+    worker.drain()
+    job = _job(flaky_id)
+    assert job.status == "queued" and job.attempts == 1 and job.error == "RuntimeError: not yet"
+    # first retry after BACKOFF seconds, +-25%
+    assert (
+        clock.now + timedelta(seconds=7.5)
+        <= _utc(job.run_at)
+        <= clock.now + timedelta(seconds=12.5)
+    )
+    assert worker.drain() == 0  # nothing is due yet
+
+    clock.now += timedelta(seconds=13)
+    worker.drain()
+    job = _job(flaky_id)
+    # the second retry waits twice as long
+    assert job.attempts == 2 and _utc(job.run_at) >= clock.now + timedelta(seconds=15)
+    assert _job(broken_id).status == "failed" and _job(broken_id).finished_at is not None
+
+    clock.now += timedelta(seconds=30)
+    worker.drain()
+    job = _job(flaky_id)
+    assert (job.status, job.attempts, job.result, calls["flaky"]) == ("done", 3, {"ok": True}, 3)
+    assert (worker.done, worker.failed) == (1, 1)
+
+
+def test_threaded_worker_keeps_each_kind_under_its_limit(monkeypatch):
+    lock = threading.Lock()
+    now, peak = Counter(), Counter()
+
+    def tracked(kind):
+        def run(db, n):
+            with lock:
+                now[kind] += 1
+                peak[kind] = max(peak[kind], now[kind])
+            time.sleep(0.05)
+            with lock:
+                now[kind] -= 1
+            return n
+
+        return run
+
+    _kind(monkeypatch, "test.exclusive", tracked("exclusive"), limit=1)
+    _kind(monkeypatch, "test.pair", tracked("pair"), limit=2)
+    with SessionLocal() as db:
+        ids = [jobs.enqueue(db, "test.exclusive", {"n": i}).id for i in range(4)]
+        ids += [jobs.enqueue(db, "test.pair", {"n": i}).id for i in range(4)]
+        db.commit()
+
+    worker = Worker(threads=4, poll=0.01)
+    serving = threading.Thread(target=worker.serve)
+    serving.start()
+    try:
+        deadline = time.monotonic() + 20
+        while not all(_job(i).status == "done" for i in ids):
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+    finally:
+        worker.stop()
+        serving.join(5)
+    assert peak["exclusive"] == 1 and peak["pair"] <= 2
+    assert [_job(i).result for i in ids] == [0, 1, 2, 3] * 2
+
+
+def test_jobs_of_a_lost_worker_are_retried(monkeypatch):
+    _kind(monkeypatch, "test.once", lambda db: "ran")
+    with SessionLocal() as db:
+        job_id = jobs.enqueue(db, "test.once").id
+        db.commit()
+    clock = Clock()
+    lost = Worker(clock=clock, name="lost")
+    claimed = lost.claim()
+    assert claimed.id == job_id and _job(job_id).status == "running"
+
+    # the lost worker never renews its lease
+    clock.now += timedelta(seconds=jobs.LEASE + 1)
+    other = Worker(clock=clock, name="other")
+    assert other.recover() >= 1
+    assert _job(job_id).status == "queued"
+    other.drain()
+    assert (_job(job_id).status, _job(job_id).attempts) == ("done", 2)
+    # a late report from the lost worker doesn't overwrite the outcome
+    lost._finish(claimed, error="late")
+    assert _job(job_id).status == "done"
+
+
+def test_rebuild_commands_run_through_the_queue(client, auth_headers, capsys):
+    pid = client.post(
+        "/projects/", json={"title": "rebuildable dashboard"}, headers=auth_headers
+    ).json()["id"]
+    aggregates.main(["--enqueue", "--project", str(pid)])
+    job_id = int(capsys.readouterr().out.split()[-1])
+    search_id = jobs.submit("search.rebuild")
+    assert _job(job_id).status == "queued"
+
+    Worker().drain()
+    assert _job(job_id).result == {"projects": 1}
+    assert _job(search_id).status == "done" and _job(search_id).result["index"]
+    hits = client.get("/projects/?q=rebuildable", headers=auth_headers).json()
+    assert [p["id"] for p in hits] == [pid]
+
+    with pytest.raises(ValueError):
+        jobs.submit("no.such.kind")
+
+
+def test_recurring_kinds_are_queued_by_the_worker(monkeypatch):
+    runs = []
+    monkeypatch.setitem(
+        jobs.HANDLERS, "logs.retention", jobs.Handler(lambda db: runs.append(1), 1, 3600)
+    )
+    clock = Clock()
+    worker = Worker(clock=clock)
+    worker.schedule()
+    assert worker.schedule() == 0  # one is queued already
+    clock.now += timedelta(hours=2)
+    worker.drain()
+    assert runs == [1]
+
+    # the next one is due an hour after the last was
+    with SessionLocal() as db:
+        last = db.scalars(
+            select(models.Job).where(models.Job.kind == "logs.retention").order_by(models.Job.id)
+        ).all()[-1]
+    assert last.status == "done"
+    clock.now = _utc(last.run_at) + timedelta(minutes=59)
+    assert worker.schedule() == 1
+    assert worker.drain() == 0
+    clock.now = _utc(last.run_at) + timedelta(hours=1)
+    worker.drain()
+    assert runs == [1, 1]
+
+
+def test_retention_job_runs_a_pass():
+    with SessionLocal() as db:
+        assert jobs.apply_retention(db)["failed"] == []
@@ -0,0 +1,244 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from app import database, ingest
+from app.cache import project_cache
+from app.database import SessionLocal
+from app.ingest import LogBuffer
+from app.routes import logs
+from tests.conftest import register
+
+
+def _utc_ago(**delta):
+    return datetime.now(timezone.utc) - timedelta(**delta)
+
+
+def _project(client, headers):
+    return client.post("/projects/", json={"title": "logged"}, headers=headers).json()["id"]
+
+
+def test_single_log_and_list(client, auth_headers):
+    pid = _project(client, auth_headers)
+    r = client.post("/logs/", json={"project_id": pid, "message": "hello"}, headers=auth_headers)
+    assert r.status_code == 201
+    assert r.json()["created_at"]
+    listed = client.get(f"/logs/?project_id={pid}", headers=auth_headers).json()
+    assert [line["message"] for line in listed] == ["hello"]
+
+
+def test_ingest_json_array_and_ndjson(client, auth_headers):
+    pid = _project(client, auth_headers)
+    r = client.post(
+        f"/projects/{pid}/logs",
+        json=[{"message": f"a{i}"} for i in range(3)]
+        # a naive client timestamp is taken as UTC
+        + [{"message": "old", "created_at": _utc_ago(hours=1).replace(tzinfo=None).isoformat()}],
+        headers=auth_headers,
+    )
+    assert r.status_code == 201
+    assert r.json() == {"accepted": 4, "buffered": False}
+
+    body = "\n".join(json.dumps({"message": f"n{i}"}) for i in range(5)) + "\n"
+    r = client.post(
+        f"/projects/{pid}/logs",
+        content=body,
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert r.json()["accepted"] == 5
+
+    listed = client.get(f"/logs/?project_id={pid}&limit=1000", headers=auth_headers).json()
+    assert len(listed) == 9
+    assert listed[-1]["message"] == "old"
+
+
+def test_ingest_rejects_timestamps_outside_the_window(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(logs, "LOG_INGEST_MAX_AGE", 3600)
+    monkeypatch.setattr(logs, "LOG_INGEST_MAX_AHEAD", 60)
+    pid = _project(client, auth_headers)
+
+    def ingest_at(ts):
+        return client.post(
+            f"/projects/{pid}/logs",
+            json=[{"message": "now"}, {"message": "then", "created_at": ts.isoformat()}],
+            headers=auth_headers,
+        )
+
+    # just inside either edge is taken as given
+    assert ingest_at(_utc_ago(minutes=59)).status_code == 201
+    assert ingest_at(_utc_ago(seconds=-50)).status_code == 201
+    # past either edge the whole batch is refused
+    for ts in (_utc_ago(minutes=61), _utc_ago(seconds=-70), datetime(2099, 1, 1)):
+        r = ingest_at(ts)
+        assert r.status_code == 422, r.text
+        assert r.json()["detail"][0]["loc"] == ["body", 1, "created_at"]
+    assert len(client.get(f"/logs/?project_id={pid}", headers=auth_headers).json()) == 4
+
+
+def test_ingest_is_owner_scoped_and_validated(client, auth_headers):
+    other = register(client)
+    theirs = _project(client, other)
+    assert (
+        client.post(
+            f"/projects/{theirs}/logs", json=[{"message": "x"}], headers=auth_headers
+        ).status_code
+        == 404
+    )
+    assert client.get(f"/logs/?project_id={theirs}", headers=auth_headers).json() == []
+
+    pid = _project(client, auth_headers)
+    assert (
+        client.post(f"/projects/{pid}/logs", json=[{"nope": 1}], headers=auth_headers).status_code
+        == 422
+    )
+    r = client.post(
+        f"/projects/{pid}/logs",
+        content=b"{not json",
+        headers={**auth_headers, "Content-Type": "application/json"},
+    )
+    assert r.status_code == 400
+
+
+def test_buffered_ingest_is_flushed(client, auth_headers, monkeypatch):
+    buffer = LogBuffer(max_rows=1000, max_seconds=60, max_pending=5)
+    monkeypatch.setattr(ingest, "LOG_BUFFER", True)
+    monkeypatch.setattr(ingest, "log_buffer", buffer)
+    pid = _project(client, auth_headers)
+
+    r = client.post(f"/projects/{pid}/logs", json=[{"message": "b"}] * 4, headers=auth_headers)
+    assert r.status_code == 202
+    assert buffer.pending() == 4
+    # over max_pending: refused with backpressure rather than queued
+    r = client.post(f"/projects/{pid}/logs", json=[{"message": "b"}] * 2, headers=auth_headers)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+    buffer.close()
+    assert buffer.flushed == 4
+    assert len(client.get(f"/logs/?project_id={pid}", headers=auth_headers).json()) == 4
+
+
+def test_buffer_flushes_on_size_and_time(client, auth_headers):
+    pid = _project(client, auth_headers)
+    row = {"project_id": pid, "message": "t", "created_at": datetime.now()}
+    buffer = LogBuffer(max_rows=3, max_seconds=0.05, max_pending=100, session_factory=SessionLocal)
+    buffer.add([row] * 3)  # size trigger
+    buffer.add([row])  # time trigger
+    deadline = time.monotonic() + 2
+    while buffer.flushed < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert buffer.flushed == 4
+    buffer.close()
+
+
+def test_buffer_flush_drops_only_the_failing_project(client, auth_headers, caplog):
+    good, other = _project(client, auth_headers), _project(client, auth_headers)
+    now = datetime.now()
+    rows = [{"project_id": pid, "message": "m", "created_at": now} for pid in (good, other, good)]
+    rows.append({"project_id": None, "message": "no project", "created_at": now})
+    buffer = LogBuffer(max_rows=1000, max_seconds=60, max_pending=100, session_factory=SessionLocal)
+    buffer.add(rows)
+    assert buffer.flush() == 3
+    assert (buffer.flushed, buffer.failed) == (3, 1)
+    assert "dropped 1 rows for project None" in caplog.text
+    counts = [
+        len(client.get(f"/logs/?project_id={pid}", headers=auth_headers).json())
+        for pid in (good, other)
+    ]
+    assert counts == [2, 1]
+    buffer.close()
+
+
+def test_buffer_flush_retries_a_failed_batch(client, auth_headers):
+    pid = _project(client, auth_headers)
+    calls = []
+
+    def lost_connection():
+        raise RuntimeError("connection reset")
+
+    def flaky():
+        db = SessionLocal()
+        calls.append(db)
+        if len(calls) == 1:
+            db.commit = lost_connection
+        return db
+
+    buffer = LogBuffer(max_rows=1000, max_seconds=60, max_pending=100, session_factory=flaky)
+    buffer.add([{"project_id": pid, "message": "r", "created_at": datetime.now()}] * 2)
+    assert buffer.flush() == 2
+    assert len(calls) == 2 and buffer.failed == 0
+    assert len(client.get(f"/logs/?project_id={pid}", headers=auth_headers).json()) == 2
+    buffer.close()
+
+
+def _statements(fn):
+    engine = database.async_engine.sync_engine if database.DB_ASYNC else database.engine
+    seen = []
+
+    def listener(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        r = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return r, seen
+
+
+def test_include_logs_is_one_query_for_the_page(client, monkeypatch):
+    monkeypatch.setattr(project_cache, "backend", None)
+    headers = register(client)
+    client.get("/projects/", headers=headers)  # warm the token cache
+    counts = {}
+    for n_projects in (2, 6):
+        for _ in range(n_projects - len(counts.get("pids", []))):
+            pid = _project(client, headers)
+            client.post(
+                f"/projects/{pid}/logs",
+                json=[{"message": f"{pid}-{i}"} for i in range(4)],
+                headers=headers,
+            )
+            counts.setdefault("pids", []).append(pid)
+        plain, plain_sql = _statements(lambda: client.get("/projects/", headers=headers))
+        r, sql = _statements(
+            lambda: client.get("/projects/?include=logs&logs_limit=3", headers=headers)
+        )
+        assert r.status_code == 200 and len(r.json()) == n_projects
+        # the logs for the whole page are one more statement, however many projects
+        assert len(sql) == len(plain_sql) + 1
+        assert sum("FROM logs" in s for s in sql) == 1
+        counts[n_projects] = len(sql)
+    assert counts[2] == counts[6]
+
+    page = r.json()
+    for p in page:
+        assert [log["message"] for log in p["logs"]] == [f"{p['id']}-{i}" for i in (3, 2, 1)]
+        assert set(p["logs"][0]) == {"id", "project_id", "message", "created_at"}
+    assert "logs" not in plain.json()[0]
+
+    one = client.get(f"/projects/{page[0]['id']}?include=logs&logs_limit=1", headers=headers)
+    assert [log["message"] for log in one.json()["logs"]] == [f"{page[0]['id']}-3"]
+    # a different representation, so a different validator
+    bare = client.get(f"/projects/{page[0]['id']}", headers=headers)
+    assert one.headers["etag"] != bare.headers["etag"]
+    r = client.get(
+        f"/projects/{page[0]['id']}?include=logs&logs_limit=1",
+        headers={**headers, "If-None-Match": bare.headers["etag"]},
+    )
+    assert r.status_code == 200
+    assert client.get("/projects/?include=owner", headers=headers).status_code == 422
+
+
+def test_include_logs_through_the_cache_sees_new_logs(client, auth_headers):
+    pid = _project(client, auth_headers)
+    url = f"/projects/{pid}?include=logs&logs_limit=2"
+    assert client.get(url, headers=auth_headers).json()["logs"] == []
+    client.post(f"/projects/{pid}/logs", json=[{"message": "first"}], headers=auth_headers)
+    assert [log["message"] for log in client.get(url, headers=auth_headers).json()["logs"]] == [
+        "first"
+    ]
+    listed = client.get("/projects/?include=logs", headers=auth_headers).json()
+    assert [log["message"] for log in listed[0]["logs"]] == ["first"]
@@ -0,0 +1,45 @@
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+def _seed(client, headers, n):
+    return [
+        client.post("/projects/", json={"title": f"p{i}"}, headers=headers).json()["id"]
+        for i in range(n)
+    ]
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+
+
+def test_cursor_pages_match_offset_pages(client, auth_headers):
+    ids = _seed(client, auth_headers, 7)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3} | ({"cursor": cursor} if cursor else {})
+        r = client.get("/projects/", params=params, headers=auth_headers)
+        assert r.status_code == 200
+        seen += [p["id"] for p in r.json()]
+        cursor = r.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    assert seen == sorted(ids, reverse=True)
+
+    by_offset = client.get("/projects/", params={"limit": 3, "offset": 3}, headers=auth_headers)
+    assert [p["id"] for p in by_offset.json()] == seen[3:6]
+
+
+def test_last_page_has_no_cursor(client, auth_headers):
+    _seed(client, auth_headers, 2)
+    r = client.get("/projects/", params={"limit": 2}, headers=auth_headers)
+    assert len(r.json()) == 2
+    assert NEXT_CURSOR_HEADER not in r.headers
+
+
+def test_bad_cursor_rejected(client, auth_headers):
+    r = client.get("/projects/", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert r.status_code == 400
+    r = client.get(
+        "/projects/", params={"cursor": encode_cursor(5), "offset": 10}, headers=auth_headers
+    )
+    assert r.status_code == 400
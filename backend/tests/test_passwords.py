@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from passlib.hash import pbkdf2_sha256
+
+from app import models, passwords
+from app.database import SessionLocal
+from tests.conftest import register
+
+CURRENT = f"$pbkdf2-sha256${passwords.PASSWORD_ROUNDS}$"
+
+
+def _stored_hash(username):
+    db = SessionLocal()
+    try:
+        return db.query(models.User).filter(models.User.username == username).one().password
+    finally:
+        db.close()
+
+
+def _user_with_hash(username, hashed):
+    db = SessionLocal()
+    db.add(models.User(username=username, email=f"{username}@example.com", password=hashed))
+    db.commit()
+    db.close()
+
+
+def _login(client, username, password):
+    return client.post("/auth/token", data={"username": username, "password": password})
+
+
+def test_new_users_get_current_parameters(client):
+    register(client, username="fresh_hash")
+    assert _stored_hash("fresh_hash").startswith(CURRENT)
+
+
+@pytest.mark.parametrize(
+    "scheme",
+    [
+        "old_rounds",
+        pytest.param(
+            "bcrypt",
+            marks=pytest.mark.skipif(
+                not passwords.pwd.handler("bcrypt").has_backend(), reason="no bcrypt backend"
+            ),
+        ),
+    ],
+)
+def test_outdated_hash_is_upgraded_on_login(client, scheme):
+    username = f"legacy_{scheme}"
+    if scheme == "bcrypt":
+        old = passwords.pwd.handler("bcrypt").hash("pass123")
+    else:
+        old = pbkdf2_sha256.using(rounds=1000).hash("pass123")
+    _user_with_hash(username, old)
+
+    assert _login(client, username, "wrong").status_code == 401
+    assert _stored_hash(username) == old  # only a verified password is re-hashed
+
+    assert _login(client, username, "pass123").status_code == 200
+    upgraded = _stored_hash(username)
+    assert upgraded.startswith(CURRENT)
+    assert _login(client, username, "pass123").status_code == 200
+    assert _stored_hash(username) == upgraded
+
+
+def test_process_pool_and_backpressure():
+    hasher = passwords._Hasher(workers=1, max_pending=1)
+    try:
+        hashed = hasher.run(passwords._hash, "s3cret")
+        assert hasher.run(passwords._verify, "s3cret", hashed) == (True, None)
+
+        pending = hasher.submit(passwords._hash, "a")
+        with pytest.raises(HTTPException) as err:
+            hasher.submit(passwords._hash, "b")
+        assert err.value.status_code == 503
+        # shared by login and registration, so it names neither
+        assert err.value.detail == "Too many password checks in progress, retry shortly"
+        pending.result()
+
+        ok, _ = asyncio.run(hasher.run_async(passwords._verify, "nope", hashed))
+        assert not ok
+    finally:
+        hasher.shutdown()
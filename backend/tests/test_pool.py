@@ -0,0 +1,144 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event, exc, text
+
+from app import database, dbpool
+from app.auth import token_cache
+from app.routes import internal
+from tests.conftest import register
+
+
+def _engine(tmp_path, stats, **kw):
+    url = f"sqlite:///{tmp_path}/pool.db"
+    opts = dbpool.engine_options(url, stats)
+    opts.update(pool_size=1, max_overflow=0, **kw)
+    return create_engine(url, **opts)
+
+
+def test_histogram_is_cumulative():
+    h = dbpool.Histogram(buckets=(0.01, 0.1))
+    for s in (0.005, 0.05, 0.05, 3.0):
+        h.observe(s)
+    snap = h.snapshot()
+    assert snap["buckets"] == {"0.01": 1, "0.1": 3, "+Inf": 4}
+    assert snap["count"] == 4 and snap["max_seconds"] == 3.0
+
+
+def test_waits_and_timeouts_are_recorded(tmp_path):
+    stats = dbpool.PoolStats()
+    engine = _engine(tmp_path, stats, pool_timeout=0.2)
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+    # nothing idle and no overflow: the second checkout queues and gives up
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert stats.timeouts == 1
+
+    threading.Timer(0.1, held.close).start()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    snap = stats.snapshot(engine.pool)
+    assert snap["wait"]["count"] == 2  # the timeout and the 0.1 s wait
+    assert snap["wait"]["max_seconds"] >= 0.09
+    assert snap["checkout"]["count"] == 2  # the first, immediate checkout and the waited one
+    assert snap["checked_out"] == 0 and snap["size"] == 1
+
+    # stats survive pool recreation (engine.dispose())
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert stats.checkout.count == 3
+    engine.dispose()
+
+
+def test_statement_timeout_only_on_postgres(monkeypatch):
+    monkeypatch.setattr(dbpool, "STATEMENT_TIMEOUT_MS", 1500)
+    stats = dbpool.PoolStats()
+    assert dbpool.engine_options("postgresql+psycopg2://x/y", stats)["connect_args"] == {
+        "options": "-c statement_timeout=1500"
+    }
+    opts = dbpool.engine_options("postgresql+asyncpg://x/y", stats, is_async=True)
+    assert opts["connect_args"] == {"server_settings": {"statement_timeout": "1500"}}
+    assert dbpool.engine_options("sqlite:///x.db", stats)["connect_args"] == {
+        "check_same_thread": False
+    }
+
+
+def test_pool_endpoint(client):
+    client.get("/")
+    body = client.get("/internal/pool").json()
+    assert body["config"]["pool_size"] == dbpool.POOL_SIZE
+    assert {"checked_out", "overflow", "timeouts", "wait", "checkout"} <= body["sync"].keys()
+    assert "/internal/pool" not in client.get("/openapi.json").json()["paths"]
+
+
+def test_internal_endpoints_want_the_token_when_set(client, monkeypatch):
+    monkeypatch.setattr(internal, "TOKEN", "s3cret")
+    for path in ("/internal/pool", "/internal/metrics", "/internal/events"):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+        assert client.get(path, headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+class Held:
+    """Connections checked out from the app's pools: now, at most, and in total."""
+
+    def __init__(self):
+        self.now = self.peak = self.total = 0
+        self.engines = [database.engine]
+        if database.async_engine is not None:
+            self.engines.append(database.async_engine.sync_engine)
+        for engine in self.engines:
+            event.listen(engine, "checkout", self._out)
+            event.listen(engine, "checkin", self._in)
+
+    def _out(self, *_):
+        self.now += 1
+        self.total += 1
+        self.peak = max(self.peak, self.now)
+
+    def _in(self, *_):
+        self.now -= 1
+
+    def reset(self):
+        self.peak = self.total = 0
+
+    def remove(self):
+        for engine in self.engines:
+            event.remove(engine, "checkout", self._out)
+            event.remove(engine, "checkin", self._in)
+
+
+def test_one_connection_per_request(client):
+    headers = register(client)
+    held = Held()
+
+    def request(method, path, **kw):
+        token_cache.clear()  # so get_current_user has to look the user up too
+        held.reset()
+        r = client.request(method, path, headers=headers, **kw)
+        assert r.status_code < 300, r.text
+        return r
+
+    try:
+        # auth and the handler share the request's session, so a read takes one checkout
+        pid = request("POST", "/projects/", json={"title": "one"}).json()["id"]
+        # (a write's read-back after commit checks out again, but never while holding one)
+        assert held.peak == 1
+        request("GET", f"/projects/{pid}")
+        assert (held.total, held.peak) == (1, 1)
+        request("GET", "/users/me")
+        assert (held.total, held.peak) == (1, 1)
+        request("PATCH", f"/projects/{pid}", json={"title": "two"})
+        assert held.peak == 1
+
+        # token and project both cached: the session is never used, so no checkout at all
+        client.get(f"/projects/{pid}", headers=headers)
+        held.reset()
+        assert client.get("/users/me", headers=headers).status_code == 200
+        if not database.DB_ASYNC:  # the async twins don't use the project cache
+            assert client.get(f"/projects/{pid}", headers=headers).json()["title"] == "two"
+        assert held.total == 0
+    finally:
+        held.remove()
@@ -0,0 +1,57 @@
+import logging
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import profiling
+from app.database import engine
+from app.routes.projects import get_db
+
+
+def _app(**options):
+    app = FastAPI()
+
+    @app.get("/things/{n}")
+    def things(n: int, db=Depends(get_db)):
+        # one query per item: the N+1 shape the profiler should flag
+        return [db.scalar(text("SELECT :i"), {"i": i}) for i in range(n)]
+
+    profiling.instrument_engine(engine)
+    app.add_middleware(profiling.ProfilingMiddleware, **options)
+    return app
+
+
+def test_sql_is_attributed_to_the_request(caplog):
+    profiling.metrics.reset()
+    client = TestClient(_app(slow_ms=0, repeat=5))
+    with caplog.at_level(logging.WARNING, logger="app.profiling"):
+        r = client.get("/things/3")
+        assert 'desc="3 queries"' in r.headers["server-timing"]
+        assert not caplog.records
+
+        r = client.get("/things/6")
+        assert r.json() == list(range(6))
+        assert 'desc="6 queries"' in r.headers["server-timing"]
+    assert "ran one statement 6 times" in caplog.text
+
+    out = profiling.metrics.prometheus()
+    labels = 'method="GET",route="/things/{n}",status="2xx"'
+    assert f"devlog_request_duration_seconds_count{{{labels}}} 2" in out
+    assert f"devlog_sql_statements_total{{{labels}}} 9" in out
+    assert f"devlog_repeated_sql_requests_total{{{labels}}} 1" in out
+
+
+def test_slow_requests_are_logged(caplog):
+    client = TestClient(_app(slow_ms=0.001, server_timing=False))
+    with caplog.at_level(logging.WARNING, logger="app.profiling"):
+        r = client.get("/things/1")
+    assert "server-timing" not in r.headers
+    assert "slow request GET /things/1 200" in caplog.text
+
+
+def test_metrics_endpoint(client):
+    r = client.get("/internal/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'devlog_pool_checkout_seconds_count{engine="sync"}' in r.text
@@ -0,0 +1,66 @@
+from tests.conftest import register
+
+
+def _batch_create(client, headers, n, prefix="p"):
+    items = [{"title": f"{prefix}{i}", "description": "d"} for i in range(n)]
+    r = client.post("/projects/batch", json=items, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_batch_create_returns_results_in_order(client, auth_headers):
+    results = _batch_create(client, auth_headers, 5)
+    assert [r["index"] for r in results] == list(range(5))
+    assert all(r["status"] == 201 for r in results)
+    assert [r["project"]["title"] for r in results] == [f"p{i}" for i in range(5)]
+    listed = client.get("/projects/", headers=auth_headers).json()
+    assert {p["id"] for p in listed} == {r["id"] for r in results}
+
+
+def test_batch_update_is_owner_scoped(client, auth_headers):
+    mine = [r["id"] for r in _batch_create(client, auth_headers, 2)]
+    other = register(client)
+    theirs = _batch_create(client, other, 1)[0]["id"]
+
+    r = client.patch(
+        "/projects/batch",
+        json=[
+            {"id": mine[0], "title": "renamed"},
+            {"id": theirs, "title": "hijack"},
+            {"id": mine[1], "description": "new desc"},
+        ],
+        headers=auth_headers,
+    )
+    results = r.json()
+    assert [x["status"] for x in results] == [200, 404, 200]
+    assert results[0]["project"]["title"] == "renamed"
+    assert results[2]["project"] == {
+        **results[2]["project"],
+        "title": "p1",
+        "description": "new desc",
+    }
+    assert client.get(f"/projects/{theirs}", headers=other).json()["title"] == "p0"
+
+
+def test_batch_delete(client, auth_headers):
+    ids = [r["id"] for r in _batch_create(client, auth_headers, 3)]
+    other = register(client)
+    theirs = _batch_create(client, other, 1)[0]["id"]
+
+    r = client.request(
+        "DELETE", "/projects/batch", json=[ids[0], ids[1], ids[0], theirs], headers=auth_headers
+    )
+    assert [x["status"] for x in r.json()] == [204, 204, 404, 404]
+    remaining = [p["id"] for p in client.get("/projects/", headers=auth_headers).json()]
+    assert remaining == [ids[2]]
+    assert client.get(f"/projects/{theirs}", headers=other).status_code == 200
+
+
+def test_batch_limits(client, auth_headers):
+    assert client.post("/projects/batch", json=[], headers=auth_headers).status_code == 422
+    assert (
+        client.post(
+            "/projects/batch", json=[{"description": "no title"}], headers=auth_headers
+        ).status_code
+        == 422
+    )
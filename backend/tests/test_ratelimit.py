@@ -0,0 +1,137 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import database, ratelimit
+from app.main import app
+from app.ratelimit import (
+    Admission,
+    AdmissionMiddleware,
+    Budget,
+    MemoryStore,
+    RateLimiter,
+    RedisStore,
+)
+from tests.conftest import register
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def limits(monkeypatch, clock):
+    """Switch the limiter on with small budgets and a clock the test moves."""
+    budgets = {**ratelimit.BUDGETS, "login": Budget(3, 60), "search": Budget(2, 10)}
+    limiter = RateLimiter(MemoryStore(1000), budgets, clock=clock)
+    monkeypatch.setattr(ratelimit, "limiter", limiter)
+    return limiter
+
+
+def test_login_burst_is_limited_per_ip(client, limits, clock):
+    form = {"username": "nobody", "password": "x"}
+    codes = [client.post("/auth/token", data=form).status_code for _ in range(5)]
+    assert codes == [401, 401, 401, 429, 429]
+    r = client.post("/auth/token", data=form)
+    assert r.headers["retry-after"] == "20"  # one token per 60/3 seconds
+
+    # another address has its own bucket
+    other = TestClient(app, client=("10.0.0.2", 50000))
+    assert other.post("/auth/token", data=form).status_code == 401
+
+    clock.now += 20
+    assert client.post("/auth/token", data=form).status_code == 401
+    assert client.post("/auth/token", data=form).status_code == 429
+    stats = limits.stats()["budgets"]["login"]
+    assert stats["allowed"] == 5 and stats["limited"] == 4
+
+
+def test_search_budget_is_per_user(client, limits, clock):
+    alice, bob = register(client), register(client)
+    codes = [client.get("/projects/?q=dash", headers=alice).status_code for _ in range(4)]
+    assert codes == [200, 200, 429, 429]
+    # plain listing isn't a search; other users search on their own budget
+    assert client.get("/projects/", headers=alice).status_code == 200
+    assert client.get("/projects/?q=dash", headers=bob).status_code == 200
+    clock.now += 5
+    assert client.get("/projects/?q=dash", headers=alice).status_code == 200
+
+
+def test_redis_store_shares_one_budget_across_workers(clock):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    workers = [
+        RateLimiter(RedisStore(fakeredis.FakeRedis(server=server)), clock=clock) for _ in range(2)
+    ]
+    outcomes = []
+    for i in range(8):
+        try:
+            workers[i % 2].check("register", "ip:10.0.0.9")
+            outcomes.append("ok")
+        except Exception as e:
+            outcomes.append(e.status_code)
+    assert outcomes == ["ok"] * 5 + [429] * 3  # RATE_LIMIT_REGISTER 5/60 between both
+
+
+def _gated_app(gate):
+    slow = FastAPI()
+    release = asyncio.Event()
+
+    @slow.get("/work")
+    async def work():
+        await release.wait()
+        return {"ok": True}
+
+    @slow.get("/ready")
+    async def ready():
+        return {"ok": True}
+
+    slow.add_middleware(AdmissionMiddleware, gate=gate)
+    return slow, release
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_a_burst_beyond_max_inflight():
+    gate = Admission(max_inflight=3, max_pool_queue=0, retry_after=2)
+    slow, release = _gated_app(gate)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=slow), base_url="http://t"
+    ) as ac:
+        burst = [asyncio.create_task(ac.get("/work")) for _ in range(8)]
+        while gate.inflight < 3:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        assert (await ac.get("/ready")).status_code == 200  # probes are never shed
+        release.set()
+        responses = await asyncio.gather(*burst)
+    codes = sorted(r.status_code for r in responses)
+    assert codes == [200] * 3 + [503] * 5
+    assert all(r.headers["retry-after"] == "2" for r in responses if r.status_code == 503)
+    assert gate.shed["inflight"] == 5 and gate.inflight == 0
+
+
+def test_admission_sheds_while_the_pool_queue_is_long(client, auth_headers, monkeypatch):
+    gate = Admission(max_inflight=0, max_pool_queue=4)
+    c = TestClient(AdmissionMiddleware(app, gate=gate))
+
+    assert c.get("/projects/", headers=auth_headers).status_code == 200
+    monkeypatch.setattr(database.pool_stats, "queued", 4)
+    r = c.get("/projects/", headers=auth_headers)
+    assert r.status_code == 503 and r.headers["retry-after"] == "1"
+    assert c.get("/ready").status_code == 200
+    assert c.get("/internal/limits").status_code == 503  # operational reads are shed too
+    monkeypatch.setattr(database.pool_stats, "queued", 0)
+    assert c.get("/projects/", headers=auth_headers).status_code == 200
+    assert gate.stats()["shed"] == {"pool_queue": 2}
@@ -0,0 +1,237 @@
+import os
+import sqlite3
+import time
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+from app import database, models, profiling
+from app.auth import token_cache
+from app.cache import RedisBackend, project_cache
+from app.database import read_session, to_async_url
+from app.replicas import ReplicaSet
+from tests.conftest import register
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _snapshot(tmp_path) -> str:
+    """A replica frozen at the primary's current state: it never sees later writes."""
+    url = make_url(os.environ["DATABASE_URL"])
+    if url.get_backend_name() == "sqlite":
+        path = str(tmp_path / "replica.db")
+        src, dst = sqlite3.connect(url.database), sqlite3.connect(path)
+        src.backup(dst)
+        src.close()
+        dst.close()
+        return f"sqlite:///{path}"
+    # Postgres: a second database cloned from the primary, which can't have sessions open
+    database.engine.dispose()
+    if database.async_engine is not None:
+        database.async_engine.sync_engine.dispose()
+    name = f"replica_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(
+        url.set(database="postgres"), isolation_level="AUTOCOMMIT", poolclass=NullPool
+    )
+    with admin.connect() as conn:
+        conn.exec_driver_sql(f'CREATE DATABASE {name} TEMPLATE "{url.database}"')
+    admin.dispose()
+    return url.set(database=name).render_as_string(hide_password=False)
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    monkeypatch.setattr(project_cache, "backend", None)
+    made = []
+
+    def use(*urls, **kw):
+        # no checker thread: the tests run check() themselves, on a fake clock
+        made.append(ReplicaSet(urls, to_async=to_async_url, clock=Clock(), background=False, **kw))
+        monkeypatch.setattr(database, "replicas", made[-1])
+        made[-1].check()
+        return made[-1]
+
+    yield use
+    for replica_set in made:
+        replica_set.dispose()
+
+
+def _titles(client, headers):
+    return {p["title"] for p in client.get("/projects/", headers=headers).json()}
+
+
+def test_reads_go_to_the_replica_unless_the_user_just_wrote(client, replicas, tmp_path):
+    headers = register(client)
+    before = client.post("/projects/", json={"title": "before"}, headers=headers).json()["id"]
+    rs = replicas(_snapshot(tmp_path), sticky=5)
+
+    after = client.post("/projects/", json={"title": "after"}, headers=headers).json()["id"]
+    # their own write is visible straight away: reads stay on the primary for a while
+    assert _titles(client, headers) == {"before", "after"}
+    assert client.get(f"/projects/{after}", headers=headers).status_code == 200
+    assert rs.reads["sticky"] >= 2 and rs.reads["replica"] == 0
+
+    # then they're served by the replica, which (never replicating) still has the old state
+    rs.clock.now += 6
+    assert _titles(client, headers) == {"before"}
+    assert client.get(f"/projects/{after}", headers=headers).status_code == 404
+    assert client.get(f"/projects/{before}", headers=headers).status_code == 200
+    assert rs.reads["replica"] >= 3
+
+    client.patch(f"/projects/{before}", json={"title": "renamed"}, headers=headers)
+    assert client.get(f"/projects/{before}", headers=headers).json()["title"] == "renamed"
+
+    # someone registered after the snapshot: the token lookup is on the primary, so
+    # they're signed in, while a replica read doesn't know them yet
+    newcomer = register(client)
+    me = client.get("/users/me", headers=newcomer)
+    assert me.status_code == 200
+    rs.clock.now += 6
+    assert client.get(f"/users/?username={me.json()['username']}", headers=headers).json() == []
+
+    stats = client.get("/internal/pool").json()["replicas"]
+    assert stats["replicas"][0]["healthy"] and stats["reads"]["replica"] >= 4
+
+
+def test_only_routes_that_opt_in_read_the_replica(client, replicas, tmp_path, monkeypatch):
+    monkeypatch.setattr(token_cache, "maxsize", 0)  # every request looks its user up
+    headers = register(client)
+    rs = replicas(_snapshot(tmp_path), sticky=0)
+    pid = client.post("/projects/", json={"title": "new"}, headers=headers).json()["id"]
+    client.post(f"/projects/{pid}/logs", json=[{"message": "fresh"}], headers=headers)
+
+    # logs (like jobs, export and /events) read the primary through the shared session
+    logs = client.get(f"/logs/?project_id={pid}", headers=headers).json()
+    assert [line["message"] for line in logs] == ["fresh"]
+    assert client.get("/users/me", headers=headers).status_code == 200
+    assert rs.reads == {"replica": 0, "sticky": 0, "fallback": 0}
+
+    assert client.get(f"/projects/{pid}", headers=headers).status_code == 404
+    assert rs.reads["replica"] == 1
+
+
+def test_unhealthy_replica_falls_back_to_the_primary(client, replicas, tmp_path, monkeypatch):
+    headers = register(client)
+    client.post("/projects/", json={"title": "fresh"}, headers=headers)
+    rs = replicas(
+        f"sqlite:///{tmp_path}/missing/replica.db",
+        _snapshot(tmp_path),
+        sticky=0,
+        check=60,
+        retry=30,
+    )
+    broken, good = rs.replicas
+
+    probes = []
+
+    def counted(probe):
+        return lambda: probes.append(1) or probe()
+
+    for replica in rs.replicas:
+        monkeypatch.setattr(replica, "probe", counted(replica.probe))
+    for _ in range(4):
+        assert _titles(client, headers) == {"fresh"}
+    # the broken one failed its probe once and is left out; the rest went to the good one,
+    # and picking them only read the health the checker found (no probe on the request)
+    assert broken.failures == 1 and broken.down_until > rs.clock() and not broken.healthy
+    assert good.failures == 0 and rs.reads["replica"] == 4 and probes == []
+
+    # only retried once DB_REPLICA_RETRY has passed
+    rs.check()
+    assert broken.failures == 1 and probes == [1]
+    rs.clock.now += 31
+    rs.check()
+    assert broken.failures == 2
+
+    rs.mark_down(good)  # now nothing is healthy
+    client.post("/projects/", json={"title": "fresher"}, headers=headers)
+    assert _titles(client, headers) == {"fresh", "fresher"}
+    assert rs.reads["fallback"] >= 1
+
+
+def test_session_writes_and_transactions_pin_it_to_the_primary(client, replicas, tmp_path):
+    headers = register(client)
+    client.post("/projects/", json={"title": "seen by both"}, headers=headers)
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    replicas(_snapshot(tmp_path), sticky=0)
+    count = (
+        select(func.count()).select_from(models.Project).where(models.Project.owner_id == user_id)
+    )
+
+    with read_session() as db:
+        assert db.scalar(count) == 1 and db.on_replica
+        db.add(models.Project(title="new", owner_id=user_id))
+        db.flush()
+        # the flush went to the primary, and so does everything after it
+        assert not db.on_replica and db.scalar(count) == 2
+        db.rollback()
+
+    with read_session() as db:
+        db.scalars(
+            select(models.Project.id).where(models.Project.owner_id == user_id).with_for_update()
+        ).all()
+        assert not db.on_replica
+
+    with read_session() as db, db.begin():
+        assert not db.on_replica and db.scalar(count) == 1
+
+    # without use_replica() a session is a plain primary session
+    with database.SessionLocal() as db:
+        assert db.scalar(count) == 1 and not db.on_replica
+
+
+def test_stickiness_is_shared_between_workers(client, replicas, tmp_path, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    shared = RedisBackend(fakeredis.FakeRedis())
+    headers = register(client)
+    pid = client.post("/projects/", json={"title": "before"}, headers=headers).json()["id"]
+    rs = replicas(_snapshot(tmp_path), sticky=5, store=shared)
+    monkeypatch.setattr(project_cache, "backend", shared)
+
+    client.patch(f"/projects/{pid}", json={"title": "after"}, headers=headers)
+    # the next read lands on a worker that didn't see the write: it asks redis
+    rs._stuck.clear()
+    assert client.get(f"/projects/{pid}", headers=headers).json()["title"] == "after"
+    assert rs.reads["sticky"] == 1 and rs.reads["replica"] == 0
+    # so what went into the shared cache is the primary's row, not the replica's
+    rs.clock.now += 6
+    assert client.get(f"/projects/{pid}", headers=headers).json()["title"] == "after"
+
+    shared.client.flushdb()
+    assert client.get(f"/projects/{pid}", headers=headers).json()["title"] == "before"
+    assert rs.reads["replica"] == 1 and rs.stats()["sticky_shared"]
+
+
+def test_replica_engines_are_instrumented(replicas, tmp_path):
+    rs = replicas(_snapshot(tmp_path))
+    built = rs.pick()
+    rs.instrument(profiling.instrument_engine)
+    # both the engine built before instrument() and engines built after it
+    assert event.contains(built, "before_cursor_execute", profiling._before_cursor_execute)
+    rs.replicas[0]._engine = None
+    rebuilt = rs.pick()
+    assert rebuilt is not built
+    assert event.contains(rebuilt, "before_cursor_execute", profiling._before_cursor_execute)
+    built.dispose()
+
+
+def test_health_is_checked_in_the_background(tmp_path):
+    rs = ReplicaSet([_snapshot(tmp_path)], to_async=to_async_url, check=0.01)
+    try:
+        rs.pick()  # starts the checker; nothing is healthy before its first probe
+        deadline = time.monotonic() + 5
+        while not rs.replicas[0].healthy and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert rs.pick() is rs.replicas[0].engine
+    finally:
+        rs.dispose()
+    assert rs._checker is None
@@ -0,0 +1,80 @@
+import gzip
+
+import pytest
+
+from app import responses
+
+
+def _projects(client, headers, n=30):
+    client.post(
+        "/projects/batch",
+        json=[{"title": f"p{i}", "description": "lorem ipsum dolor " * 40} for i in range(n)],
+        headers=headers,
+    )
+
+
+def test_fast_list_matches_response_model_output(client, auth_headers, monkeypatch):
+    _projects(client, auth_headers, 3)
+    client.post(
+        "/logs/",
+        json={
+            "project_id": client.get("/projects/", headers=auth_headers).json()[0]["id"],
+            "message": "m",
+        },
+        headers=auth_headers,
+    )
+    plain = {"Accept-Encoding": "identity"}
+    fast = client.get("/projects/?limit=2", headers={**auth_headers, **plain})
+    monkeypatch.setattr(responses, "FAST_LISTS", False)
+    slow = client.get("/projects/?limit=2", headers={**auth_headers, **plain})
+    assert fast.json() == slow.json()
+    for header in ("etag", "x-next-cursor", "cache-control"):
+        assert fast.headers[header] == slow.headers[header]
+
+
+@pytest.mark.parametrize(
+    "encoding",
+    [
+        "gzip",
+        pytest.param("br", marks=pytest.mark.skipif(responses.brotli is None, reason="no brotli")),
+    ],
+)
+def test_large_responses_are_compressed(client, auth_headers, encoding):
+    _projects(client, auth_headers)
+    r = client.get("/projects/", headers={**auth_headers, "Accept-Encoding": encoding})
+    assert r.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert int(r.headers["content-length"]) < len(r.content)  # decoded by the client
+    assert len(r.json()) == 30
+
+    # encoded bytes differ per encoding, so the tag goes weak; revalidation still works
+    etag = r.headers["etag"]
+    assert etag.startswith("W/")
+    r = client.get(
+        "/projects/", headers={**auth_headers, "Accept-Encoding": encoding, "If-None-Match": etag}
+    )
+    assert r.status_code == 304
+
+
+def test_small_and_unaccepted_responses_are_left_alone(client, auth_headers):
+    r = client.get("/", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in r.headers
+    _projects(client, auth_headers)
+    r = client.get("/projects/", headers={**auth_headers, "Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in r.headers
+
+
+def test_streamed_export_is_compressed_incrementally(client, auth_headers):
+    pid = client.post("/projects/", json={"title": "exp"}, headers=auth_headers).json()["id"]
+    client.post(
+        f"/projects/{pid}/logs",
+        json=[{"message": f"line {i}"} for i in range(500)],
+        headers=auth_headers,
+    )
+    with client.stream(
+        "GET", f"/projects/{pid}/logs/export", headers={**auth_headers, "Accept-Encoding": "gzip"}
+    ) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        assert "content-length" not in r.headers
+        raw = b"".join(r.iter_raw())
+    assert len(gzip.decompress(raw).splitlines()) == 500
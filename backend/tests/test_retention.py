@@ -0,0 +1,198 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, func, select, text
+from sqlalchemy.engine import make_url
+
+from app import ingest, models, retention
+from app.database import SessionLocal, engine
+
+UTC = timezone.utc
+# Postgres partitions logs (alembic 0005), so the plain-table fallback only runs on SQLite
+sqlite_only = pytest.mark.skipif(
+    make_url(os.environ["DATABASE_URL"]).get_backend_name() != "sqlite",
+    reason="the unpartitioned fallback; logs is partitioned on Postgres",
+)
+
+
+def test_month_math():
+    ts = datetime(2024, 12, 17, 5, 30, tzinfo=UTC)
+    start = retention.month_start(ts)
+    assert start == datetime(2024, 12, 1, tzinfo=UTC)
+    assert retention.add_months(start, 1) == datetime(2025, 1, 1, tzinfo=UTC)
+    assert retention.partition_name("logs", start) == "logs_p202412"
+
+
+def test_only_fully_expired_partitions_are_dropped():
+    jan, feb, mar = (datetime(2024, m, 1, tzinfo=UTC) for m in (1, 2, 3))
+    parts = [
+        ("logs_legacy", None, jan),
+        ("logs_p202401", jan, feb),
+        ("logs_p202402", feb, mar),
+        ("logs_default", None, None),
+    ]
+    cutoff = datetime(2024, 2, 15, tzinfo=UTC)
+    assert retention.expired(parts, cutoff) == ["logs_legacy", "logs_p202401"]
+
+
+def _project_with_logs(client, headers, created_ats):
+    pid = client.post("/projects/", json={"title": "ret"}, headers=headers).json()["id"]
+    client.post(
+        f"/projects/{pid}/logs",
+        json=[{"message": "x", "created_at": ts.isoformat()} for ts in created_ats],
+        headers=headers,
+    )
+    return pid
+
+
+def _log_count(pid):
+    db = SessionLocal()
+    try:
+        return db.scalar(
+            select(func.count()).select_from(models.Log).where(models.Log.project_id == pid)
+        )
+    finally:
+        db.close()
+
+
+@sqlite_only
+def test_unpartitioned_fallback_deletes_only_expired_rows(client, auth_headers):
+    now = datetime.now(UTC)
+    pid = _project_with_logs(client, auth_headers, [now])
+    # older than ingest takes from clients, so written directly
+    with SessionLocal() as db:
+        ingest.write_logs(
+            db, [{"project_id": pid, "message": "x", "created_at": now - timedelta(days=400)}]
+        )
+        db.commit()
+    with engine.connect() as conn:
+        assert not retention.is_partitioned(conn)
+        assert retention.drop_expired(conn, retention_days=365) == []
+        conn.commit()
+    assert _log_count(pid) == 1
+
+
+def test_project_delete_purges_logs_in_chunks(client, auth_headers, monkeypatch):
+    start = datetime.now(UTC)
+    pid = _project_with_logs(
+        client, auth_headers, [start + timedelta(seconds=i) for i in range(25)]
+    )
+    commits = []
+
+    def listener(_session):
+        commits.append(_log_count(pid))
+
+    event.listen(SessionLocal, "after_commit", listener)
+    real = retention.purge_project_logs
+    monkeypatch.setattr("app.jobs.purge_project_logs", lambda db, ids: real(db, ids, chunk=10))
+    try:
+        assert client.delete(f"/projects/{pid}", headers=auth_headers).status_code == 204
+    finally:
+        event.remove(SessionLocal, "after_commit", listener)
+    # one commit per 10-row chunk, then the project delete itself
+    assert commits[:3] == [15, 5, 0]
+    assert _log_count(pid) == 0
+
+
+def test_purge_chunks_stay_bounded_when_logs_share_a_timestamp(client, auth_headers):
+    # one ingest batch: every row has the same created_at
+    pid = _project_with_logs(client, auth_headers, [datetime.now(UTC)] * 25)
+    left = []
+    db = SessionLocal()
+    event.listen(db, "after_commit", lambda _session: left.append(_log_count(pid)))
+    try:
+        assert retention.purge_project_logs(db, [pid], chunk=10) == 25
+    finally:
+        db.close()
+    assert left == [15, 5, 0]
+
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_POSTGRES_URL"), reason="needs a throwaway Postgres (TEST_POSTGRES_URL)"
+)
+def test_postgres_partitions_roundtrip(monkeypatch):
+    """Migrate a disposable database to head, then create and drop real partitions."""
+    from alembic.config import Config
+
+    from alembic import command
+
+    url = os.environ["TEST_POSTGRES_URL"]
+    monkeypatch.setenv("DATABASE_URL", url)
+    cfg = Config(os.path.join(os.path.dirname(__file__), "..", "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(os.path.dirname(__file__), "..", "alembic"))
+    command.downgrade(cfg, "base")
+    command.upgrade(cfg, "head")
+
+    pg = create_engine(url)
+    with pg.connect() as conn:
+        assert retention.is_partitioned(conn)
+        uid = conn.execute(
+            text("INSERT INTO users (username, email, password) VALUES ('r','r','x') RETURNING id")
+        ).scalar()
+        pid = conn.execute(
+            text("INSERT INTO projects (title, owner_id) VALUES ('p', :u) RETURNING id"), {"u": uid}
+        ).scalar()
+
+        future = retention.add_months(retention.month_start(datetime.now(UTC)), 6)
+        created = retention.ensure_partitions(conn, now=future, months_ahead=1)
+        assert created == [
+            retention.partition_name("logs", future),
+            retention.partition_name("logs", retention.add_months(future, 1)),
+        ]
+        conn.execute(
+            text(
+                "INSERT INTO logs (project_id, message, created_at)"
+                " VALUES (:p, 'old', :a), (:p, 'new', :b)"
+            ),
+            {
+                "p": pid,
+                "a": future + timedelta(days=1),
+                "b": retention.add_months(future, 1) + timedelta(days=1),
+            },
+        )
+        conn.commit()
+
+        # pretend a month after `future` is past retention: its partition goes, the next stays
+        dropped = retention.drop_expired(
+            conn, retention_days=0, now=retention.add_months(future, 1)
+        )
+        conn.commit()
+        assert retention.partition_name("logs", future) in dropped
+        assert conn.execute(
+            text("SELECT message FROM logs WHERE project_id = :p"), {"p": pid}
+        ).scalars().all() == ["new"]
+
+        # rows already in the default partition move into the partition made for them
+        later = retention.add_months(future, 3)
+        conn.execute(
+            text("INSERT INTO logs (project_id, message, created_at) VALUES (:p, 'stray', :a)"),
+            {"p": pid, "a": later + timedelta(days=2)},
+        )
+        conn.commit()
+        stray = retention.partition_name("logs", later)
+        assert retention.ensure_partitions(conn, now=later, months_ahead=0) == [stray]
+        assert (
+            conn.execute(
+                text("SELECT tableoid::regclass::text FROM logs WHERE message = 'stray'")
+            ).scalar()
+            == stray
+        )
+        assert conn.execute(text("SELECT count(*) FROM logs_default")).scalar() == 0
+
+        # a partition that can't be created is skipped, and the rest of the pass goes on
+        blocked = retention.partition_name("logs", retention.add_months(later, 1))
+        conn.execute(text(f"CREATE TABLE {blocked} (x int)"))
+        conn.commit()
+        failed = []
+        created = retention.ensure_partitions(conn, now=later, months_ahead=2, failed=failed)
+        assert failed == [blocked]
+        assert created == [retention.partition_name("logs", retention.add_months(later, 2))]
+        dropped = retention.drop_expired(
+            conn, retention_days=0, now=retention.add_months(later, 1), failed=failed
+        )
+        assert stray in dropped and failed == [blocked]
+        conn.execute(text(f"DROP TABLE {blocked}"))
+        conn.commit()
+    pg.dispose()
+    command.downgrade(cfg, "base")
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import text
+
+from app import search
+from app.database import engine
+from app.pagination import NEXT_CURSOR_HEADER
+
+
+def _create(client, headers, title, description=None):
+    r = client.post(
+        "/projects/", json={"title": title, "description": description}, headers=headers
+    )
+    return r.json()["id"]
+
+
+def _search(client, headers, q, **params):
+    r = client.get("/projects/", params={"q": q, **params}, headers=headers)
+    assert r.status_code == 200, r.text
+    return [p["id"] for p in r.json()]
+
+
+def test_title_match_ranks_above_description_match(client, auth_headers):
+    in_desc = _create(client, auth_headers, "Alarm clock", "pipeline for the dashboard")
+    in_title = _create(client, auth_headers, "Dashboard", "react")
+    _create(client, auth_headers, "Unrelated", "nothing here")
+    assert _search(client, auth_headers, "dashboard") == [in_title, in_desc]
+
+
+def test_prefix_and_multi_term(client, auth_headers):
+    pid = _create(client, auth_headers, "ETL Pipeline", "Airflow + Postgres")
+    _create(client, auth_headers, "Airflow notes")
+    assert _search(client, auth_headers, "pipe") == [pid]
+    assert _search(client, auth_headers, "airflow postgres") == [pid]
+
+
+def test_index_follows_update_replace_delete(client, auth_headers):
+    pid = _create(client, auth_headers, "Old name")
+    client.patch(f"/projects/{pid}", json={"description": "zebra"}, headers=auth_headers)
+    assert _search(client, auth_headers, "zebra") == [pid]
+    client.put(f"/projects/{pid}", json={"title": "Giraffe"}, headers=auth_headers)
+    assert _search(client, auth_headers, "zebra") == []
+    assert _search(client, auth_headers, "giraffe") == [pid]
+    client.delete(f"/projects/{pid}", headers=auth_headers)
+    assert _search(client, auth_headers, "giraffe") == []
+
+
+def test_ranked_results_page_with_cursor(client, auth_headers):
+    ids = [_create(client, auth_headers, f"Widget {i}", "widget " * (i % 3)) for i in range(7)]
+    full = _search(client, auth_headers, "widget", limit=50)
+    seen, cursor = [], None
+    while True:
+        params = {"q": "widget", "limit": 3} | ({"cursor": cursor} if cursor else {})
+        r = client.get("/projects/", params=params, headers=auth_headers)
+        seen += [p["id"] for p in r.json()]
+        cursor = r.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    assert seen == full
+    assert sorted(seen) == sorted(ids)
+
+
+def test_search_is_owner_scoped(client, auth_headers):
+    from tests.conftest import register
+
+    other = register(client)
+    _create(client, other, "Secret walrus")
+    assert _search(client, auth_headers, "walrus") == []
+
+
+def test_ilike_fallback(client, auth_headers, monkeypatch):
+    pid = _create(client, auth_headers, "Alarm Clock")
+    # non-word queries and PROJECT_SEARCH=ilike both use substring matching
+    assert pid in _search(client, auth_headers, "%")
+    monkeypatch.setattr(search, "SEARCH_MODE", "ilike")
+    assert _search(client, auth_headers, "larm") == [pid]
+
+
+def test_fts_trigger_ignores_counter_updates():
+    with engine.connect() as conn:
+        if conn.dialect.name != "sqlite":
+            pytest.skip("Postgres indexes a generated column")
+        sql = conn.execute(
+            text(
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'projects_fts_au'"
+            )
+        ).scalar()
+    assert "AFTER UPDATE OF title, description ON projects" in sql
@@ -0,0 +1,44 @@
+import os
+
+from sqlalchemy import text
+
+from app import database, serving
+
+
+def test_cpu_count_follows_the_cgroup_quota(monkeypatch, tmp_path):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(16)))
+    cpu_max = tmp_path / "cpu.max"
+    monkeypatch.setattr(serving, "CGROUP_CPU_MAX", str(cpu_max))
+    assert serving.cpu_count() == 16  # no cgroup file
+    cpu_max.write_text("max 100000\n")
+    assert serving.cpu_count() == 16
+    cpu_max.write_text("250000 100000\n")  # 2.5 CPUs
+    assert serving.cpu_count() == 3
+    cpu_max.write_text("50000 100000\n")
+    assert serving.cpu_count() == 1
+
+
+def test_forked_worker_gets_its_own_connections():
+    engine = database.get_engine()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    parent_conn = engine.pool.checkedin()
+    assert parent_conn
+
+    pid = os.fork()
+    if pid == 0:  # the worker: nothing inherited is handed out, new connections work
+        code = 1
+        try:
+            database.dispose_after_fork()
+            ok = engine.pool.checkedin() == 0
+            with engine.connect() as conn:
+                ok = ok and conn.scalar(text("SELECT 1")) == 1
+            code = 0 if ok else 1
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    # the parent's pooled connections were left open
+    assert engine.pool.checkedin() == parent_conn
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT 1")) == 1
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+
+from app import database, startup
+
+
+def test_import_needs_no_database():
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    code = "import app.main, app.database as d; assert d._engine is None"
+    subprocess.run(
+        [sys.executable, "-c", code], env=env, check=True, cwd=os.path.dirname(startup.ALEMBIC_INI)
+    )
+
+
+def test_schema_head_matches_migrations():
+    assert startup.script_heads() == {startup.SCHEMA_HEAD}
+
+
+def test_ready_after_startup(client):
+    r = client.get("/ready")
+    assert r.status_code == 200, r.json()
+    assert r.json()["status"] == "ready"
+    # warmed connections are back in the pool, open
+    assert database.engine.pool.checkedin() >= startup.POOL_WARM
+
+
+def test_not_ready_until_migrated(monkeypatch):
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/empty.db")
+    monkeypatch.setattr(database, "get_engine", lambda: engine)
+    readiness = startup.Readiness()
+    assert not readiness.check()
+    assert "alembic upgrade head" in readiness.status()["detail"]
+    assert readiness.status()["status"] == "unavailable"
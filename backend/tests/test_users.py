@@ -0,0 +1,121 @@
+import uuid
+
+from sqlalchemy import event
+
+from app import database
+from tests.conftest import register
+
+
+def _user(client, username, email=None):
+    return client.post(
+        "/users/",
+        json={
+            "username": username,
+            "email": email or f"{username}@example.com",
+            "password": "pass123",
+        },
+    )
+
+
+def test_registration_is_one_insert_and_duplicates_are_400(client):
+    name = f"reg_{uuid.uuid4().hex[:8]}"
+    engine = database.async_engine.sync_engine if database.DB_ASYNC else database.engine
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        r = _user(client, name)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert r.status_code == 201, r.text
+    assert r.json() == {"username": name, "email": f"{name}@example.com", "id": r.json()["id"]}
+    assert len(statements) == 1 and statements[0].lstrip().upper().startswith("INSERT INTO USERS")
+
+    r = _user(client, name, email=f"other_{name}@example.com")
+    assert r.status_code == 400 and r.json()["detail"] == "Username already taken"
+    r = _user(client, f"other_{name}", email=f"{name}@example.com")
+    assert r.status_code == 400 and r.json()["detail"] == "Email already registered"
+    # the session is usable again after the rollback
+    assert _user(client, f"after_{name}").status_code == 201
+
+
+def test_prefix_search_walks_pages_in_username_order(client):
+    headers = register(client)
+    prefix = f"pfx{uuid.uuid4().hex[:6]}_"
+    names = sorted(f"{prefix}{c}" for c in "edcba")
+    for n in names:
+        assert _user(client, n).status_code == 201
+    _user(client, prefix.rstrip("_") + "x")  # shares all but the last character
+
+    seen, cursor = [], None
+    while True:
+        params = {"username": prefix, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/users/", params=params, headers=headers)
+        assert r.status_code == 200
+        seen += [u["username"] for u in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == names
+
+    # LIKE wildcards in the prefix are literal
+    assert (
+        client.get("/users/", params={"username": prefix[:-1] + "%"}, headers=headers).json() == []
+    )
+
+
+def test_prefix_search_ending_in_the_last_code_point(client):
+    headers = register(client)
+    top, tag = chr(0x10FFFF), uuid.uuid4().hex[:6]
+    names = [f"{tag}{top}", f"{tag}{top}a", f"{top}{tag}", f"{tag}\ud7ff"]
+    for i, n in enumerate(names):
+        assert _user(client, n, email=f"top{i}_{tag}@example.com").status_code == 201
+
+    def search(prefix):
+        r = client.get("/users/", params={"username": prefix}, headers=headers)
+        assert r.status_code == 200, r.text
+        return [u["username"] for u in r.json()]
+
+    # no char above U+10FFFF: the range carries into the one before, or has no upper bound
+    assert search(f"{tag}{top}") == names[:2]
+    assert search(top) == [names[2]]
+    # the next char after U+D7FF skips the surrogates
+    assert search(f"{tag}\ud7ff") == [names[3]]
+
+
+def test_listing_pages_by_id_with_field_selection(client):
+    headers = register(client)
+    for _ in range(3):
+        register(client)
+    r = client.get("/users/", params={"limit": 2, "fields": "id,username"}, headers=headers)
+    assert r.status_code == 200
+    first = r.json()
+    assert [set(u) for u in first] == [{"id", "username"}] * 2
+    r = client.get(
+        "/users/",
+        params={"limit": 2, "fields": "id", "cursor": r.headers["x-next-cursor"]},
+        headers=headers,
+    )
+    assert [set(u) for u in r.json()] == [{"id"}] * 2
+    assert first[1]["id"] < r.json()[0]["id"]
+
+    r = client.get("/users/", params={"fields": "id,password"}, headers=headers)
+    assert r.status_code == 400
+
+
+def test_registration_invalidates_cached_pages(client):
+    headers = register(client)
+    prefix = f"inv{uuid.uuid4().hex[:6]}"
+    _user(client, f"{prefix}a")
+    assert [
+        u["username"]
+        for u in client.get("/users/", params={"username": prefix}, headers=headers).json()
+    ] == [f"{prefix}a"]
+    _user(client, f"{prefix}b")
+    assert [
+        u["username"]
+        for u in client.get("/users/", params={"username": prefix}, headers=headers).json()
+    ] == [f"{prefix}a", f"{prefix}b"]
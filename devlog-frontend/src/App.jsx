@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 
 /**
  * DevLog Frontend — GitHub‑style UI
@@ -9,6 +9,9 @@ import React, { useEffect, useState } from "react";
  */
 
 const DEFAULT_BASE_URL = "http://localhost:8000";
+// change feed reconnects: first delay, doubled per failure up to the cap
+const FEED_RETRY_MS = 3000;
+const FEED_RETRY_MAX_MS = 300000;
 
 // ---------- helpers ----------
 const cx = (...a) => a.filter(Boolean).join(" ");
@@ -71,6 +74,8 @@ export default function App() {
   const [password, setPassword] = useState("");
   const [projects, setProjects] = useState([]);
   const [search, setSearch] = useState("");
+  const searchRef = useRef(search);
+  searchRef.current = search;
   const [status, setStatus] = useState("");
 
   useEffect(() => localStorage.setItem("devlog_base", baseUrl), [baseUrl]);
@@ -134,6 +139,35 @@ export default function App() {
 
   useEffect(() => { if (token) loadProjects(); }, [token]);
 
+  // Change feed: reload when projects change elsewhere (another tab, an importer).
+  // The stream is opened with a single-use ticket, so a dropped stream is reopened
+  // here with a fresh one and the last id seen; "reset" means events were missed.
+  // Failures back off exponentially (3s doubling to 5min, with jitter) until a stream
+  // opens, so a server without the feed isn't asked again every few seconds per tab.
+  useEffect(() => {
+    if (!token) return;
+    let es = null, lastId = "", retry = null, closed = false, delay = FEED_RETRY_MS;
+    const reload = (e) => { if (e.lastEventId) lastId = e.lastEventId; loadProjects(searchRef.current); };
+    function again() {
+      if (closed) return;
+      retry = setTimeout(open, delay / 2 + Math.random() * delay / 2);
+      delay = Math.min(delay * 2, FEED_RETRY_MAX_MS);
+    }
+    async function open() {
+      try {
+        const { ticket } = await callApi(baseUrl, token, "/events/ticket", { method: "POST" });
+        if (closed) return;
+        const resume = lastId ? `&last_event_id=${encodeURIComponent(lastId)}` : "";
+        es = new EventSource(`${baseUrl}/events?ticket=${encodeURIComponent(ticket)}${resume}`);
+        ["project.created", "project.updated", "project.deleted", "projects.batch", "reset"].forEach((t) => es.addEventListener(t, reload));
+        es.onopen = () => { delay = FEED_RETRY_MS; };
+        es.onerror = () => { es.close(); again(); };
+      } catch { again(); }
+    }
+    open();
+    return () => { closed = true; clearTimeout(retry); if (es) es.close(); };
+  }, [token, baseUrl]);
+
   function logout() { setToken(""); setProjects([]); }
 
   // ---------- layout ----------